@@ -0,0 +1,64 @@
+"""
+Compara la latencia extremo a extremo (cambio de stock en el servidor -> observador
+notificado) del polling con ETag frente a SSE, contra el servidor local de semana3.
+Uso: python comparar_transportes.py [--duracion 60] [--cambio-cada 8]
+"""
+import argparse, asyncio, random, time
+
+import examen1
+from histograma import Histograma
+from servidor_local import InventarioSimulado, arrancar, crear_app
+
+class ObservadorLatencia:
+    def __init__(self):
+        self.pendientes = {}  # (id, stock) -> instante del cambio en el servidor
+        self.latencias = Histograma()
+
+    async def actualizar(self, delta):
+        ahora = time.monotonic()
+        for c in delta.cambiados.values():
+            inicio = self.pendientes.pop((c.actual['id'], c.actual['stock']), None)
+            if inicio is not None:
+                self.latencias.registrar(ahora - inicio)
+
+async def medir(nombre, transporte, duracion, cambio_cada, sse=True):
+    inventario = InventarioSimulado(n_productos=200)
+    runner = await arrancar(crear_app(inventario, sse=sse))
+    monitor = examen1.MonitorInventario(transporte=transporte)
+    observador = ObservadorLatencia()
+    monitor.observers = [observador]
+    tarea = asyncio.create_task(monitor.iniciar())
+    await asyncio.sleep(0.5)  # Primera carga del inventario
+
+    fin = time.monotonic() + duracion
+    cambios = 0
+    while time.monotonic() < fin:
+        await asyncio.sleep(random.expovariate(1 / cambio_cada))
+        producto = inventario.cambio_aleatorio()
+        observador.pendientes[(producto['id'], producto['stock'])] = time.monotonic()
+        cambios += 1
+    await asyncio.sleep(min(examen1.INT_MAX, 10))  # Margen para los últimos cambios
+
+    monitor.detener()
+    await tarea
+    await runner.cleanup()
+    r = observador.latencias.resumen()
+    activo = getattr(transporte, "activo", transporte).nombre
+    print(f"{nombre:<18}{activo:>9}{cambios:>9}{r['n']:>8}{r['p50']:>9.3f}s{r['p95']:>9.3f}s{r['max']:>9.3f}s"
+          f"{inventario.peticiones['inventario']:>7}{inventario.peticiones['no_modificado']:>6}"
+          f"{inventario.peticiones['stream']:>8}")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duracion", type=float, default=60)
+    parser.add_argument("--cambio-cada", type=float, default=8, help="Segundos medios entre cambios")
+    args = parser.parse_args()
+
+    print(f"{'Modo':<18}{'Activo':>9}{'Cambios':>9}{'Vistos':>8}{'p50':>10}{'p95':>10}{'max':>10}"
+          f"{'GET':>7}{'304':>6}{'Stream':>8}")
+    await medir("polling", examen1.TransportePolling(), args.duracion, args.cambio_cada)
+    await medir("sse", examen1.TransporteSSE(), args.duracion, args.cambio_cada)
+    await medir("auto (sin SSE)", examen1.TransporteAuto(), args.duracion, args.cambio_cada, sse=False)
+
+if __name__ == "__main__":
+    asyncio.run(main())
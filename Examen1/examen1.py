@@ -1,84 +1,660 @@
-import asyncio, httpx
+import asyncio, httpx, json, os, random, sys, time
+from collections import deque
+from dataclasses import dataclass, field
+from types import MappingProxyType
 from datetime import datetime
 
+# Caché HTTP compartida con los clientes de semana3 (ETag / Cache-Control / LRU)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "semana3"))
+from cache_http import CacheHTTP, RED
+from histograma import Histograma
+from metricas import TransporteMedido
+from sse import ParserSSE
+from planificador import (PlanificadorSondeo, segundos_retry_after, CAMBIO, SIN_CAMBIO,
+                          NO_MODIFICADO, SOBRECARGA, ERROR, FALLO_CLIENTE)
+
 """Configuracion simple"""
 URL = "http://127.0.0.1:8000/api/v1"
 TOKEN = "eyJ0eXAiO..."
 INT_BASE, INT_MAX = 5, 60
+# Pool compartido por el monitor y los observadores
+MAX_CONEXIONES, MAX_KEEPALIVE = 20, 10
+MAX_ALERTAS_EN_VUELO = 10
+# Pipeline de alertas
+TAMANO_LOTE_ALERTAS, INTERVALO_FLUSH = 50, 1.0
+MAX_COLA_ALERTAS, MAX_REINTENTOS_ALERTAS = 1000, 3
+# Reparto a observadores: cada uno con su buzón, su tarea y su timeout
+TIMEOUT_OBSERVADOR, CAPACIDAD_BUZON = 10, 1
+# Stream SSE: el servidor manda ": ping" periódicos, así que un silencio largo es una conexión muerta
+RUTA_STREAM, TIMEOUT_LECTURA_SSE = "/inventario/stream", 30
+BAJO_MINIMO = "BAJO_MINIMO"
+
+def _campos_cambiados(anterior, actual):
+    return frozenset(k for k in anterior.keys() | actual.keys() if anterior.get(k) != actual.get(k))
+
+@dataclass
+class CambioProducto:
+    anterior: dict
+    actual: dict
+    campos: frozenset  # Campos cuyo valor cambió
+
+@dataclass
+class Delta:
+    """Lo que cambió entre dos sondeos, más la vista por status del inventario completo."""
+    agregados: dict = field(default_factory=dict)   # id -> producto
+    eliminados: dict = field(default_factory=dict)  # id -> último producto conocido
+    cambiados: dict = field(default_factory=dict)   # id -> CambioProducto
+    vista: "IndiceInventario" = None
+
+    def __bool__(self):
+        return bool(self.agregados or self.eliminados or self.cambiados)
+
+    def con_estado(self, status):
+        """Productos agregados o cambiados que ahora tienen ese status."""
+        for p in self.agregados.values():
+            if p['status'] == status:
+                yield p
+        for c in self.cambiados.values():
+            if c.actual['status'] == status:
+                yield c.actual
+
+    def salieron_de(self, status):
+        """Ids que tenían ese status y ya no lo tienen (o desaparecieron)."""
+        for pid, p in self.eliminados.items():
+            if p['status'] == status:
+                yield pid
+        for pid, c in self.cambiados.items():
+            if c.anterior['status'] == status and c.actual['status'] != status:
+                yield pid
+
+    def fusionar(self, siguiente):
+        """Un único Delta equivalente a aplicar este y después `siguiente`."""
+        antes, despues = {}, {}  # id -> producto (None si no existía / ya no existe)
+        for d in (self, siguiente):
+            for pid, p in d.agregados.items():
+                antes.setdefault(pid, None)
+                despues[pid] = p
+            for pid, p in d.eliminados.items():
+                antes.setdefault(pid, p)
+                despues[pid] = None
+            for pid, c in d.cambiados.items():
+                antes.setdefault(pid, c.anterior)
+                despues[pid] = c.actual
+        delta = Delta(vista=siguiente.vista)
+        for pid, anterior in antes.items():
+            actual = despues[pid]
+            if anterior is None:
+                if actual is not None:
+                    delta.agregados[pid] = actual
+            elif actual is None:
+                delta.eliminados[pid] = anterior
+            elif anterior != actual:
+                delta.cambiados[pid] = CambioProducto(anterior, actual, _campos_cambiados(anterior, actual))
+        return delta
+
+class IndiceInventario:
+    """Inventario indexado por id y por status; aplicar() calcula el Delta en una pasada."""
 
-class MonitorInventario:
     def __init__(self):
+        self.productos = {}
+        self._por_estado = {}  # status -> {id: producto}
+
+    def con_estado(self, status):
+        return MappingProxyType(self._por_estado.setdefault(status, {}))
+
+    def _indexar(self, pid, p):
+        self._por_estado.setdefault(p['status'], {})[pid] = p
+
+    def _desindexar(self, pid, p):
+        self._por_estado.get(p['status'], {}).pop(pid, None)
+
+    def _actualizar(self, delta, p):
+        pid = p['id']
+        anterior = self.productos.get(pid)
+        if anterior is None:
+            delta.agregados[pid] = p
+        elif anterior != p:
+            delta.cambiados[pid] = CambioProducto(anterior, p, _campos_cambiados(anterior, p))
+            self._desindexar(pid, anterior)
+        else:
+            return
+        self.productos[pid] = p
+        self._indexar(pid, p)
+
+    def aplicar_parcial(self, productos) -> Delta:
+        """Solo los productos que cambiaron (p. ej. un evento del stream): no detecta eliminaciones."""
+        delta = Delta(vista=self)
+        for p in productos:
+            self._actualizar(delta, p)
+        return delta
+
+    def aplicar(self, productos) -> Delta:
+        """Inventario completo: lo que no aparezca se considera eliminado."""
+        delta = Delta(vista=self)
+        vistos = set()
+        for p in productos:
+            vistos.add(p['id'])
+            self._actualizar(delta, p)
+        # Todos los vistos están en el índice: si sobran entradas, son eliminaciones
+        if len(self.productos) > len(vistos):
+            for pid in [i for i in self.productos if i not in vistos]:
+                p = self.productos.pop(pid)
+                self._desindexar(pid, p)
+                delta.eliminados[pid] = p
+        return delta
+
+@dataclass
+class MetricasObservador:
+    entregas: int = 0
+    fallos: int = 0
+    timeouts: int = 0
+    fusionados: int = 0   # Deltas combinados con uno que aún esperaba en el buzón
+    descartados: int = 0  # Solo con politica="descartar"
+    latencia: Histograma = field(default_factory=Histograma)  # Desde que se entrega hasta que termina
+
+class Buzon:
+    """
+    Buzón acotado de un observador con su propia tarea: un observador lento no retrasa
+    a los demás ni al siguiente sondeo. Si se llena, el delta nuevo se fusiona con el
+    último pendiente (no se pierde ningún cambio) o, con politica="descartar", se tira
+    el más antiguo.
+    """
+
+    def __init__(self, observador, timeout=TIMEOUT_OBSERVADOR, capacidad=CAPACIDAD_BUZON, politica="fusionar",
+                 nombre=None):
+        self.observador = observador
+        self.nombre = nombre or type(observador).__name__  # En los logs y en metricas_observadores()
+        self.timeout = timeout
+        self.capacidad = capacidad
+        self.politica = politica
+        self.metricas = MetricasObservador()
+        self._cola = deque()  # (delta, instante de entrega)
+        self._hay = asyncio.Event()
+        self._cerrando = False
+        self._tarea = None
+
+    def entregar(self, delta):
+        ahora = time.monotonic()
+        if len(self._cola) >= self.capacidad:
+            if self.politica == "fusionar":
+                pendiente, entregado = self._cola.pop()
+                delta, ahora = pendiente.fusionar(delta), entregado
+                self.metricas.fusionados += 1
+            else:
+                self._cola.popleft()
+                self.metricas.descartados += 1
+        self._cola.append((delta, ahora))
+        self._hay.set()
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def _bucle(self):
+        nombre = self.nombre
+        while True:
+            if self._cerrando and not self._cola:
+                return
+            await self._hay.wait()
+            if not self._cola:
+                self._hay.clear()
+                continue
+            delta, entregado = self._cola.popleft()
+            try:
+                await asyncio.wait_for(self.observador.actualizar(delta), self.timeout)
+                self.metricas.entregas += 1
+            except asyncio.TimeoutError:
+                self.metricas.timeouts += 1
+                print(f"Observador {nombre} superó {self.timeout}s")
+            except Exception as e:
+                self.metricas.fallos += 1
+                print(f"Falló observador {nombre}: {e}")
+            self.metricas.latencia.registrar(time.monotonic() - entregado)
+
+    async def cerrar(self):
+        """Entrega lo pendiente y termina la tarea."""
+        self._cerrando = True
+        self._hay.set()
+        if self._tarea is not None:
+            await self._tarea
+
+@dataclass
+class Actualizacion:
+    completa: bool  # True: inventario entero; False: solo productos cambiados
+    productos: list
+
+class StreamingNoSoportado(Exception):
+    pass
+
+class StreamNoAutorizado(StreamingNoSoportado):
+    """401/403 en el stream: reconectar no lo arregla (TransporteAuto pasa a polling)."""
+
+class TransportePolling:
+    """GET /inventario con If-None-Match; el planificador decide la espera entre sondeos."""
+    nombre = "polling"
+
+    def __init__(self, planificador=None):
+        self.planificador = planificador or PlanificadorSondeo(INT_BASE, INT_MAX)
+
+    async def recibir(self, monitor):
+        while monitor.ejecutando:
+            resultado, datos, retry_after = await monitor._consultar()
+            if datos:
+                yield Actualizacion(True, datos["productos"])
+            monitor.intervalo = self.planificador.siguiente(resultado, retry_after)
+            await monitor._esperar(monitor.intervalo)
+
+class TransporteSSE:
+    """
+    Server-Sent Events sobre GET /inventario/stream: el servidor empuja cada cambio.
+    Al reconectar envía Last-Event-ID para recibir solo lo que se perdió. Si el
+    servidor no ofrece el stream lanza StreamingNoSoportado (StreamNoAutorizado con 401/403).
+    Tras un corte se reconecta a los `reintento` segundos; si además fallan las
+    reconexiones, backoff exponencial con jitter hasta INT_MAX y nunca antes de Retry-After.
+    """
+    nombre = "sse"
+
+    def __init__(self, ruta=RUTA_STREAM, reintento=1.0, timeout_lectura=TIMEOUT_LECTURA_SSE):
+        self.ruta = ruta
+        self.reintento = reintento  # Segundos; el servidor puede cambiarlo con "retry:"
+        self.timeout_lectura = timeout_lectura
+        self.ultimo_id = None
+        self.reconexiones = 0
+        self.fallos = 0  # Reconexiones seguidas sin llegar a abrir el stream
+
+    async def recibir(self, monitor):
+        while monitor.ejecutando:
+            headers = {"Authorization": f"Bearer {TOKEN}", "Accept": "text/event-stream"}
+            if self.ultimo_id is not None:
+                headers["Last-Event-ID"] = self.ultimo_id
+            retry_after = None
+            try:
+                async with monitor.client.stream("GET", f"{URL}{self.ruta}", headers=headers,
+                                                 timeout=httpx.Timeout(10, read=self.timeout_lectura)) as r:
+                    tipo = r.headers.get("content-type", "")
+                    if r.status_code in (404, 405, 406, 501) or (r.status_code == 200 and not tipo.startswith("text/event-stream")):
+                        raise StreamingNoSoportado(f"{r.status_code} {tipo}".strip())
+                    if r.status_code in (401, 403):
+                        raise StreamNoAutorizado(str(r.status_code))
+                    if r.status_code != 200:
+                        print(f"Stream respondió {r.status_code}")
+                        retry_after = segundos_retry_after(r.headers.get("Retry-After"))
+                    else:
+                        self.fallos = 0
+                        parser = ParserSSE()
+                        async for trozo in r.aiter_bytes():
+                            for evento in parser.alimentar(trozo):
+                                if evento.retry is not None:
+                                    self.reintento = evento.retry / 1000
+                                self.ultimo_id = evento.id
+                                if evento.evento == "inventario":
+                                    yield Actualizacion(True, json.loads(evento.datos)["productos"])
+                                elif evento.evento == "producto":
+                                    yield Actualizacion(False, [json.loads(evento.datos)])
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Stream cortado: {e!r}")
+            self.reconexiones += 1
+            await monitor._esperar(self._espera(retry_after))
+
+    def _espera(self, retry_after=None):
+        espera = self.reintento
+        if self.fallos:
+            espera = min(self.reintento * 2 ** self.fallos, INT_MAX) * random.uniform(0.5, 1)
+        self.fallos += 1
+        return max(espera, retry_after or 0)
+
+class TransporteAuto:
+    """SSE si el servidor lo soporta; si no, el polling con ETag de siempre."""
+
+    def __init__(self, sse=None, polling=None):
+        self.sse = sse or TransporteSSE()
+        self.polling = polling or TransportePolling()
+        self.activo = None
+
+    async def recibir(self, monitor):
+        self.activo = self.sse
+        try:
+            async for actualizacion in self.sse.recibir(monitor):
+                yield actualizacion
+            return
+        except StreamingNoSoportado as e:
+            print(f"El servidor no ofrece SSE ({e}): se usa polling con ETag")
+        self.activo = self.polling
+        async for actualizacion in self.polling.recibir(monitor):
+            yield actualizacion
+
+class MonitorInventario:
+    def __init__(self, cache=None, limites=None, client=None, transporte=None):
         self.observers = []
-        self.etag = None
-        self.estado = None
+        # ttl_por_defecto=0: cada sondeo revalida con If-None-Match salvo que el servidor envíe max-age
+        self.cache = cache or CacheHTTP(ttl_por_defecto=0)
+        # Un único cliente de larga vida: sondeos y alertas reutilizan las conexiones del pool
+        self._client_propio = client is None
+        self.client = client or httpx.AsyncClient(
+            # Las métricas van en el transporte: con event_hooks no se verían las peticiones fallidas
+            transport=TransporteMedido("monitor_inventario", limits=limites or httpx.Limits(
+                max_connections=MAX_CONEXIONES, max_keepalive_connections=MAX_KEEPALIVE)),
+            timeout=10,
+        )
+        self.indice = IndiceInventario()
+        self.transporte = transporte or TransporteAuto()
         self.intervalo = INT_BASE
         self.ejecutando = False
+        self._ultimo_cuerpo = None
+        self._buzones = {}  # observador -> Buzon
+        self._parada = asyncio.Event()
+
+    def suscribir(self, observador, nombre=None, **opciones_buzon):
+        """
+        nombre: clave en metricas_observadores(); por defecto el atributo `nombre` del
+        observador o su clase, numerada si ya está ("ModuloAlertas-2").
+        opciones_buzon: timeout, capacidad, politica (ver Buzon).
+        """
+        if nombre is not None and nombre in self._nombres():
+            raise ValueError(f"Ya hay un observador llamado {nombre!r}")
+        self.observers.append(observador)
+        self._buzones[observador] = Buzon(observador, nombre=nombre or self._nombre_libre(observador),
+                                          **opciones_buzon)
 
-    async def _notificar(self, inventario):
+    async def desuscribir(self, observador):
+        self.observers.remove(observador)
+        buzon = self._buzones.pop(observador, None)
+        if buzon:
+            await buzon.cerrar()
+
+    def _buzon(self, observador):
+        if observador not in self._buzones:
+            self._buzones[observador] = Buzon(observador, nombre=self._nombre_libre(observador))
+        return self._buzones[observador]
+
+    def _nombres(self):
+        return {buzon.nombre for buzon in self._buzones.values()}
+
+    def _nombre_libre(self, observador):
+        base = getattr(observador, "nombre", None) or type(observador).__name__
+        usados, nombre, n = self._nombres(), base, 1
+        while nombre in usados:
+            n += 1
+            nombre = f"{base}-{n}"
+        return nombre
+
+    async def _notificar(self, delta):
+        # Solo deja el delta en cada buzón: no espera a ningún observador
         for obs in self.observers:
-            try: await obs.actualizar(inventario)
-            except Exception as e: print(f"Falló observador: {e}")
+            self._buzon(obs).entregar(delta)
+
+    def metricas_observadores(self):
+        return {buzon.nombre: buzon.metricas for buzon in map(self._buzon, self.observers)}
 
     async def _consultar(self):
+        """Devuelve (resultado, datos, retry_after); datos solo si el inventario cambió."""
         headers = {"Authorization": f"Bearer {TOKEN}"}
-        if self.etag: headers["If-None-Match"] = self.etag
-        
+
+        async def pedir(extra):
+            r = await self.client.get(f"{URL}/inventario", headers={**headers, **extra})
+            return r.status_code, r.headers, r.content
+
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(f"{URL}/inventario", headers=headers, timeout=10)
-                if r.status_code == 200:
-                    data = r.json()
-                    if data and "productos" in data:
-                        self.etag = r.headers.get("ETag")
-                        return data
-                elif r.status_code == 503:
-                    self.intervalo = min(self.intervalo * 2, INT_MAX)
-                elif r.status_code in [400, 401]:
-                    print(f"Error crítico {r.status_code}")
+            r = await self.cache.consultar_async(f"{URL}/inventario", headers, pedir)
+            if r.origen != RED:
+                # 304 o copia fresca: el cuerpo es el mismo, no hace falta ni parsearlo
+                return NO_MODIFICADO, None, None
+            if r.status_code == 200:
+                if r.cuerpo == self._ultimo_cuerpo:
+                    return SIN_CAMBIO, None, None  # Servidor sin ETag: mismo contenido
+                data = r.json()
+                if data and "productos" in data:
+                    self._ultimo_cuerpo = r.cuerpo
+                    return CAMBIO, data, None
+                return SIN_CAMBIO, None, None
+            retry_after = segundos_retry_after(r.cabeceras.get("retry-after"))
+            if r.status_code in (429, 503):
+                return SOBRECARGA, None, retry_after
+            if r.status_code >= 500:
+                return ERROR, None, retry_after
+            print(f"Error crítico {r.status_code}")
+            return FALLO_CLIENTE, None, retry_after
         except Exception as e:
             print(f"Error de red: {e}")
-        return None
+            return ERROR, None, None
+
+    async def _esperar(self, segundos):
+        # Espera interrumpible: detener() no tiene que aguardar al siguiente sondeo
+        try:
+            await asyncio.wait_for(self._parada.wait(), segundos)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _consumir(self):
+        async for actualizacion in self.transporte.recibir(self):
+            if actualizacion.completa:
+                delta = self.indice.aplicar(actualizacion.productos)
+            else:
+                delta = self.indice.aplicar_parcial(actualizacion.productos)
+            if delta:
+                await self._notificar(delta)
 
     async def iniciar(self):
         self.ejecutando = True
-        while self.ejecutando:
-            datos = await self._consultar()
-            if datos and datos != self.estado:
-                self.estado = datos
-                await self._notificar(datos)
-                self.intervalo = INT_BASE
-            else:
-                self.intervalo = min(self.intervalo + 5, INT_MAX)
-            await asyncio.sleep(self.intervalo)
+        self._parada.clear()
+        consumo = asyncio.create_task(self._consumir())
+        parada = asyncio.create_task(self._parada.wait())
+        try:
+            # Con SSE el transporte puede estar bloqueado leyendo el stream: detener() lo corta
+            await asyncio.wait({consumo, parada}, return_when=asyncio.FIRST_COMPLETED)
+            if consumo.done():
+                consumo.result()  # Propaga errores del transporte
+        finally:
+            for tarea in (consumo, parada):
+                tarea.cancel()
+            await asyncio.gather(consumo, parada, return_exceptions=True)
+            await self.cerrar()
+
+    def detener(self):
+        self.ejecutando = False
+        self._parada.set()
+        print("Cierre suave iniciado...")
+
+    async def cerrar(self):
+        # Primero se vacían los buzones, luego los observadores (lo pendiente usa el pool), luego el pool
+        await asyncio.gather(*(b.cerrar() for b in self._buzones.values()))
+        for obs in self.observers:
+            if hasattr(obs, "cerrar"):
+                await obs.cerrar()
+        # Solo se cierra el pool si lo creó el monitor; uno inyectado es de quien lo pasó
+        if self._client_propio and not self.client.is_closed:
+            await self.client.aclose()
 
 
 class ModuloCompras:
-    async def actualizar(self, inv):
-        for p in [x for x in inv['productos'] if x['status'] == "BAJO_MINIMO"]:
+    async def actualizar(self, delta):
+        # Solo lo que acaba de entrar (o cambiar) bajo mínimo; el resto ya se pidió
+        for p in delta.con_estado(BAJO_MINIMO):
             print(f"[COMPRAS] Pedir: {p['nombre']}")
+        print(f"[COMPRAS] Total bajo mínimo: {len(delta.vista.con_estado(BAJO_MINIMO))}")
+
+@dataclass
+class MetricasPipeline:
+    encoladas: int = 0
+    coalescidas: int = 0  # Sustituyeron a una alerta pendiente del mismo producto
+    suprimidas: int = 0   # Mismo stock que la última alerta de ese producto
+    descartadas: int = 0  # Cola llena o pipeline cerrado
+    enviadas: int = 0
+    rechazadas: int = 0   # 4xx (p. ej. 422): no se reintentan
+    reintentos: int = 0
+    fallidas: int = 0     # Agotaron los reintentos
+    lotes: int = 0
+    latencia_flush: Histograma = field(default_factory=Histograma)
+
+class PipelineAlertas:
+    """
+    Etapa entre ModuloAlertas y POST /alertas:
+    - Cola acotada que agrupa por producto_id (la alerta nueva sustituye a la pendiente).
+    - No repite la alerta de un producto mientras su stock no cambie.
+    - Envía en lotes al llenarse `tamano_lote` o al pasar `intervalo_flush` segundos.
+      La API no tiene POST masivo: un lote es un grupo de POST concurrentes.
+    - Reintenta con backoff exponencial y jitter los fallos de red, excepciones y 5xx/429
+      del lote; si el servidor manda Retry-After se espera al menos eso (hasta INT_MAX).
+    `enviar(payload)` es una corrutina que devuelve el código HTTP o (código, Retry-After en s).
+    """
+
+    def __init__(self, enviar, tamano_lote=TAMANO_LOTE_ALERTAS, intervalo_flush=INTERVALO_FLUSH,
+                 max_cola=MAX_COLA_ALERTAS, max_reintentos=MAX_REINTENTOS_ALERTAS, backoff_base=0.5):
+        self.enviar = enviar
+        self.tamano_lote = tamano_lote
+        self.intervalo_flush = intervalo_flush
+        self.max_cola = max_cola
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.metricas = MetricasPipeline()
+        self._pendientes = {}     # producto_id -> payload, en orden de llegada
+        self._primera = None      # Instante de llegada de la alerta pendiente más antigua
+        self._ultimo_stock = {}   # producto_id -> stock de la última alerta aceptada
+        self._hay_datos = asyncio.Event()
+        self._lote_lleno = asyncio.Event()
+        self._cerrando = False
+        self._tarea = None
+
+    def profundidad(self):
+        return len(self._pendientes)
+
+    def encolar(self, payload) -> bool:
+        producto_id, stock = payload["producto_id"], payload["stock_actual"]
+        if self._ultimo_stock.get(producto_id) == stock:
+            self.metricas.suprimidas += 1
+            return False
+        if producto_id in self._pendientes:
+            self.metricas.coalescidas += 1
+        elif self._cerrando or len(self._pendientes) >= self.max_cola:
+            self.metricas.descartadas += 1
+            return False
+        self._pendientes[producto_id] = payload
+        self._ultimo_stock[producto_id] = stock
+        self.metricas.encoladas += 1
+        if self._primera is None:
+            self._primera = time.monotonic()
+        self._hay_datos.set()
+        if len(self._pendientes) >= self.tamano_lote:
+            self._lote_lleno.set()
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+        return True
+
+    def recuperado(self, producto_id):
+        """El producto ya no está bajo mínimo: si vuelve a caer, se alerta aunque el stock coincida."""
+        self._ultimo_stock.pop(producto_id, None)
+
+    async def _bucle(self):
+        while True:
+            if self._cerrando and not self._pendientes:
+                return
+            await self._hay_datos.wait()
+            if not self._pendientes:
+                # Despertado por cerrar() o tras un lote fallido con la cola ya vacía
+                self._hay_datos.clear()
+                continue
+            restante = self.intervalo_flush - (time.monotonic() - self._primera)
+            if not self._cerrando and len(self._pendientes) < self.tamano_lote and restante > 0:
+                try:
+                    await asyncio.wait_for(self._lote_lleno.wait(), restante)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self._flush()
+            except Exception as e:
+                # Un lote roto no puede dejar el resto de alertas sin enviar
+                print(f"Error enviando el lote de alertas: {e!r}")
+
+    async def _flush(self):
+        ids = list(self._pendientes)[:self.tamano_lote]
+        lote = [self._pendientes.pop(i) for i in ids]
+        if len(self._pendientes) < self.tamano_lote:
+            self._lote_lleno.clear()
+        if self._pendientes:
+            self._primera = time.monotonic()
+        else:
+            self._primera = None
+            self._hay_datos.clear()
+
+        inicio = time.monotonic()
+        self.metricas.lotes += 1
+        retry_after = 0.0
+        for intento in range(self.max_reintentos + 1):
+            if intento:
+                self.metricas.reintentos += len(lote)
+                backoff = self.backoff_base * 2 ** (intento - 1) * random.uniform(0.5, 1)
+                await asyncio.sleep(max(backoff, min(retry_after, INT_MAX)))
+            esperas = await asyncio.gather(*(self._enviar_uno(p) for p in lote))
+            lote = [p for p, espera in zip(lote, esperas) if espera is not None]
+            if not lote:
+                break
+            retry_after = max(e for e in esperas if e is not None)
+        for payload in lote:
+            self.metricas.fallidas += 1
+            # Sin confirmar: en el próximo cambio de inventario se vuelve a intentar
+            self._olvidar(payload)
+        self.metricas.latencia_flush.registrar(time.monotonic() - inicio)
+
+    async def _enviar_uno(self, payload):
+        """None si no hay que reintentar; si no, la espera mínima pedida con Retry-After (o 0)."""
+        try:
+            respuesta = await self.enviar(payload)
+        except Exception as e:
+            # Red, timeout o un fallo inesperado de `enviar`: se reintenta como un 5xx
+            print(f"Falló alerta {payload['producto_id']}: {e!r}")
+            return 0.0
+        estado, retry_after = respuesta if isinstance(respuesta, tuple) else (respuesta, None)
+        if estado < 400:
+            self.metricas.enviadas += 1
+            return None
+        if estado < 500 and estado != 429:
+            print(f"Alerta {payload['producto_id']} rechazada ({estado}), no se reintenta")
+            self.metricas.rechazadas += 1
+            self._olvidar(payload)
+            return None
+        return retry_after or 0.0
+
+    def _olvidar(self, payload):
+        # Solo si no ha llegado ya una alerta más reciente para ese producto
+        if self._ultimo_stock.get(payload["producto_id"]) == payload["stock_actual"]:
+            del self._ultimo_stock[payload["producto_id"]]
+
+    async def cerrar(self):
+        """Envía lo pendiente y termina el bucle."""
+        self._cerrando = True
+        self._hay_datos.set()
+        self._lote_lleno.set()
+        if self._tarea is not None:
+            await self._tarea
 
 class ModuloAlertas:
-    async def actualizar(self, inv):
-        bajos = [p for p in inv['productos'] if p['status'] == "BAJO_MINIMO"]
-        for p in bajos:
-            payload = {
+    def __init__(self, client, max_en_vuelo=MAX_ALERTAS_EN_VUELO, **opciones_pipeline):
+        self.client = client
+        self.semaforo = asyncio.Semaphore(max_en_vuelo)
+        self.pipeline = PipelineAlertas(self._post, **opciones_pipeline)
+
+    async def _post(self, payload):
+        # Como mucho max_en_vuelo POST a la vez sobre el pool compartido
+        async with self.semaforo:
+            r = await self.client.post(f"{URL}/alertas", json=payload, headers={"Authorization": f"Bearer {TOKEN}"})
+            return r.status_code, segundos_retry_after(r.headers.get("Retry-After"))
+
+    async def actualizar(self, delta):
+        for producto_id in delta.salieron_de(BAJO_MINIMO):
+            self.pipeline.recuperado(producto_id)
+        for p in delta.con_estado(BAJO_MINIMO):
+            self.pipeline.encolar({
                 "producto_id": p['id'], "stock_actual": p['stock'],
                 "stock_minimo": p.get('stock_minimo', 0), "timestamp": datetime.now().isoformat()
-            }
-            try:
-                async with httpx.AsyncClient() as c:
-                    await c.post(f"{URL}/alertas", json=payload, headers={"Authorization": f"Bearer {TOKEN}"})
-            except: pass 
+            })
+
+    async def cerrar(self):
+        await self.pipeline.cerrar()
 
 """Aqui es la ejecucion"""
 async def main():
     m = MonitorInventario()
-    m.observers = [ModuloCompras(), ModuloAlertas()]
+    m.suscribir(ModuloCompras())
+    m.suscribir(ModuloAlertas(m.client))
     await m.iniciar()
-    
-    def detener(self):
-        self.ejecutando = False
-        print("Cierre suave iniciado...")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,430 @@
+import asyncio
+import contextlib
+import random
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import examen1
+from examen1 import (BAJO_MINIMO, INT_MAX, Buzon, IndiceInventario, MonitorInventario, ModuloAlertas,
+                     PipelineAlertas, StreamNoAutorizado, TransporteAuto, TransportePolling, TransporteSSE)
+from planificador import CAMBIO, NO_MODIFICADO, PlanificadorSondeo
+from servidor_local import InventarioSimulado, crear_app
+
+def producto(pid, stock, nombre=None):
+    return {"id": pid, "nombre": nombre or pid, "stock": stock,
+            "status": BAJO_MINIMO if stock < 10 else "DISPONIBLE"}
+
+def alerta(producto_id, stock):
+    return {"producto_id": producto_id, "stock_actual": stock, "stock_minimo": 10,
+            "timestamp": "2024-01-01T00:00:00"}
+
+class Envios:
+    """`enviar` falso para PipelineAlertas: responde con los códigos dados (por defecto 201)."""
+    def __init__(self, *codigos):
+        self.codigos = list(codigos)
+        self.enviados = []
+
+    async def __call__(self, payload):
+        await asyncio.sleep(0)
+        self.enviados.append((payload["producto_id"], payload["stock_actual"]))
+        return self.codigos.pop(0) if self.codigos else 201
+
+class Recolector:
+    """Observador que guarda los deltas recibidos."""
+    def __init__(self):
+        self.deltas = []
+
+    async def actualizar(self, delta):
+        self.deltas.append(delta)
+
+    async def esperar(self, n, segundos=2):
+        async with asyncio.timeout(segundos):
+            while len(self.deltas) < n:
+                await asyncio.sleep(0.005)
+
+class Lento(Recolector):
+    """Tarda `segundos` en cada delta (o no termina nunca con segundos=None)."""
+    def __init__(self, segundos=None):
+        super().__init__()
+        self.segundos = segundos
+
+    async def actualizar(self, delta):
+        await asyncio.sleep(3600 if self.segundos is None else self.segundos)
+        await super().actualizar(delta)
+
+def deltas(n):
+    """n deltas consecutivos: el producto A cambia de stock en cada uno."""
+    indice = IndiceInventario()
+    indice.aplicar([producto("A", 0)])
+    return [indice.aplicar([producto("A", i)]) for i in range(1, n + 1)]
+
+@contextlib.asynccontextmanager
+async def arrancar(monkeypatch, sse=True):
+    """Inventario local (semana3/servidor_local.py); anota el puerto de cada conexión cliente."""
+    inventario = InventarioSimulado(n_productos=20)
+    app = crear_app(inventario, sse=sse)
+    puertos = set()
+
+    @web.middleware
+    async def anotar(request, handler):
+        puertos.add(request.transport.get_extra_info("peername")[1])
+        return await handler(request)
+
+    app.middlewares.append(anotar)
+    async with TestServer(app) as srv:
+        monkeypatch.setattr(examen1, "URL", str(srv.make_url("/api/v1")))
+        yield inventario, puertos
+
+@pytest_asyncio.fixture
+async def servidor(monkeypatch):
+    async with arrancar(monkeypatch) as datos:
+        yield datos
+
+@pytest.mark.asyncio
+class TestPoolCompartido:
+
+    async def test_sondeos_y_alertas_reutilizan_la_conexion(self, servidor):
+        inventario, puertos = servidor
+        m = MonitorInventario()
+        alertas = ModuloAlertas(m.client, tamano_lote=1, intervalo_flush=0)
+        assert (await m._consultar())[0] == CAMBIO
+        assert (await m._consultar())[0] == NO_MODIFICADO  # If-None-Match -> 304
+        alertas.pipeline.encolar({"producto_id": "PROD-001", "stock_actual": 1,
+                                  "stock_minimo": 10, "timestamp": "2024-01-01T00:00:00"})
+        await alertas.cerrar()
+        await m.cerrar()
+        assert alertas.pipeline.metricas.enviadas == 1 and inventario.peticiones["alertas"] == 1
+        assert len(puertos) == 1
+        assert m.client.is_closed
+
+    async def test_cliente_inyectado_no_se_cierra(self, servidor):
+        async with httpx.AsyncClient() as client:
+            m = MonitorInventario(client=client)
+            assert (await m._consultar())[0] == CAMBIO
+            await m.cerrar()
+            assert not client.is_closed
+
+@pytest.mark.asyncio
+class TestPipelineAlertas:
+
+    async def test_deduplica_y_agrupa_por_producto(self):
+        envios = Envios()
+        p = PipelineAlertas(envios, tamano_lote=10, intervalo_flush=10)
+        assert p.encolar(alerta("A", 5))
+        assert not p.encolar(alerta("A", 5))  # Mismo stock: suprimida
+        assert p.encolar(alerta("A", 3))      # Sustituye a la pendiente
+        assert p.encolar(alerta("B", 1))
+        assert p.profundidad() == 2
+        await p.cerrar()
+        assert envios.enviados == [("A", 3), ("B", 1)]
+        assert (p.metricas.suprimidas, p.metricas.coalescidas, p.metricas.enviadas) == (1, 1, 2)
+
+    async def test_no_repite_hasta_que_se_recupera(self):
+        envios = Envios()
+        p = PipelineAlertas(envios, tamano_lote=1, intervalo_flush=0)
+        p.encolar(alerta("A", 5))
+        await asyncio.sleep(0.01)
+        assert not p.encolar(alerta("A", 5))
+        p.recuperado("A")
+        assert p.encolar(alerta("A", 5))
+        await p.cerrar()
+        assert envios.enviados == [("A", 5), ("A", 5)]
+
+    async def test_lotes_por_tamano_e_intervalo(self):
+        envios = Envios()
+        p = PipelineAlertas(envios, tamano_lote=3, intervalo_flush=0.05)
+        for i in range(7):
+            p.encolar(alerta(f"P{i}", i))
+        await asyncio.sleep(0.01)
+        assert len(envios.enviados) == 6  # Dos lotes llenos, sin esperar al intervalo
+        await asyncio.sleep(0.1)
+        assert len(envios.enviados) == 7  # El resto, al vencer el intervalo
+        assert p.metricas.lotes == 3
+        await p.cerrar()
+
+    async def test_reintenta_5xx_y_no_reintenta_422(self):
+        envios = Envios(503, 422)
+        p = PipelineAlertas(envios, tamano_lote=2, intervalo_flush=10, backoff_base=0.001)
+        p.encolar(alerta("A", 1))
+        p.encolar(alerta("B", 1))
+        await asyncio.sleep(0.05)
+        assert envios.enviados == [("A", 1), ("B", 1), ("A", 1)]
+        assert (p.metricas.reintentos, p.metricas.rechazadas, p.metricas.enviadas) == (1, 1, 1)
+        assert p.encolar(alerta("B", 1))      # Rechazada: se puede volver a alertar
+        assert not p.encolar(alerta("A", 1))  # Enviada: no se repite
+        await p.cerrar()
+
+    async def test_agota_reintentos_y_olvida_la_alerta(self):
+        p = PipelineAlertas(Envios(500, 500, 500), tamano_lote=1, intervalo_flush=10,
+                            max_reintentos=2, backoff_base=0.001)
+        p.encolar(alerta("A", 1))
+        await asyncio.sleep(0.05)
+        assert p.metricas.fallidas == 1 and p.metricas.reintentos == 2
+        assert p.encolar(alerta("A", 1))  # Sin confirmar: se vuelve a intentar
+        await p.cerrar()
+        assert p.metricas.enviadas == 1
+
+    async def test_una_excepcion_de_enviar_no_para_el_pipeline(self):
+        envios = Envios()
+        fallos = [RuntimeError("roto")]
+
+        async def enviar(payload):
+            if fallos:
+                raise fallos.pop()
+            return await envios(payload)
+
+        p = PipelineAlertas(enviar, tamano_lote=1, intervalo_flush=0, backoff_base=0.001)
+        p.encolar(alerta("A", 1))
+        await asyncio.sleep(0.05)
+        assert envios.enviados == [("A", 1)] and p.metricas.reintentos == 1
+        p.encolar(alerta("B", 1))
+        await asyncio.sleep(0.05)
+        assert envios.enviados == [("A", 1), ("B", 1)] and p.profundidad() == 0
+        await asyncio.wait_for(p.cerrar(), 1)
+
+    async def test_un_lote_roto_no_mata_el_bucle(self, monkeypatch):
+        envios = Envios()
+        p = PipelineAlertas(envios, tamano_lote=1, intervalo_flush=0)
+        flush = p._flush
+        fallos = [RuntimeError("roto")]
+
+        async def flush_fragil():
+            if fallos:
+                p._pendientes.clear()
+                raise fallos.pop()
+            await flush()
+
+        monkeypatch.setattr(p, "_flush", flush_fragil)
+        p.encolar(alerta("A", 1))
+        await asyncio.sleep(0.01)
+        assert not p._tarea.done()
+        p.encolar(alerta("B", 1))
+        await asyncio.wait_for(p.cerrar(), 1)
+        assert envios.enviados == [("B", 1)]
+
+    async def test_429_respeta_retry_after(self):
+        envios = Envios((429, 0.1), 201)
+        p = PipelineAlertas(envios, tamano_lote=1, intervalo_flush=0, backoff_base=0.001)
+        inicio = time.monotonic()
+        p.encolar(alerta("A", 1))
+        await asyncio.wait_for(p.cerrar(), 1)
+        assert time.monotonic() - inicio >= 0.1
+        assert envios.enviados == [("A", 1), ("A", 1)] and p.metricas.enviadas == 1
+
+    async def test_cerrar_con_la_cola_vacia(self):
+        envios = Envios()
+        p = PipelineAlertas(envios, tamano_lote=1, intervalo_flush=0)
+        await p.cerrar()  # Sin tarea
+        p = PipelineAlertas(envios, tamano_lote=1, intervalo_flush=0)
+        p.encolar(alerta("A", 1))
+        await asyncio.sleep(0.01)
+        assert p.profundidad() == 0
+        await asyncio.wait_for(p.cerrar(), 1)  # Tarea viva esperando con la cola vacía
+        assert not p.encolar(alerta("B", 1))   # Cerrado: se descarta
+        assert p.metricas.descartadas == 1
+
+    async def test_modulo_alertas_contra_el_servidor(self, servidor):
+        inventario, _ = servidor
+        async with httpx.AsyncClient() as client:
+            modulo = ModuloAlertas(client, max_en_vuelo=2, tamano_lote=5, intervalo_flush=10)
+            for i in range(12):
+                modulo.pipeline.encolar(alerta(f"PROD-{i:03d}", 1))
+            await modulo.cerrar()
+        assert modulo.pipeline.metricas.enviadas == 12 and modulo.pipeline.metricas.lotes == 3
+        assert inventario.peticiones["alertas"] == 12
+
+class TestDelta:
+
+    def test_aplicar_calcula_el_delta(self):
+        indice = IndiceInventario()
+        primero = indice.aplicar([producto("A", 50), producto("B", 5), producto("C", 20)])
+        assert sorted(primero.agregados) == ["A", "B", "C"] and not primero.eliminados
+        delta = indice.aplicar([producto("A", 3), producto("B", 5, "Otro"), producto("D", 1)])
+        assert list(delta.agregados) == ["D"]
+        assert list(delta.eliminados) == ["C"]
+        assert delta.cambiados["A"].campos == {"stock", "status"}
+        assert delta.cambiados["B"].campos == {"nombre"}
+        # Agregados o cambiados que ahora están bajo mínimo (B cambió de nombre)
+        assert sorted(p["id"] for p in delta.con_estado(BAJO_MINIMO)) == ["A", "B", "D"]
+        assert list(delta.salieron_de(BAJO_MINIMO)) == []
+        assert sorted(delta.vista.con_estado(BAJO_MINIMO)) == ["A", "B", "D"]
+        assert not indice.aplicar([producto("A", 3), producto("B", 5, "Otro"), producto("D", 1)])
+
+    def test_salieron_de(self):
+        indice = IndiceInventario()
+        indice.aplicar([producto("A", 1), producto("B", 1), producto("C", 1)])
+        delta = indice.aplicar([producto("A", 50), producto("B", 2)])
+        assert sorted(delta.salieron_de(BAJO_MINIMO)) == ["A", "C"]
+        assert sorted(indice.con_estado(BAJO_MINIMO)) == ["B"]
+
+    def test_aplicar_parcial_no_elimina(self):
+        indice = IndiceInventario()
+        indice.aplicar([producto("A", 1), producto("B", 50)])
+        delta = indice.aplicar_parcial([producto("B", 2)])
+        assert list(delta.cambiados) == ["B"] and not delta.eliminados
+        assert sorted(indice.productos) == ["A", "B"]
+
+    def test_fusionar_equivale_al_diff_directo(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            instantaneas = [[producto(f"P{i}", rng.randint(0, 20)) for i in range(6) if rng.random() < 0.7]
+                            for _ in range(rng.randint(2, 5))]
+            indice = IndiceInventario()
+            indice.aplicar(instantaneas[0])
+            fusionado = indice.aplicar(instantaneas[1])
+            for instantanea in instantaneas[2:]:
+                fusionado = fusionado.fusionar(indice.aplicar(instantanea))
+            directo = IndiceInventario()
+            directo.aplicar(instantaneas[0])
+            esperado = directo.aplicar(instantaneas[-1])
+            assert fusionado.agregados == esperado.agregados
+            assert fusionado.eliminados == esperado.eliminados
+            assert fusionado.cambiados == esperado.cambiados
+            assert fusionado.vista is indice
+
+@pytest.mark.asyncio
+class TestTransporteAuto:
+
+    async def monitor_en_marcha(self, inventario):
+        transporte = TransporteAuto(polling=TransportePolling(PlanificadorSondeo(0.01, 0.05, jitter="ninguno")))
+        m = MonitorInventario(transporte=transporte)
+        recolector = Recolector()
+        m.suscribir(recolector)
+        tarea = asyncio.create_task(m.iniciar())
+        await recolector.esperar(1)
+        assert len(recolector.deltas[0].agregados) == 20
+        inventario.cambiar_stock("PROD-001", inventario.productos["PROD-001"]["stock"] + 1)
+        await recolector.esperar(2)
+        m.detener()
+        await asyncio.wait_for(tarea, 2)
+        assert list(recolector.deltas[1].cambiados) == ["PROD-001"]
+        assert m.client.is_closed
+        return transporte
+
+    async def test_usa_sse_si_el_servidor_lo_ofrece(self, monkeypatch):
+        async with arrancar(monkeypatch) as (inventario, _):
+            transporte = await self.monitor_en_marcha(inventario)
+        assert transporte.activo is transporte.sse
+        assert inventario.peticiones["stream"] == 1 and inventario.peticiones["inventario"] == 0
+
+    async def test_sin_sse_vuelve_al_polling(self, monkeypatch):
+        async with arrancar(monkeypatch, sse=False) as (inventario, _):
+            transporte = await self.monitor_en_marcha(inventario)
+        assert transporte.activo is transporte.polling
+        assert inventario.peticiones["inventario"] >= 2 and inventario.peticiones["stream"] == 0
+
+@pytest.mark.asyncio
+class TestReconexionSSE:
+
+    async def esperas_con(self, monkeypatch, respuestas, intentos):
+        """Recorre TransporteSSE contra un stream que responde `respuestas` (estado, Retry-After)."""
+        pendientes = list(respuestas)
+
+        async def stream(request):
+            estado, retry_after = pendientes.pop(0)
+            return web.Response(status=estado, headers={"Retry-After": retry_after} if retry_after else {})
+
+        app = web.Application()
+        app.router.add_get("/api/v1/inventario/stream", stream)
+        esperas = []
+
+        async def esperar(segundos):
+            esperas.append(segundos)
+            monitor.ejecutando = len(esperas) < intentos
+
+        async with TestServer(app) as servidor, httpx.AsyncClient() as client:
+            monkeypatch.setattr(examen1, "URL", str(servidor.make_url("/api/v1")))
+            monitor = SimpleNamespace(ejecutando=True, client=client, _esperar=esperar)
+            async for _ in TransporteSSE(reintento=1).recibir(monitor):
+                pass
+        return esperas, pendientes
+
+    async def test_backoff_exponencial_y_retry_after(self, monkeypatch):
+        esperas, _ = await self.esperas_con(monkeypatch, [(500, None)] * 3 + [(503, "7")], 4)
+        assert esperas[0] == 1
+        assert 1 <= esperas[1] <= 2 and 2 <= esperas[2] <= 4
+        assert 7 <= esperas[3] <= 8  # Backoff de 8 s * jitter, nunca menos que Retry-After
+
+    async def test_no_reintenta_sin_autorizacion(self, monkeypatch):
+        with pytest.raises(StreamNoAutorizado):
+            await self.esperas_con(monkeypatch, [(401, None), (200, None)], 5)
+
+    async def test_tope_y_reinicio_tras_conectar(self):
+        sse = TransporteSSE(reintento=1)
+        sse.fallos = 20
+        assert INT_MAX / 2 <= sse._espera() <= INT_MAX
+        sse.fallos = 0  # Lo que hace recibir() al abrir el stream
+        assert sse._espera() == 1
+
+@pytest.mark.asyncio
+class TestBuzones:
+
+    async def test_buzon_lleno_fusiona_sin_perder_cambios(self):
+        lento = Lento(0.05)
+        buzon = Buzon(lento, capacidad=1)
+        for d in deltas(5):
+            buzon.entregar(d)
+            await asyncio.sleep(0.001)  # Como entre dos sondeos
+        await buzon.cerrar()
+        # El primero ya estaba en curso; los otros cuatro quedan en un único delta fusionado
+        assert len(lento.deltas) == 2 and buzon.metricas.fusionados == 3
+        assert lento.deltas[-1].cambiados["A"].anterior["stock"] == 1
+        assert lento.deltas[-1].cambiados["A"].actual["stock"] == 5
+
+    async def test_politica_descartar(self):
+        lento = Lento(0.05)
+        buzon = Buzon(lento, capacidad=1, politica="descartar")
+        for d in deltas(5):
+            buzon.entregar(d)
+            await asyncio.sleep(0.001)  # Como entre dos sondeos
+        await buzon.cerrar()
+        assert len(lento.deltas) == 2 and buzon.metricas.descartados == 3
+        assert lento.deltas[-1].cambiados["A"].actual["stock"] == 5
+
+    async def test_observador_colgado_no_bloquea_a_los_demas(self):
+        m = MonitorInventario()
+        rapido, lento, colgado = Recolector(), Lento(0.05), Lento()
+        m.suscribir(rapido)
+        m.suscribir(lento)
+        m.suscribir(colgado, timeout=0.1)
+        for d in deltas(10):
+            inicio = time.monotonic()
+            await m._notificar(d)
+            assert time.monotonic() - inicio < 0.01  # _notificar no espera a nadie
+            await asyncio.sleep(0.001)  # Como entre dos sondeos
+        await rapido.esperar(10, 0.1)
+        await m.cerrar()
+        metricas = m.metricas_observadores()
+        assert metricas["Recolector"].entregas == 10
+        assert len(lento.deltas) == 2 and lento.deltas[-1].cambiados["A"].actual["stock"] == 10
+        # Dos observadores de la misma clase: cada uno con su entrada
+        assert metricas["Lento"].timeouts == 0 and metricas["Lento"].entregas == 2
+        assert metricas["Lento-2"].timeouts >= 1 and not colgado.deltas
+
+    async def test_nombres_de_observadores(self):
+        m = MonitorInventario()
+        a, b, c = Recolector(), Recolector(), Recolector()
+        m.suscribir(a)
+        m.suscribir(b, nombre="compras")
+        m.suscribir(c)
+        with pytest.raises(ValueError):
+            m.suscribir(Recolector(), nombre="compras")
+        assert list(m.metricas_observadores()) == ["Recolector", "compras", "Recolector-2"]
+        await m.cerrar()
+
+    async def test_observador_que_falla_se_cuenta(self):
+        class Roto:
+            async def actualizar(self, delta):
+                raise ValueError("roto")
+
+        m = MonitorInventario()
+        roto, rapido = Roto(), Recolector()
+        m.observers = [roto, rapido]  # Asignación directa: buzones por defecto
+        await m._notificar(deltas(1)[0])
+        await m.cerrar()
+        assert m.metricas_observadores()["Roto"].fallos == 1
+        assert len(rapido.deltas) == 1
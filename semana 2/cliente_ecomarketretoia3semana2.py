@@ -1,4 +1,19 @@
+import os
+import sys
 import requests
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Utilidades compartidas con el cliente asíncrono (semana3)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "semana3"))
+from lotes import procesar_lote, ResumenLote
+from json_incremental import ParserArrayJSON
+from paginacion import Paginador
+from cache_http import CacheHTTP
+from reintentos import AdaptadorRequests, PoliticaReintentos
+from metricas import REGISTRO, hook_requests
+from validador_compilado import validar_producto
+
+TAMANO_TROZO = 64 * 1024
 
 BASE_URL = "http://localhost:3000/api"
 
@@ -11,61 +26,249 @@ class RecursoNoEncontrado(EcoMarketError):
 class ConflictoRecurso(EcoMarketError):
     pass
 
+class _ContarReconexiones:
+    """
+    num_connections de urllib3 solo cuenta objetos de conexión nuevos: si el servidor
+    cierra la conexión (p. ej. Connection: close), urllib3 reconecta el mismo objeto.
+    """
+    reconexiones = 0
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        if conn.is_closed and getattr(conn, "_usada", False):
+            self.reconexiones += 1
+        conn._usada = True
+        return conn
+
+class _PoolHTTP(_ContarReconexiones, HTTPConnectionPool):
+    pass
+
+class _PoolHTTPS(_ContarReconexiones, HTTPSConnectionPool):
+    pass
+
+class ClienteEcoMarket:
+    """
+    Cliente síncrono con una requests.Session persistente.
+    Reutiliza conexiones TCP/TLS entre llamadas en lugar de abrir una por petición.
+    """
+
+    def __init__(self, base_url=None, pool_hosts=10, pool_por_host=10,
+                 bloquear_si_lleno=False, keep_alive=True, cache: CacheHTTP = None,
+                 reintentos: PoliticaReintentos = None):
+        self.base_url = (base_url or BASE_URL).rstrip("/")
+        self.cache = cache
+        self.session = requests.Session()
+        # pool_connections = hosts distintos en caché, pool_maxsize = conexiones por host.
+        # Con pool_block=True el límite por host es estricto (se espera un slot libre).
+        # Errores de conexión y 429/5xx se reintentan con backoff (sin reintentos:
+        # PoliticaReintentos(max_intentos=1)); los POST llevan Idempotency-Key.
+        self.adapter = AdaptadorRequests(
+            politica=reintentos,
+            pool_connections=pool_hosts,
+            pool_maxsize=pool_por_host,
+            pool_block=bloquear_si_lleno
+        )
+        self.adapter.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTP, "https": _PoolHTTPS}
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+        # Latencia por endpoint/estado en metricas.REGISTRO (solo si están activas al crear el cliente)
+        if REGISTRO.activo:
+            self.session.hooks["response"].append(hook_requests("cliente_sync"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def cerrar(self):
+        self.session.close()
+
+    def metricas_conexiones(self) -> dict:
+        """Conexiones creadas vs. reutilizadas según los pools de urllib3 vivos."""
+        creadas = peticiones = 0
+        pools = self.adapter.poolmanager.pools
+        for clave in pools.keys():
+            pool = pools.get(clave)
+            if pool is None:
+                continue
+            creadas += pool.num_connections + getattr(pool, "reconexiones", 0)
+            peticiones += pool.num_requests
+        return {
+            "creadas": creadas,
+            "reutilizadas": max(peticiones - creadas, 0),
+            "peticiones": peticiones
+        }
+
+    def _get(self, url, params=None):
+        """GET que pasa por la caché HTTP cuando el cliente tiene una configurada."""
+        if self.cache is None:
+            return self.session.get(url, params=params)
+        url = requests.Request("GET", url, params=params).prepare().url
+
+        def pedir(cabeceras_extra):
+            response = self.session.get(url, headers=cabeceras_extra)
+            return response.status_code, response.headers, response.content
+
+        return self.cache.consultar(url, self.session.headers, pedir)
+
+    def _invalidar(self, producto_id=None):
+        if self.cache is not None:
+            self.cache.invalidar(f"{self.base_url}/productos")
+            if producto_id is not None:
+                self.cache.invalidar(f"{self.base_url}/productos/{producto_id}")
+
+    def listar_productos(self) -> list:
+        url = f"{self.base_url}/productos"
+        response = self._get(url)
+        if response.status_code != 200:
+            raise EcoMarketError("Error al listar productos")
+        return response.json()
+
+    def iter_productos(self, validar=True):
+        """
+        Igual que listar_productos pero en streaming: rinde cada producto en cuanto
+        llega, sin cargar el listado completo en memoria.
+        """
+        url = f"{self.base_url}/productos"
+        with self.session.get(url, stream=True) as response:
+            if response.status_code != 200:
+                raise EcoMarketError("Error al listar productos")
+            parser = ParserArrayJSON()
+            for trozo in response.iter_content(chunk_size=TAMANO_TROZO):
+                for producto in parser.alimentar(trozo):
+                    yield validar_producto(producto) if validar else producto
+            for producto in parser.terminar():
+                yield validar_producto(producto) if validar else producto
+
+    def obtener_pagina(self, ruta: str, numero: int, limite: int, params=None) -> list:
+        url = f"{self.base_url}{ruta}"
+        response = self._get(url, params={**(params or {}), "page": numero, "limit": limite})
+        if response.status_code != 200:
+            raise EcoMarketError(f"Error al obtener la página {numero} de {ruta}")
+        return response.json()
+
+    def paginar(self, ruta="/productos", limite=100, ventana=3, max_items_en_memoria=5000,
+                params=None, max_paginas=None) -> Paginador:
+        """Recorre /productos, /productores o /pedidos página a página con lectura anticipada."""
+        return Paginador(
+            lambda numero: self.obtener_pagina(ruta, numero, limite, params),
+            limite, ventana, max_items_en_memoria, max_paginas=max_paginas
+        )
+
+    def obtener_producto(self, producto_id: int) -> dict:
+        url = f"{self.base_url}/productos/{producto_id}"
+        response = self._get(url)
+        if response.status_code == 404:
+            raise RecursoNoEncontrado("Producto no encontrado")
+        if response.status_code != 200:
+            raise EcoMarketError("Error al obtener producto")
+        return response.json()
+
+    def crear_producto(self, datos: dict) -> dict:
+        url = f"{self.base_url}/productos"
+        headers = {"Content-Type": "application/json"}
+        response = self.session.post(url, json=datos, headers=headers)
+        self._invalidar()
+        if response.status_code == 409:
+            raise ConflictoRecurso("Producto duplicado")
+        if response.status_code != 201:
+            raise EcoMarketError("Error al crear producto")
+        return response.json()
+
+    def actualizar_producto_total(self, producto_id: int, datos: dict) -> dict:
+        url = f"{self.base_url}/productos/{producto_id}"
+        headers = {"Content-Type": "application/json"}
+        response = self.session.put(url, json=datos, headers=headers)
+        self._invalidar(producto_id)
+        if response.status_code == 404:
+            raise RecursoNoEncontrado("Producto no encontrado")
+        if response.status_code == 409:
+            raise ConflictoRecurso("Conflicto al actualizar producto")
+        if response.status_code != 200:
+            raise EcoMarketError("Error al actualizar producto")
+        return response.json()
+
+    def actualizar_producto_parcial(self, producto_id: int, campos: dict) -> dict:
+        url = f"{self.base_url}/productos/{producto_id}"
+        headers = {"Content-Type": "application/json"}
+        response = self.session.patch(url, json=campos, headers=headers)
+        self._invalidar(producto_id)
+        if response.status_code == 404:
+            raise RecursoNoEncontrado("Producto no encontrado")
+        if response.status_code == 409:
+            raise ConflictoRecurso("Conflicto al actualizar producto")
+        if response.status_code != 200:
+            raise EcoMarketError("Error en actualización parcial")
+        return response.json()
+
+    def eliminar_producto(self, producto_id: int) -> bool:
+        url = f"{self.base_url}/productos/{producto_id}"
+        response = self.session.delete(url)
+        self._invalidar(producto_id)
+        if response.status_code == 404:
+            raise RecursoNoEncontrado("Producto no existe")
+        if response.status_code != 204:
+            raise EcoMarketError("Error al eliminar producto")
+        return True
+
+    # --- Operaciones por lotes ---
+    # Conviene que max_concurrencia no supere pool_por_host para no abrir conexiones extra.
+    def crear_productos_lote(self, productos, tamano_lote=100, max_concurrencia=5,
+                             al_resultado=None) -> ResumenLote:
+        return procesar_lote(self.crear_producto, productos, tamano_lote,
+                             max_concurrencia, ConflictoRecurso, al_resultado)
+
+    def actualizar_lote(self, cambios, tamano_lote=100, max_concurrencia=5,
+                        al_resultado=None) -> ResumenLote:
+        """`cambios` es un iterable de tuplas (producto_id, campos)."""
+        return procesar_lote(lambda c: self.actualizar_producto_parcial(*c), cambios,
+                             tamano_lote, max_concurrencia, ConflictoRecurso, al_resultado)
+
+    def eliminar_lote(self, producto_ids, tamano_lote=100, max_concurrencia=5,
+                      al_resultado=None) -> ResumenLote:
+        return procesar_lote(self.eliminar_producto, producto_ids, tamano_lote,
+                             max_concurrencia, ConflictoRecurso, al_resultado)
+
+# --- Funciones de módulo: envoltorios sobre un cliente por defecto ---
+_cliente_por_defecto = None
+
+def obtener_cliente() -> ClienteEcoMarket:
+    global _cliente_por_defecto
+    if _cliente_por_defecto is None:
+        _cliente_por_defecto = ClienteEcoMarket()
+    return _cliente_por_defecto
+
 def listar_productos() -> list:
-    url = f"{BASE_URL}/productos"
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise EcoMarketError("Error al listar productos")
-    return response.json()
+    return obtener_cliente().listar_productos()
+
+def iter_productos(validar=True):
+    return obtener_cliente().iter_productos(validar)
+
+def paginar(ruta="/productos", **opciones) -> Paginador:
+    return obtener_cliente().paginar(ruta, **opciones)
 
 def obtener_producto(producto_id: int) -> dict:
-    url = f"{BASE_URL}/productos/{producto_id}"
-    response = requests.get(url)
-    if response.status_code == 404:
-        raise RecursoNoEncontrado("Producto no encontrado")
-    if response.status_code != 200:
-        raise EcoMarketError("Error al obtener producto")
-    return response.json()
+    return obtener_cliente().obtener_producto(producto_id)
 
 def crear_producto(datos: dict) -> dict:
-    url = f"{BASE_URL}/productos"
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url, json=datos, headers=headers)
-    if response.status_code == 409:
-        raise ConflictoRecurso("Producto duplicado")
-    if response.status_code != 201:
-        raise EcoMarketError("Error al crear producto")
-    return response.json()
+    return obtener_cliente().crear_producto(datos)
 
 def actualizar_producto_total(producto_id: int, datos: dict) -> dict:
-    url = f"{BASE_URL}/productos/{producto_id}"
-    headers = {"Content-Type": "application/json"}
-    response = requests.put(url, json=datos, headers=headers)
-    if response.status_code == 404:
-        raise RecursoNoEncontrado("Producto no encontrado")
-    if response.status_code == 409:
-        raise ConflictoRecurso("Conflicto al actualizar producto")
-    if response.status_code != 200:
-        raise EcoMarketError("Error al actualizar producto")
-    return response.json()
+    return obtener_cliente().actualizar_producto_total(producto_id, datos)
 
 def actualizar_producto_parcial(producto_id: int, campos: dict) -> dict:
-    url = f"{BASE_URL}/productos/{producto_id}"
-    headers = {"Content-Type": "application/json"}
-    response = requests.patch(url, json=campos, headers=headers)
-    if response.status_code == 404:
-        raise RecursoNoEncontrado("Producto no encontrado")
-    if response.status_code == 409:
-        raise ConflictoRecurso("Conflicto al actualizar producto")
-    if response.status_code != 200:
-        raise EcoMarketError("Error en actualización parcial")
-    return response.json()
+    return obtener_cliente().actualizar_producto_parcial(producto_id, campos)
 
 def eliminar_producto(producto_id: int) -> bool:
-    url = f"{BASE_URL}/productos/{producto_id}"
-    response = requests.delete(url)
-    if response.status_code == 404:
-        raise RecursoNoEncontrado("Producto no existe")
-    if response.status_code != 204:
-        raise EcoMarketError("Error al eliminar producto")
-    return True
+    return obtener_cliente().eliminar_producto(producto_id)
+
+def crear_productos_lote(productos, **opciones) -> ResumenLote:
+    return obtener_cliente().crear_productos_lote(productos, **opciones)
+
+def actualizar_lote(cambios, **opciones) -> ResumenLote:
+    return obtener_cliente().actualizar_lote(cambios, **opciones)
+
+def eliminar_lote(producto_ids, **opciones) -> ResumenLote:
+    return obtener_cliente().eliminar_lote(producto_ids, **opciones)
@@ -0,0 +1,89 @@
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cliente_ecomarketretoia3semana2 import ClienteEcoMarket, RecursoNoEncontrado
+from reintentos import PoliticaReintentos
+
+PRODUCTOS = [{'id': i, 'nombre': f'P{i}', 'precio': 1 + i, 'categoria': 'miel', 'stock': i}
+             for i in range(1, 4)]
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive salvo que el cliente pida Connection: close
+    wbufsize = -1  # Cabeceras y cuerpo en un solo envío (sin esperar al ACK retardado)
+
+    def do_GET(self):
+        self.server.conexiones.add(self.client_address)
+        if self.path == '/api/productos':
+            self._responder(200, PRODUCTOS)
+        elif self.path == '/api/productos/1':
+            self._responder(200, PRODUCTOS[0])
+        else:
+            self._responder(404, {'error': 'no encontrado'})
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestClienteEcoMarket(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+        cls.servidor.daemon_threads = True
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.servidor.server_port}/api'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.servidor.conexiones = set()
+
+    def _cliente(self, **opciones):
+        cliente = ClienteEcoMarket(self.base_url, reintentos=PoliticaReintentos(max_intentos=1), **opciones)
+        self.addCleanup(cliente.cerrar)
+        return cliente
+
+    def test_reutiliza_la_conexion_entre_llamadas(self):
+        cliente = self._cliente()
+        self.assertEqual(cliente.listar_productos(), PRODUCTOS)
+        self.assertEqual(cliente.obtener_producto(1), PRODUCTOS[0])
+        with self.assertRaises(RecursoNoEncontrado):
+            cliente.obtener_producto(9)
+        self.assertEqual(cliente.listar_productos(), PRODUCTOS)
+        self.assertEqual(cliente.metricas_conexiones(), {'creadas': 1, 'reutilizadas': 3, 'peticiones': 4})
+        self.assertEqual(len(self.servidor.conexiones), 1)
+
+    def test_sin_keep_alive_abre_una_conexion_por_peticion(self):
+        cliente = self._cliente(keep_alive=False)
+        for _ in range(3):
+            cliente.listar_productos()
+        self.assertEqual(cliente.metricas_conexiones(), {'creadas': 3, 'reutilizadas': 0, 'peticiones': 3})
+        self.assertEqual(len(self.servidor.conexiones), 3)
+
+    def test_el_pool_por_host_limita_las_conexiones(self):
+        cliente = self._cliente(pool_por_host=2, bloquear_si_lleno=True)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: cliente.obtener_producto(1), range(30)))
+        metricas = cliente.metricas_conexiones()
+        self.assertEqual(metricas['peticiones'], 30)
+        self.assertLessEqual(metricas['creadas'], 2)
+        self.assertEqual(metricas['reutilizadas'], 30 - metricas['creadas'])
+        self.assertLessEqual(len(self.servidor.conexiones), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import validadoresretoia4semana2 as manual
+from validacion_columnar import validar_columnar, ErrorColumnar, ProductTable
+from validadoresretoia4semana2 import ValidationError
+
+
+def _producto(i, **cambios):
+    p = {'id': i, 'nombre': f'P{i}', 'precio': 1 + i, 'categoria': 'miel', 'stock': i}
+    p.update(cambios)
+    return p
+
+
+class TestValidacionColumnar(unittest.TestCase):
+
+    def test_listado_valido_devuelve_tabla(self):
+        tabla = validar_columnar([_producto(i) for i in range(5)])
+        self.assertIsInstance(tabla, ProductTable)
+        self.assertEqual(len(tabla), 5)
+        self.assertEqual(tabla.precio.dtype, np.float64)
+        self.assertEqual(tabla.fila(2)['categoria'], 'miel')
+
+    def test_no_modifica_los_dicts(self):
+        datos = [_producto(1)]
+        validar_columnar(datos)
+        self.assertIsInstance(datos[0]['precio'], int)
+
+    def test_mismos_motivos_que_validador_manual(self):
+        datos = [
+            _producto(0),
+            'no soy un dict',
+            {'id': 2, 'precio': 3, 'categoria': 'miel'},
+            _producto(3, id='3'),
+            _producto(4, precio=0),
+            _producto(5, precio='gratis'),
+            _producto(6, categoria='electronica'),
+            _producto(7, categoria=['miel']),
+            _producto(8),
+        ]
+        with self.assertRaises(ErrorColumnar) as ctx:
+            validar_columnar(datos)
+        for indice, motivo in ctx.exception.errores:
+            with self.subTest(indice=indice):
+                with self.assertRaises(ValidationError) as esperado:
+                    manual.validar_producto(dict(datos[indice]) if isinstance(datos[indice], dict) else datos[indice])
+                self.assertEqual(motivo, str(esperado.exception))
+        self.assertEqual([i for i, _ in ctx.exception.errores], [1, 2, 3, 4, 5, 6, 7])
+
+    def test_stock_no_entero(self):
+        with self.assertRaises(ErrorColumnar):
+            validar_columnar([_producto(1, stock='mucho')])
+
+    def test_enteros_fuera_de_int64_son_errores_de_fila(self):
+        datos = [_producto(0, id=2 ** 63), _producto(1), _producto(2, stock=-2 ** 63 - 1),
+                 _producto(3, id=2 ** 63 - 1, stock=-2 ** 63)]
+        with self.assertRaises(ErrorColumnar) as ctx:
+            validar_columnar(datos)
+        self.assertEqual(ctx.exception.errores, [
+            (0, "El campo 'id' no cabe en un entero de 64 bits."),
+            (2, "El campo 'stock' no cabe en un entero de 64 bits."),
+        ])
+        tabla = validar_columnar(datos[1:2] + datos[3:])
+        self.assertEqual(tabla.fila(1)['id'], 2 ** 63 - 1)
+        self.assertEqual(tabla.fila(1)['stock'], -2 ** 63)
+
+    def test_precio_fuera_de_float64_es_error_de_fila(self):
+        datos = [_producto(0, precio=10 ** 400), _producto(1, precio=10 ** 300), _producto(2, precio=-10 ** 400)]
+        with self.assertRaises(ErrorColumnar) as ctx:
+            validar_columnar(datos)
+        self.assertEqual(ctx.exception.errores, [
+            (0, "El campo 'precio' no cabe en un float de 64 bits."),
+            (2, "El campo 'precio' no cabe en un float de 64 bits."),
+        ])
+        self.assertEqual(validar_columnar(datos[1:2]).fila(0)['precio'], 1e300)
+
+    def test_no_es_lista(self):
+        with self.assertRaises(ValidationError):
+            validar_columnar({'id': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import copy
+import unittest
+import validadoresretoia4semana2 as manual
+from validador_compilado import (
+    validar_producto, validar_producto_input, validar_lista_productos, compilar_validador
+)
+from validadoresretoia4semana2 import ValidationError
+
+BASE = {
+    'id': 1,
+    'nombre': 'Manzana',
+    'precio': 10,
+    'categoria': 'frutas',
+    'disponible': True,
+    'descripcion': 'Roja',
+    'productor': {'id': 3, 'nombre': 'Granja'},
+    'creado_en': '2024-01-01T10:00:00Z'
+}
+
+# Cada caso modifica el producto base; None elimina el campo
+CASOS = [
+    {},
+    {'nombre': None},
+    {'categoria': None},
+    {'id': '1'},
+    {'nombre': 5},
+    {'precio': 'caro'},
+    {'precio': 0},
+    {'precio': -3.5},
+    {'categoria': 'electronica'},
+    {'categoria': ['frutas']},
+    {'disponible': 'si'},
+    {'descripcion': 1},
+    {'productor': 'Granja'},
+    {'productor': {'id': 3}},
+    {'productor': {'id': '3', 'nombre': 'Granja'}},
+    {'productor': {'id': 3, 'nombre': None}},
+    {'creado_en': 'ayer'},
+    {'creado_en': 20240101},
+]
+
+
+def _aplicar(cambios):
+    producto = copy.deepcopy(BASE)
+    for campo, valor in cambios.items():
+        if valor is None:
+            producto.pop(campo)
+        else:
+            producto[campo] = valor
+    return producto
+
+
+def _resultado(fn, producto):
+    try:
+        return fn(producto)
+    except ValidationError as e:
+        return str(e)
+
+
+class TestValidadorCompilado(unittest.TestCase):
+
+    def test_mismos_resultados_que_validador_manual(self):
+        for cambios in CASOS:
+            with self.subTest(cambios=cambios):
+                esperado = _resultado(manual.validar_producto, _aplicar(cambios))
+                obtenido = _resultado(validar_producto, _aplicar(cambios))
+                self.assertEqual(esperado, obtenido)
+
+    def test_camino_rapido_mismos_resultados(self):
+        # Con precio float los requeridos tienen el tipo exacto: solo se comprueban los opcionales
+        for cambios in CASOS:
+            cambios = {'precio': 10.5, **cambios}
+            with self.subTest(cambios=cambios):
+                esperado = _resultado(manual.validar_producto, _aplicar(cambios))
+                obtenido = _resultado(validar_producto, _aplicar(cambios))
+                self.assertEqual(esperado, obtenido)
+
+    def test_no_es_diccionario(self):
+        with self.assertRaises(ValidationError):
+            validar_producto([1, 2])
+
+    def test_precio_se_normaliza_a_float(self):
+        producto = validar_producto(_aplicar({}))
+        self.assertIsInstance(producto['precio'], float)
+
+    def test_no_modifica_si_falla(self):
+        producto = _aplicar({'categoria': 'electronica'})
+        with self.assertRaises(ValidationError):
+            validar_producto(producto)
+        self.assertIsInstance(producto['precio'], int)
+
+    def test_producto_input_campos_opcionales(self):
+        self.assertEqual(validar_producto_input({}), {})
+        with self.assertRaises(ValidationError):
+            validar_producto_input({'stock': 'muchos'})
+
+    def test_lista_no_es_lista(self):
+        with self.assertRaises(ValidationError):
+            validar_lista_productos({'id': 1})
+
+    def test_compilar_schema_propio(self):
+        validar = compilar_validador({
+            'type': 'object',
+            'required': ['productoId'],
+            'properties': {'productoId': {'type': 'integer'}}
+        })
+        self.assertEqual(validar({'productoId': 1}), {'productoId': 1})
+        with self.assertRaises(ValidationError):
+            validar({})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Validación columnar (NumPy) para listados grandes de productos.
+En lugar de validar dict por dict, se extraen las columnas id, nombre, precio,
+stock y categoria una sola vez y cada regla se comprueba con una pasada vectorizada.
+No modifica los dicts de entrada: el resultado es una ProductTable compacta.
+"""
+from dataclasses import dataclass
+from itertools import repeat
+from operator import is_
+import numpy as np
+from validadoresretoia4semana2 import ValidationError, CATEGORIAS_VALIDAS
+
+
+class _Falta:
+    pass
+
+_FALTA = _Falta()
+
+# Código de tipo por valor (se calcula con map(type, ...) sin bucles Python)
+OTRO, FALTA, ENTERO, REAL, BOOLEANO, TEXTO = range(6)
+_CODIGO_TIPO = {_Falta: FALTA, int: ENTERO, float: REAL, bool: BOOLEANO, str: TEXTO}
+_CODIGO_CATEGORIA = {c: i for i, c in enumerate(CATEGORIAS_VALIDAS)}
+
+# Mismo orden de comprobación (y mismos mensajes) que validar_producto
+_MENSAJES = [
+    "El producto debe ser un diccionario (dict).",
+    "Falta el campo requerido: 'id'.",
+    "Falta el campo requerido: 'nombre'.",
+    "Falta el campo requerido: 'precio'.",
+    "Falta el campo requerido: 'categoria'.",
+    "El campo 'id' debe ser de tipo int.",
+    "El campo 'id' no cabe en un entero de 64 bits.",
+    "El campo 'nombre' debe ser de tipo str.",
+    "El campo 'precio' debe ser numérico (float).",
+    "El campo 'precio' no cabe en un float de 64 bits.",
+    "El campo 'precio' debe ser mayor que 0.",
+    None,  # Categoría inválida: el mensaje incluye el valor de la fila
+    "El campo 'stock' debe ser int.",
+    "El campo 'stock' no cabe en un entero de 64 bits.",
+]
+_CATEGORIA = _MENSAJES.index(None)
+
+
+class ErrorColumnar(ValidationError):
+    """Listado con filas inválidas; `errores` es una lista de (indice, motivo)."""
+
+    def __init__(self, errores):
+        self.errores = errores
+        indice, motivo = errores[0]
+        super().__init__(f"{len(errores)} productos inválidos (fila {indice}: {motivo})")
+
+
+@dataclass
+class ProductTable:
+    id: np.ndarray         # int64
+    nombre: np.ndarray     # object (str)
+    precio: np.ndarray     # float64
+    stock: np.ndarray      # int64 (0 si no viene)
+    categoria: np.ndarray  # int8, índice en CATEGORIAS_VALIDAS
+
+    def __len__(self):
+        return len(self.id)
+
+    def nombres_categoria(self) -> np.ndarray:
+        return np.asarray(CATEGORIAS_VALIDAS, dtype=object)[self.categoria]
+
+    def fila(self, i) -> dict:
+        return {
+            "id": int(self.id[i]),
+            "nombre": self.nombre[i],
+            "precio": float(self.precio[i]),
+            "stock": int(self.stock[i]),
+            "categoria": CATEGORIAS_VALIDAS[self.categoria[i]],
+        }
+
+
+def _columna(filas, campo):
+    return list(map(dict.get, filas, repeat(campo), repeat(_FALTA)))
+
+
+def _tipos_invalidos(columna, permitidos, n):
+    """
+    Devuelve (falta, tipo_incorrecto) como máscaras booleanas, o (None, None) si
+    todos los tipos de la columna están permitidos: es el caso normal y se resuelve
+    con un set de tipos, sin construir ningún array por fila.
+    """
+    if set(map(type, columna)) <= permitidos:
+        return None, None
+    codigos = np.fromiter(map(_CODIGO_TIPO.get, map(type, columna), repeat(OTRO)), dtype=np.int8, count=n)
+    validos = [_CODIGO_TIPO[t] for t in permitidos]
+    return codigos == FALTA, ~np.isin(codigos, validos)
+
+
+def _es_falta(columna, n):
+    return np.fromiter(map(is_, columna, repeat(_FALTA)), dtype=bool, count=n)
+
+
+def _a_array(columna, invalidos, dtype):
+    if invalidos is not None and invalidos.any():
+        columna = [0 if malo else v for v, malo in zip(columna, invalidos.tolist())]
+    return np.array(columna, dtype=dtype)
+
+
+_INT64 = np.iinfo(np.int64)
+
+
+def _cabe_en_int64(valor):
+    return _INT64.min <= valor <= _INT64.max
+
+
+def _cabe_en_float(valor):
+    try:
+        float(valor)
+        return True
+    except OverflowError:
+        return False
+
+
+def _a_numeros(columna, invalidos, n, dtype, cabe):
+    """
+    Devuelve (array de `dtype`, fuera_de_rango). Los int de Python no tienen límite: si
+    NumPy rechaza la columna se marcan los int para los que `cabe` es falso y se
+    convierten a 0. En el caso normal fuera_de_rango es None y no se recorre nada más.
+    """
+    try:
+        return _a_array(columna, invalidos, dtype), None
+    except OverflowError:
+        fuera = np.fromiter((type(v) is int and not cabe(v) for v in columna), dtype=bool, count=n)
+        return _a_array(columna, fuera if invalidos is None else invalidos | fuera, dtype), fuera
+
+
+def _codigos_categoria(columna, n):
+    try:
+        return np.fromiter(map(_CODIGO_CATEGORIA.get, columna, repeat(-1)), dtype=np.int8, count=n)
+    except TypeError:
+        # Algún valor no hashable (p. ej. una lista): nunca es una categoría válida
+        return np.fromiter(
+            (_CODIGO_CATEGORIA.get(c, -1) if isinstance(c, str) else -1 for c in columna),
+            dtype=np.int8, count=n
+        )
+
+
+_ENTEROS = {int, bool}
+_NUMEROS = {int, float, bool}
+
+
+def validar_columnar(data: list) -> ProductTable:
+    if not isinstance(data, list):
+        raise ValidationError("La respuesta debe ser una lista de productos.")
+    n = len(data)
+
+    no_dict = None
+    filas = data
+    if not set(map(type, data)) <= {dict}:
+        no_dict = ~np.fromiter(map(isinstance, data, repeat(dict)), dtype=bool, count=n)
+        filas = [p if isinstance(p, dict) else {} for p in data]
+
+    ids, nombres, precios, stocks, categorias = (
+        _columna(filas, campo) for campo in ("id", "nombre", "precio", "stock", "categoria")
+    )
+    falta_id, mal_id = _tipos_invalidos(ids, _ENTEROS, n)
+    falta_nombre, mal_nombre = _tipos_invalidos(nombres, {str}, n)
+    falta_precio, mal_precio = _tipos_invalidos(precios, _NUMEROS, n)
+    _, mal_stock = _tipos_invalidos(stocks, _ENTEROS | {_Falta}, n)
+    # La categoría no necesita comprobación de tipo: solo valen los textos del enum
+    codigos = _codigos_categoria(categorias, n)
+    falta_cat = _es_falta(categorias, n) if (codigos < 0).any() else None
+
+    precio, fuera_precio = _a_numeros(precios, mal_precio, n, np.float64, _cabe_en_float)
+    id_, fuera_id = _a_numeros(ids, mal_id, n, np.int64, _cabe_en_int64)
+    falta_stock = _es_falta(stocks, n)
+    stock, fuera_stock = _a_numeros(stocks, falta_stock if mal_stock is None else falta_stock | mal_stock,
+                                    n, np.int64, _cabe_en_int64)
+    reglas = [
+        no_dict,
+        falta_id,
+        falta_nombre,
+        falta_precio,
+        falta_cat,
+        mal_id,
+        fuera_id,
+        mal_nombre,
+        mal_precio,
+        fuera_precio,
+        precio <= 0,
+        codigos < 0,
+        mal_stock,
+        fuera_stock,
+    ]
+    # Cada fila se queda con la primera regla que incumple, como en la versión manual
+    motivo = np.full(n, -1, dtype=np.int8)
+    for numero, mascara in enumerate(reglas):
+        if mascara is not None:
+            motivo[mascara & (motivo < 0)] = numero
+
+    invalidas = np.flatnonzero(motivo >= 0)
+    if invalidas.size:
+        errores = []
+        for i in invalidas.tolist():
+            if motivo[i] == _CATEGORIA:
+                mensaje = f"Categoria inválida '{categorias[i]}'. Debe estar en {CATEGORIAS_VALIDAS}."
+            else:
+                mensaje = _MENSAJES[motivo[i]]
+            errores.append((i, mensaje))
+        raise ErrorColumnar(errores)
+
+    return ProductTable(
+        id=id_,
+        nombre=np.array(nombres, dtype=object),
+        precio=precio,
+        stock=stock,
+        categoria=codigos,
+    )
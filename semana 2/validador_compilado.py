@@ -0,0 +1,268 @@
+"""
+Compilador de validadores a partir de los schemas de la especificación OpenAPI.
+Cada schema se traduce una sola vez a una función Python especializada (código
+generado + exec), con los enums como frozenset y sin imports dentro del cuerpo.
+Los mensajes de error son los mismos que los de validadoresretoia4semana2.
+"""
+import builtins
+import os
+from datetime import datetime
+import yaml
+from validadoresretoia4semana2 import ValidationError
+
+ESPECIFICACION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reto ia 1 semana 2.yaml")
+
+_FALTA = object()
+_BUILTINS = ("isinstance", "type", "float", "format", "int", "str", "bool", "dict", "list")
+
+# Nombre del tipo Python en los mensajes y tupla usada por isinstance
+_TIPOS = {
+    "integer": ("int", "int"),
+    "string": ("str", "str"),
+    "boolean": ("bool", "bool"),
+    "number": ("numérico (float)", "(int, float)"),
+    "object": ("un dict", "dict"),
+    "array": ("una lista (list)", "list"),
+}
+# Tipo exacto del camino rápido; int en "number" va por el lento (se convierte a float)
+_EXACTOS = {"integer": "int", "string": "str", "boolean": "bool", "number": "float"}
+
+
+def _fecha_valida(valor) -> bool:
+    if not isinstance(valor, str):
+        return False
+    try:
+        datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+
+class _Generador:
+    def __init__(self, especificacion):
+        self.especificacion = especificacion
+        self.lineas = []
+        self.constantes = {}
+        self.contador = 0
+        self.conversiones = {}  # campo de la raíz -> (variable, requerido)
+
+    def resolver(self, schema):
+        while "$ref" in schema:
+            ruta = schema["$ref"].lstrip("#/").split("/")
+            schema = self.especificacion
+            for parte in ruta:
+                schema = schema[parte]
+        return schema
+
+    def constante(self, valor):
+        nombre = f"_C{len(self.constantes)}"
+        self.constantes[nombre] = valor
+        return nombre
+
+    def variable(self):
+        self.contador += 1
+        return f"v{self.contador}"
+
+    def emitir(self, nivel, linea):
+        self.lineas.append("    " * nivel + linea)
+
+    def error(self, nivel, mensaje):
+        self.emitir(nivel, f"raise ValidationError({mensaje!r})")
+
+    def objeto(self, schema, var, ruta, nivel):
+        """Emite las comprobaciones de un objeto ya validado como dict."""
+        requeridos = schema.get("required", [])
+        propiedades = schema.get("properties", {})
+        raiz = not ruta
+        leidos = {}
+        if raiz and requeridos:
+            # Un único try (coste cero en el camino feliz) lee todos los requeridos en
+            # orden; la KeyError indica el primero que falta, como la versión manual
+            self.emitir(nivel, "try:")
+            for campo in requeridos:
+                leidos[campo] = self.variable()
+                self.emitir(nivel + 1, f"{leidos[campo]} = {var}[{campo!r}]")
+            self.emitir(nivel, "except KeyError as e:")
+            self.emitir(nivel + 1, "raise ValidationError(\"Falta el campo requerido: '\" + format(e.args[0]) + \"'.\") from None")
+        elif requeridos:
+            condicion = " or ".join(f"{c!r} not in {var}" for c in requeridos)
+            lista = " y ".join(f"'{c}'" for c in requeridos)
+            self.emitir(nivel, f"if {condicion}:")
+            self.error(nivel + 1, f"El campo '{ruta}' debe tener {lista}.")
+
+        if not raiz:
+            self.propiedades(propiedades, requeridos, leidos, {}, var, ruta, nivel)
+            return
+        # La misma variable por campo en las dos ramas del camino rápido
+        variables = {campo: leidos.get(campo) or self.variable() for campo in propiedades}
+        rapidas = [self.rapida(self.resolver(propiedades[c]), v) for c, v in leidos.items() if c in propiedades]
+        if rapidas and all(rapidas):
+            # Camino rápido: si los requeridos tienen exactamente el tipo esperado solo quedan
+            # los opcionales (y ningún float que convertir); si no, la secuencia de siempre
+            self.emitir(nivel, f"if {' and '.join(rapidas)}:")
+            self.propiedades(propiedades, requeridos, leidos, variables, var, ruta, nivel + 1, solo_opcionales=True)
+            self.convertir(var, nivel + 1)
+            self.emitir(nivel + 1, f"return {var}")
+        self.propiedades(propiedades, requeridos, leidos, variables, var, ruta, nivel)
+
+    def convertir(self, var, nivel):
+        """Emite (y consume) las conversiones a float pendientes de la raíz."""
+        for campo, (hijo, requerido) in self.conversiones.items():
+            if requerido:
+                self.emitir(nivel, f"if type({hijo}) is not float:")
+            else:
+                self.emitir(nivel, f"if {hijo} is not _FALTA and type({hijo}) is not float:")
+            self.emitir(nivel + 1, f"{var}[{campo!r}] = float({hijo})")
+        self.conversiones.clear()
+
+    def propiedades(self, propiedades, requeridos, leidos, variables, var, ruta, nivel, solo_opcionales=False):
+        raiz = not ruta
+        for campo, sub in propiedades.items():
+            sub = self.resolver(sub)
+            nombre = f"{ruta}.{campo}" if ruta else campo
+            if campo in requeridos and solo_opcionales:
+                continue
+            if campo in leidos:
+                self.valor(sub, leidos[campo], var, campo, nombre, raiz, nivel)
+            elif campo in requeridos:
+                hijo = variables.get(campo) or self.variable()
+                self.emitir(nivel, f"{hijo} = {var}[{campo!r}]")
+                self.valor(sub, hijo, var, campo, nombre, raiz, nivel)
+            else:
+                hijo = variables.get(campo) or self.variable()
+                self.emitir(nivel, f"{hijo} = {var}.get({campo!r}, _FALTA)")
+                self.emitir(nivel, f"if {hijo} is not _FALTA:")
+                self.valor(sub, hijo, var, campo, nombre, False, nivel + 1)
+                # Python no admite un bloque vacío
+                self.emitir(nivel + 1, "pass")
+
+    def rapida(self, schema, var):
+        """Condición de tipo exacto que implica que `var` cumple `schema`, o None si no la hay."""
+        if "enum" in schema:
+            if not all(isinstance(opcion, str) for opcion in schema["enum"]):
+                return None
+            return f"type({var}) is str and {var} in {self.constante(frozenset(schema['enum']))}"
+        tipo = schema.get("type")
+        if schema.get("format") == "date-time" or tipo not in _EXACTOS:
+            return None
+        condicion = f"type({var}) is {_EXACTOS[tipo]}"
+        if tipo == "number" and "minimum" in schema:
+            operador = ">" if schema.get("exclusiveMinimum") else ">="
+            condicion += f" and {var} {operador} {schema['minimum']!r}"
+        return condicion
+
+    def valor(self, schema, var, padre, campo, nombre, requerido_raiz, nivel):
+        tipo = schema.get("type")
+
+        if "enum" in schema:
+            # El enum ya restringe el tipo; se usa frozenset (O(1)) en vez de una lista
+            opciones = self.constante(frozenset(schema["enum"]))
+            etiqueta = (campo or nombre).capitalize() + " inválida '"
+            sufijo = f"'. Debe estar en {list(schema['enum'])}."
+            self.emitir(nivel, "try:")
+            self.emitir(nivel + 1, f"valido = {var} in {opciones}")
+            self.emitir(nivel, "except TypeError:")
+            self.emitir(nivel + 1, "valido = False")
+            self.emitir(nivel, "if not valido:")
+            self.emitir(nivel + 1, f"raise ValidationError({etiqueta!r} + format({var}) + {sufijo!r})")
+            return
+
+        if schema.get("format") == "date-time":
+            self.emitir(nivel, f"if not _fecha_valida({var}):")
+            self.error(nivel + 1, f"El campo '{nombre}' debe ser una fecha ISO 8601 válida.")
+            return
+
+        if tipo in _TIPOS:
+            texto, clases = _TIPOS[tipo]
+            if tipo == "number" or tipo in ("object", "array"):
+                mensaje = f"El campo '{nombre}' debe ser {texto}."
+            elif requerido_raiz:
+                mensaje = f"El campo '{nombre}' debe ser de tipo {texto}."
+            else:
+                mensaje = f"El campo '{nombre}' debe ser {texto}."
+            self.emitir(nivel, f"if not isinstance({var}, {clases}):")
+            self.error(nivel + 1, mensaje)
+
+        if tipo == "number":
+            if "minimum" in schema:
+                minimo = schema["minimum"]
+                if schema.get("exclusiveMinimum"):
+                    self.emitir(nivel, f"if {var} <= {minimo!r}:")
+                    self.error(nivel + 1, f"El campo '{nombre}' debe ser mayor que {minimo}.")
+                else:
+                    self.emitir(nivel, f"if {var} < {minimo!r}:")
+                    self.error(nivel + 1, f"El campo '{nombre}' debe ser mayor o igual que {minimo}.")
+            # Igual que la versión manual: los números se normalizan a float, pero solo
+            # cuando todo el objeto raíz ya es válido y solo si hace falta
+            if padre == "data":
+                self.conversiones[campo] = (var, requerido_raiz)
+            elif campo is not None:
+                self.emitir(nivel, f"if type({var}) is not float:")
+                self.emitir(nivel + 1, f"{padre}[{campo!r}] = float({var})")
+        elif tipo == "object":
+            self.objeto(schema, var, nombre, nivel)
+        elif tipo == "array" and "items" in schema:
+            elemento = self.variable()
+            items = self.resolver(schema["items"])
+            self.emitir(nivel, f"for {elemento} in {var}:")
+            if items.get("type") == "object":
+                self.emitir(nivel + 1, f"if not isinstance({elemento}, dict):")
+                self.error(nivel + 2, f"Los elementos de '{nombre}' deben ser dict.")
+                self.objeto(items, elemento, f"{nombre}[]", nivel + 1)
+            else:
+                self.valor(items, elemento, var, None, f"{nombre}[]", False, nivel + 1)
+            self.emitir(nivel + 1, "pass")
+
+
+def compilar_validador(schema: dict, nombre="validar", especificacion=None):
+    """Genera y compila una función validadora especializada para `schema`."""
+    generador = _Generador(especificacion or {})
+    schema = generador.resolver(schema)
+    generador.emitir(1, f"def {nombre}(data):")
+    generador.emitir(2, "if not isinstance(data, dict):")
+    generador.error(3, "El producto debe ser un diccionario (dict).")
+    generador.objeto(schema, "data", "", 2)
+    generador.convertir("data", 2)
+    generador.emitir(2, "return data")
+    generador.emitir(1, f"return {nombre}")
+
+    # Todo lo que usa el cuerpo entra como argumento de una fábrica: dentro del
+    # validador son variables de clausura en lugar de búsquedas en globals/builtins
+    libres = {
+        "ValidationError": ValidationError,
+        "_FALTA": _FALTA,
+        "_fecha_valida": _fecha_valida,
+        **{n: getattr(builtins, n) for n in _BUILTINS},
+        **generador.constantes,
+    }
+    codigo = f"def _fabrica({', '.join(libres)}):\n" + "\n".join(generador.lineas)
+    espacio = {}
+    exec(compile(codigo, f"<validador {nombre}>", "exec"), espacio)
+    funcion = espacio["_fabrica"](*libres.values())
+    funcion.codigo_fuente = codigo
+    return funcion
+
+
+def cargar_validadores(ruta=ESPECIFICACION) -> dict:
+    """Compila un validador por cada schema de components/schemas."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        especificacion = yaml.safe_load(f)
+    schemas = especificacion.get("components", {}).get("schemas", {})
+    return {
+        nombre: compilar_validador(schema, f"validar_{nombre}", especificacion)
+        for nombre, schema in schemas.items()
+    }
+
+
+# --- Validadores listos para usar (se compilan una sola vez al importar) ---
+VALIDADORES = cargar_validadores()
+validar_producto = VALIDADORES["Producto"]
+validar_producto_input = VALIDADORES["ProductoInput"]
+
+
+def validar_lista_productos(data: list) -> list:
+    if not isinstance(data, list):
+        raise ValidationError("La respuesta debe ser una lista de productos.")
+    for p in data:
+        validar_producto(p)
+    return data
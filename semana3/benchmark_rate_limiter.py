@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+
+from retoia5semana3 import RateLimiter
+
+# Configuración del microbenchmark: muchas llamadas encoladas a la vez
+LLAMADAS = 10_000
+TASA = 20_000  # tokens/s: ~0.5 s de cola, para que domine el coste de planificación
+BURST = 1
+
+# --- Versión anterior (recursiva), como referencia ---
+class RateLimiterRecursivo:
+    def __init__(self, rate_per_second):
+        self.rate = rate_per_second
+        self.tokens = rate_per_second
+        self.updated_at = time.monotonic()
+        self.despertares = 0
+
+    async def wait(self):
+        now = time.monotonic()
+        self.tokens += (now - self.updated_at) * self.rate
+        if self.tokens > self.rate:
+            self.tokens = self.rate
+        self.updated_at = now
+        if self.tokens < 1:
+            self.despertares += 1
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            return await self.wait()
+        self.tokens -= 1
+
+# --- Motor ---
+async def medir(limitador, n):
+    orden = []
+
+    async def llamada(i):
+        await limitador.wait()
+        orden.append(i)
+
+    inicio_cpu = time.process_time()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(llamada(i) for i in range(n)))
+    total = time.perf_counter() - inicio
+    cpu = time.process_time() - inicio_cpu
+    desordenadas = sum(1 for a, b in zip(orden, orden[1:]) if b < a)
+    return total, cpu, desordenadas
+
+async def main(n=LLAMADAS):
+    ideal = (n - BURST) / TASA
+    print(f"{n} llamadas encoladas a {TASA}/s (burst={BURST}), tiempo ideal {ideal:.3f}s\n")
+    print(f"{'Limitador':<12}{'Total':>9}{'CPU':>9}{'Despertares':>13}{'Fuera orden':>13}")
+
+    limitador = RateLimiter(TASA, burst=BURST)
+    total, cpu, desordenadas = await medir(limitador, n)
+    print(f"{'FIFO':<12}{total:>8.3f}s{cpu:>8.3f}s{limitador.despertares:>13}{desordenadas:>13}")
+
+    recursivo = RateLimiterRecursivo(TASA)
+    recursivo.tokens = BURST
+    limite_anterior = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limite_anterior, 100_000))
+    try:
+        total, cpu, desordenadas = await medir(recursivo, n)
+        print(f"{'Recursivo':<12}{total:>8.3f}s{cpu:>8.3f}s{recursivo.despertares:>13}{desordenadas:>13}")
+    except RecursionError:
+        print(f"{'Recursivo':<12}{'RecursionError':>30}")
+    finally:
+        sys.setrecursionlimit(limite_anterior)
+
+    espera = limitador.histograma_espera
+    print(f"\nEspera FIFO: p50={espera.percentil(50)*1000:.1f}ms "
+          f"p99={espera.percentil(99)*1000:.1f}ms max={espera.maximo*1000:.1f}ms "
+          f"| cola máxima={limitador.max_cola}")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else LLAMADAS))
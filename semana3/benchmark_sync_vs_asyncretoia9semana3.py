@@ -1,70 +1,230 @@
+"""
+Benchmark del escenario Dashboard (N GETs a /api/productos): síncrono vs asíncrono,
+con y sin pool de conexiones, contra el servidor local (servidor_local.py) con
+latencia, jitter y tasa de error configurables.
+- Calentamiento antes de medir y `repeticiones` medidas por estrategia.
+- p50/p95/p99 e intervalos de confianza al 95% (bootstrap) de la media y la mediana.
+- La memoria se mide en pasadas aparte: tracemalloc ralentiza y no debe tocar los tiempos.
+- Resultados en JSON (con commit y entorno) para comparar entre versiones:
+    python benchmark_sync_vs_asyncretoia9semana3.py --salida actual.json --comparar base.json
+"""
+import argparse
 import asyncio
+import gc
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
 import time
 import tracemalloc
 import requests
 import aiohttp
-import pandas as pd # Para formatear tablas en consola
 
-# Configuración del Benchmark
-LATENCIA_MS = 200 / 1000  # 200ms convertidos a segundos
-URLS_DASHBOARD = ["http://localhost:3000/api/productos"] * 4
-ITERACIONES = 5
+from servidor_local import ServidorEnHilo, Simulacion, crear_app
+
+# Configuración del Benchmark (valores por defecto de la línea de comandos)
+LATENCIA_MS = 200
+PETICIONES_DASHBOARD = 4
+CALENTAMIENTO = 3
+ITERACIONES = 30
+PASADAS_MEMORIA = 3
+REMUESTREOS = 2000
 
 # --- Clientes de Prueba ---
-def fetch_sync(urls):
-    results = []
+# Cada estrategia: (abrir() -> estado compartido entre repeticiones, ejecutar(estado, urls) -> nº errores)
+def _errores(estados):
+    return sum(1 for e in estados if e >= 400)
+
+def fetch_sync(estado, urls):
+    # Sin pool: cada requests.get abre y cierra su propia conexión
+    return _errores([requests.get(u).status_code for u in urls])
+
+def fetch_sync_pool(session, urls):
+    estados = []
     for url in urls:
-        time.sleep(LATENCIA_MS) # Simula delay del servidor
-        r = requests.get(url)
-        results.append(r.status_code)
-    return results
+        with session.get(url) as r:
+            estados.append(r.status_code)
+    return _errores(estados)
+
+async def _get(session, url):
+    async with session.get(url) as r:
+        await r.read()
+        return r.status
 
-async def fetch_async(urls):
+async def fetch_async(estado, urls):
+    # Una sesión (y un pool) nueva por dashboard, como el cliente original
     async with aiohttp.ClientSession() as session:
-        tasks = []
-        for url in urls:
-            async def get_with_delay(u):
-                await asyncio.sleep(LATENCIA_MS)
-                async with session.get(u) as r:
-                    return r.status
-            tasks.append(get_with_delay(url))
-        return await asyncio.gather(*tasks)
+        return _errores(await asyncio.gather(*[_get(session, u) for u in urls]))
+
+async def fetch_async_pool(session, urls):
+    return _errores(await asyncio.gather(*[_get(session, u) for u in urls]))
+
+class _Nada:
+    def __enter__(self): return None
+    def __exit__(self, *exc): pass
+    async def __aenter__(self): return None
+    async def __aexit__(self, *exc): pass
+
+ESTRATEGIAS = {
+    "sync": (False, _Nada, fetch_sync),
+    "sync_pool": (False, requests.Session, fetch_sync_pool),
+    "async": (True, _Nada, fetch_async),
+    "async_pool": (True, aiohttp.ClientSession, fetch_async_pool),
+}
+
+# --- Estadística ---
+def percentil(ordenados, p):
+    """Percentil con interpolación lineal sobre una lista ordenada."""
+    if not ordenados:
+        return 0.0
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = math.floor(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+def intervalo_bootstrap(muestras, estadistico, rng, remuestreos=REMUESTREOS, confianza=0.95):
+    """IC por bootstrap de percentiles: no supone normalidad (las latencias no lo son)."""
+    n = len(muestras)
+    valores = sorted(estadistico([muestras[rng.randrange(n)] for _ in range(n)]) for _ in range(remuestreos))
+    cola = (1 - confianza) / 2 * 100
+    return [percentil(valores, cola), percentil(valores, 100 - cola)]
+
+def resumir(tiempos, rng):
+    ordenados = sorted(tiempos)
+    return {
+        "n": len(tiempos),
+        "media": statistics.fmean(tiempos),
+        "desviacion": statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        "min": ordenados[0],
+        "p50": percentil(ordenados, 50),
+        "p95": percentil(ordenados, 95),
+        "p99": percentil(ordenados, 99),
+        "max": ordenados[-1],
+        "ic95_media": intervalo_bootstrap(tiempos, statistics.fmean, rng),
+        "ic95_p50": intervalo_bootstrap(tiempos, statistics.median, rng),
+    }
 
 # --- Motor de Benchmark ---
-def run_benchmark(name, func, data, is_async=False):
+def _medir_sync(abrir, ejecutar, urls, calentamiento, repeticiones):
+    tiempos, errores = [], 0
+    with abrir() as estado:
+        for _ in range(calentamiento):
+            ejecutar(estado, urls)
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            errores += ejecutar(estado, urls)
+            tiempos.append(time.perf_counter() - inicio)
+    return tiempos, errores
+
+async def _medir_async(abrir, ejecutar, urls, calentamiento, repeticiones):
+    # Todas las repeticiones en el mismo bucle: asyncio.run por repetición mediría su arranque
+    tiempos, errores = [], 0
+    async with abrir() as estado:
+        for _ in range(calentamiento):
+            await ejecutar(estado, urls)
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            errores += await ejecutar(estado, urls)
+            tiempos.append(time.perf_counter() - inicio)
+    return tiempos, errores
+
+def _medir(nombre, urls, calentamiento, repeticiones):
+    es_async, abrir, ejecutar = ESTRATEGIAS[nombre]
+    if es_async:
+        return asyncio.run(_medir_async(abrir, ejecutar, urls, calentamiento, repeticiones))
+    return _medir_sync(abrir, ejecutar, urls, calentamiento, repeticiones)
+
+def run_benchmark(nombre, urls, calentamiento=CALENTAMIENTO, repeticiones=ITERACIONES,
+                  pasadas_memoria=PASADAS_MEMORIA, rng=None):
+    rng = rng or random.Random(0)
+    gc.collect()
+    tiempos, errores = _medir(nombre, urls, calentamiento, repeticiones)
+
+    # Pasada aparte para memoria (sus tiempos se descartan)
+    gc.collect()
     tracemalloc.start()
-    start_time = time.perf_counter()
-    
-    if is_async:
-        asyncio.run(func(data))
-    else:
-        func(data)
-    
-    end_time = time.perf_counter()
-    current, peak = tracemalloc.get_traced_memory()
+    _medir(nombre, urls, 1, pasadas_memoria)
+    _, pico = tracemalloc.get_traced_memory()
     tracemalloc.stop()
-    
-    total_time = end_time - start_time
+
+    resumen = resumir(tiempos, rng)
     return {
-        "Estrategia": name,
-        "Tiempo Total (s)": round(total_time, 4),
-        "Memoria Peak (KB)": round(peak / 1024, 2),
-        "Throughput (req/s)": round(len(data) / total_time, 2)
+        "estrategia": nombre,
+        "tiempos": resumen,
+        "throughput_rps": len(urls) / resumen["media"],
+        "errores": errores,
+        "tasa_error": errores / (len(urls) * repeticiones),
+        "memoria_pico_kb": pico / 1024,
     }
 
-def ejecutar_suite():
-    print(f"--- Iniciando Benchmark EcoMarket (Latencia: {LATENCIA_MS*1000}ms) ---")
-    
-    # Escenario: Dashboard (4 peticiones)
-    res_sync = run_benchmark("Síncrono (Req)", fetch_sync, URLS_DASHBOARD)
-    res_async = run_benchmark("Asíncrono (Aio)", fetch_async, URLS_DASHBOARD)
-    
-    df = pd.DataFrame([res_sync, res_async])
-    speedup = res_sync["Tiempo Total (s)"] / res_async["Tiempo Total (s)"]
-    
-    print("\n### TABLA COMPARATIVA: ESCENARIO DASHBOARD ###")
-    print(df.to_string(index=False))
-    print(f"\n🚀 SPEEDUP: La versión asíncrona es {speedup:.2f}x más rápida.")
+def _entorno():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "plataforma": platform.platform(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "requests": requests.__version__, "aiohttp": aiohttp.__version__}
+
+def imprimir(resultados, base=None):
+    anteriores = {r["estrategia"]: r for r in base["resultados"]} if base else {}
+    print(f"{'Estrategia':<12}{'p50 (ms)':>10}{'IC95 p50':>18}{'p95':>9}{'p99':>9}"
+          f"{'req/s':>8}{'Err':>6}{'Mem KB':>9}{'vs base':>9}")
+    for r in resultados:
+        t = {k: v * 1000 if isinstance(v, float) else v for k, v in r["tiempos"].items()}
+        ic = f"[{t['ic95_p50'][0] * 1000:.1f}, {t['ic95_p50'][1] * 1000:.1f}]"
+        anterior = anteriores.get(r["estrategia"])
+        cambio = f"{r['tiempos']['p50'] / anterior['tiempos']['p50'] - 1:+.1%}" if anterior else "-"
+        print(f"{r['estrategia']:<12}{t['p50']:>10.1f}{ic:>18}{t['p95']:>9.1f}{t['p99']:>9.1f}"
+              f"{r['throughput_rps']:>8.1f}{r['errores']:>6}{r['memoria_pico_kb']:>9.1f}{cambio:>9}")
+
+def ejecutar_suite(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark síncrono vs asíncrono (EcoMarket)")
+    parser.add_argument("--latencia-ms", type=float, default=LATENCIA_MS)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    parser.add_argument("--peticiones", type=int, default=PETICIONES_DASHBOARD)
+    parser.add_argument("--calentamiento", type=int, default=CALENTAMIENTO)
+    parser.add_argument("--repeticiones", type=int, default=ITERACIONES)
+    parser.add_argument("--estrategias", nargs="+", default=list(ESTRATEGIAS), choices=list(ESTRATEGIAS))
+    parser.add_argument("--url", help="Medir contra este servidor en vez del local (p. ej. http://localhost:3000)")
+    parser.add_argument("--salida", help="Fichero JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulacion = Simulacion(args.latencia_ms / 1000, args.jitter_ms / 1000, args.tasa_error,
+                            random.Random(args.semilla))
+    print(f"--- Benchmark EcoMarket: dashboard de {args.peticiones} peticiones, latencia "
+          f"{args.latencia_ms:.0f}±{args.jitter_ms:.0f}ms, error {args.tasa_error:.0%}, "
+          f"{args.repeticiones} repeticiones ---")
+
+    def medir_todas(base_url):
+        urls = [f"{base_url}/api/productos"] * args.peticiones
+        return [run_benchmark(e, urls, args.calentamiento, args.repeticiones,
+                              rng=random.Random(args.semilla)) for e in args.estrategias]
+
+    if args.url:
+        resultados = medir_todas(args.url)
+    else:
+        with ServidorEnHilo(crear_app(simulacion=simulacion)) as servidor:
+            resultados = medir_todas(servidor.url)
+
+    informe = {"entorno": _entorno(), "configuracion": vars(args), "resultados": resultados}
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    print()
+    imprimir(resultados, base)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+    return informe
 
 if __name__ == "__main__":
-    ejecutar_suite()
\ No newline at end of file
+    ejecutar_suite()
@@ -0,0 +1,241 @@
+"""
+Caché HTTP del lado cliente, independiente del transporte (requests, aiohttp, httpx).
+- Clave: método + URL + valor de las cabeceras de petición listadas en `vary`.
+- Frescura: Cache-Control max-age / no-cache / no-store; si el servidor no dice nada
+  se usa `ttl_por_defecto`.
+- Entradas caducadas con ETag o Last-Modified se revalidan con If-None-Match /
+  If-Modified-Since; un 304 se sirve desde la caché. Un 304 que no se pidió (sin
+  entrada o sin validadores) no tiene cuerpo que servir: se repite la petición una vez.
+- Expulsión LRU por presupuesto de bytes y por antigüedad máxima (`ttl_maximo`).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# Origen de una respuesta devuelta por consultar()
+RED, CACHE, REVALIDADA = "red", "cache", "revalidada"
+
+@dataclass
+class Respuesta:
+    estado: int
+    cabeceras: dict
+    cuerpo: bytes
+    origen: str = RED
+
+    # Alias para usarla igual que una respuesta de requests/httpx o de aiohttp
+    @property
+    def status_code(self):
+        return self.estado
+
+    @property
+    def status(self):
+        return self.estado
+
+    def json(self):
+        return json.loads(self.cuerpo)
+
+@dataclass
+class EntradaCache:
+    estado: int
+    cabeceras: dict
+    cuerpo: bytes
+    guardada_en: float
+    expira_en: float
+    etag: str = None
+    last_modified: str = None
+    tamano: int = 0
+
+@dataclass
+class EstadisticasCache:
+    aciertos: int = 0        # Servidas sin tocar la red
+    fallos: int = 0          # Sin entrada: petición normal
+    revalidaciones: int = 0  # Peticiones condicionales enviadas
+    no_modificados: int = 0  # 304 servidos desde la caché
+    no_solicitados: int = 0  # 304 sin validadores nuestros: se repite la petición
+    expulsiones: int = 0
+    bytes_usados: int = 0
+    entradas: int = 0
+
+    def como_dict(self):
+        return dict(self.__dict__)
+
+def _cabecera(cabeceras, nombre):
+    """Búsqueda sin distinguir mayúsculas (dict normal, CIMultiDict o httpx.Headers)."""
+    valor = cabeceras.get(nombre)
+    if valor is None:
+        nombre = nombre.lower()
+        for clave, v in cabeceras.items():
+            if clave.lower() == nombre:
+                return v
+    return valor
+
+def _cache_control(cabeceras) -> dict:
+    directivas = {}
+    for parte in (_cabecera(cabeceras, "Cache-Control") or "").split(","):
+        nombre, _, valor = parte.strip().partition("=")
+        if nombre:
+            directivas[nombre.lower()] = valor.strip('"')
+    return directivas
+
+class CacheHTTP:
+    def __init__(self, max_bytes=10 * 1024 * 1024, ttl_por_defecto=30, ttl_maximo=3600,
+                 vary=("Accept", "Authorization")):
+        self.max_bytes = max_bytes
+        self.ttl_por_defecto = ttl_por_defecto
+        self.ttl_maximo = ttl_maximo
+        self.vary = tuple(vary)
+        self.estadisticas = EstadisticasCache()
+        self._entradas = OrderedDict()
+        # El cliente síncrono puede usarse desde varios hilos (operaciones por lotes)
+        self._lock = threading.Lock()
+
+    def clave(self, metodo, url, cabeceras):
+        return (metodo.upper(), url, tuple(_cabecera(cabeceras, h) for h in self.vary))
+
+    # --- Consulta ---
+    def buscar(self, clave):
+        """Devuelve (entrada, fresca). La entrada puede estar caducada pero ser revalidable."""
+        with self._lock:
+            return self._buscar(clave)
+
+    def _buscar(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None, False
+        ahora = time.monotonic()
+        if ahora - entrada.guardada_en > self.ttl_maximo:
+            self._quitar(clave)
+            return None, False
+        self._entradas.move_to_end(clave)
+        return entrada, ahora < entrada.expira_en
+
+    def cabeceras_validacion(self, entrada) -> dict:
+        cabeceras = {}
+        if entrada.etag:
+            cabeceras["If-None-Match"] = entrada.etag
+        if entrada.last_modified:
+            cabeceras["If-Modified-Since"] = entrada.last_modified
+        return cabeceras
+
+    # --- Almacenamiento ---
+    def _ttl(self, cabeceras):
+        directivas = _cache_control(cabeceras)
+        if "no-store" in directivas:
+            return None
+        if "no-cache" in directivas:
+            return 0
+        if "max-age" in directivas:
+            try:
+                return max(int(directivas["max-age"]), 0)
+            except ValueError:
+                return 0
+        return self.ttl_por_defecto
+
+    def guardar(self, clave, estado, cabeceras, cuerpo):
+        if estado != 200:
+            return None
+        ttl = self._ttl(cabeceras)
+        vary = _cabecera(cabeceras, "Vary") or ""
+        # Solo se cachea si la respuesta varía, como mucho, por las cabeceras de la clave
+        variables = {v.strip().lower() for v in vary.split(",") if v.strip()}
+        if ttl is None or "*" in variables or not variables <= {v.lower() for v in self.vary}:
+            return None
+        cabeceras = {k.lower(): v for k, v in cabeceras.items()}
+        tamano = len(cuerpo) + sum(len(k) + len(v) for k, v in cabeceras.items())
+        if tamano > self.max_bytes:
+            return None
+        ahora = time.monotonic()
+        entrada = EntradaCache(
+            estado, cabeceras, cuerpo, ahora, ahora + ttl,
+            _cabecera(cabeceras, "ETag"), _cabecera(cabeceras, "Last-Modified"), tamano
+        )
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = entrada
+            self.estadisticas.bytes_usados += tamano
+            while self.estadisticas.bytes_usados > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.estadisticas.expulsiones += 1
+            self.estadisticas.entradas = len(self._entradas)
+        return entrada
+
+    def revalidada(self, entrada, cabeceras):
+        """El servidor respondió 304: se actualizan las cabeceras guardadas y la frescura."""
+        entrada.cabeceras.update((k.lower(), v) for k, v in cabeceras.items())
+        ttl = self._ttl(entrada.cabeceras)
+        ahora = time.monotonic()
+        entrada.guardada_en = ahora
+        entrada.expira_en = ahora + (ttl or 0)
+        entrada.etag = _cabecera(entrada.cabeceras, "ETag")
+        entrada.last_modified = _cabecera(entrada.cabeceras, "Last-Modified")
+
+    def invalidar(self, url):
+        """Se llama tras un POST/PUT/PATCH/DELETE sobre `url`."""
+        with self._lock:
+            claves = [c for c in self._entradas if c[1] == url or c[1].startswith(url + "?")]
+            for clave in claves:
+                self._quitar(clave)
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self.estadisticas.bytes_usados -= entrada.tamano
+        self.estadisticas.entradas = len(self._entradas)
+
+    # --- Flujo completo para un GET ---
+    def _antes(self, url, cabeceras):
+        clave = self.clave("GET", url, cabeceras)
+        # Estadísticas dentro del lock: el cliente síncrono consulta desde varios hilos
+        with self._lock:
+            entrada, fresca = self._buscar(clave)
+            if fresca:
+                self.estadisticas.aciertos += 1
+                return clave, entrada, None
+            extra = self.cabeceras_validacion(entrada) if entrada is not None else {}
+            if extra:
+                self.estadisticas.revalidaciones += 1
+            else:
+                self.estadisticas.fallos += 1
+        return clave, entrada, extra
+
+    def _no_solicitado(self, extra, respuesta):
+        """Un 304 sin validadores nuestros no trae nada que servir: hay que repetir la petición."""
+        if respuesta[0] != 304 or extra:
+            return False
+        with self._lock:
+            self.estadisticas.no_solicitados += 1
+        return True
+
+    def _despues(self, clave, entrada, extra, estado, cabeceras, cuerpo):
+        if estado == 304 and extra:
+            with self._lock:
+                self.estadisticas.no_modificados += 1
+                self.revalidada(entrada, cabeceras)
+            return Respuesta(entrada.estado, entrada.cabeceras, entrada.cuerpo, REVALIDADA)
+        self.guardar(clave, estado, cabeceras, cuerpo)
+        return Respuesta(estado, cabeceras, cuerpo, RED)
+
+    def consultar(self, url, cabeceras, pedir) -> Respuesta:
+        """
+        `pedir(cabeceras_extra)` hace el GET real y devuelve (estado, cabeceras, cuerpo).
+        Sirve para cualquier cliente síncrono.
+        """
+        clave, entrada, extra = self._antes(url, cabeceras)
+        if extra is None:
+            return Respuesta(entrada.estado, entrada.cabeceras, entrada.cuerpo, CACHE)
+        respuesta = pedir(extra)
+        if self._no_solicitado(extra, respuesta):
+            respuesta = pedir({})
+        return self._despues(clave, entrada, extra, *respuesta)
+
+    async def consultar_async(self, url, cabeceras, pedir) -> Respuesta:
+        """Igual que consultar, pero `pedir` es una corrutina (aiohttp, httpx)."""
+        clave, entrada, extra = self._antes(url, cabeceras)
+        if extra is None:
+            return Respuesta(entrada.estado, entrada.cabeceras, entrada.cuerpo, CACHE)
+        respuesta = await pedir(extra)
+        if self._no_solicitado(extra, respuesta):
+            respuesta = await pedir({})
+        return self._despues(clave, entrada, extra, *respuesta)
@@ -0,0 +1,193 @@
+"""
+Circuit breaker por endpoint.
+- Cerrado: las peticiones pasan y se cuentan en una ventana deslizante de `ventana`
+  segundos (cubetas por segundo). Si con al menos `minimo_peticiones` la proporción
+  de fallos llega a `umbral_error`, se abre.
+- Abierto: se falla al instante con CircuitoAbierto, sin tocar la red, durante
+  `espera_abierto` segundos (se duplica cada vez que una sonda falla, hasta
+  `max_espera_abierto`).
+- Semiabierto: pasan como mucho `sondas` peticiones a la vez; `exitos_para_cerrar`
+  éxitos seguidos lo cierran y cualquier fallo lo vuelve a abrir.
+Los resultados de peticiones que empezaron en un estado anterior se ignoran.
+Cada transición queda en `historial` y se notifica a `al_cambiar`.
+"""
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from plazos import PlazoAgotado
+from reintentos import ERRORES_TRANSPORTE
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+class CircuitoAbierto(Exception):
+    def __init__(self, nombre, reintentar_en):
+        super().__init__(f"Circuito '{nombre}' abierto; siguiente sonda en {reintentar_en:.1f}s")
+        self.nombre = nombre
+        self.reintentar_en = reintentar_en
+
+@dataclass
+class CambioEstado:
+    instante: float
+    circuito: str
+    anterior: str
+    nuevo: str
+    motivo: str
+
+class Circuito:
+    def __init__(self, nombre="", umbral_error=0.5, minimo_peticiones=10, ventana=10,
+                 espera_abierto=5.0, max_espera_abierto=60.0, sondas=1, exitos_para_cerrar=2,
+                 al_cambiar=None, historial=100, reloj=time.monotonic):
+        self.nombre = nombre
+        self.umbral_error = umbral_error
+        self.minimo_peticiones = minimo_peticiones
+        self.ventana = ventana
+        self.espera_abierto = espera_abierto
+        self.max_espera_abierto = max_espera_abierto
+        self.sondas = sondas
+        self.exitos_para_cerrar = exitos_para_cerrar
+        self.al_cambiar = al_cambiar
+        self.historial = deque(maxlen=historial)
+        self.reloj = reloj
+        self.estado = CERRADO
+        self.rechazadas = 0
+        self._generacion = 0         # Cambia en cada transición
+        self._cubetas = deque()      # [segundo, peticiones, fallos]
+        self._abierto_hasta = 0.0
+        self._espera = espera_abierto
+        self._sondas_en_vuelo = 0
+        self._exitos = 0
+
+    def _ventana(self):
+        ahora = self.reloj()
+        segundo = int(ahora)
+        while self._cubetas and self._cubetas[0][0] <= segundo - self.ventana:
+            self._cubetas.popleft()
+        if not self._cubetas or self._cubetas[-1][0] != segundo:
+            self._cubetas.append([segundo, 0, 0])
+        return self._cubetas[-1]
+
+    def tasa_error(self):
+        self._ventana()
+        peticiones = sum(c[1] for c in self._cubetas)
+        return sum(c[2] for c in self._cubetas) / peticiones if peticiones else 0.0
+
+    def permitir(self) -> int:
+        """Lanza CircuitoAbierto o devuelve un testigo para pasar luego a registrar()."""
+        if self.estado == ABIERTO:
+            restante = self._abierto_hasta - self.reloj()
+            if restante > 0:
+                self.rechazadas += 1
+                raise CircuitoAbierto(self.nombre, restante)
+            self._cambiar(SEMIABIERTO, "fin de la espera")
+        if self.estado == SEMIABIERTO:
+            if self._sondas_en_vuelo >= self.sondas:
+                self.rechazadas += 1
+                raise CircuitoAbierto(self.nombre, 0.0)
+            self._sondas_en_vuelo += 1
+        return self._generacion
+
+    def registrar(self, testigo, exito):
+        """exito=None: resultado neutro (cancelación, error del llamador); solo libera la sonda."""
+        if testigo != self._generacion:
+            return
+        if self.estado == SEMIABIERTO:
+            self._sondas_en_vuelo -= 1
+            if exito is None:
+                return
+            if not exito:
+                self._espera = min(self._espera * 2, self.max_espera_abierto)
+                self._abrir("falla la sonda")
+                return
+            self._exitos += 1
+            if self._exitos >= self.exitos_para_cerrar:
+                self._espera = self.espera_abierto
+                self._cubetas.clear()
+                self._cambiar(CERRADO, f"{self._exitos} sondas correctas")
+            return
+        if exito is None:
+            return
+        cubeta = self._ventana()
+        cubeta[1] += 1
+        if exito:
+            return
+        cubeta[2] += 1
+        peticiones = sum(c[1] for c in self._cubetas)
+        if peticiones >= self.minimo_peticiones:
+            tasa = sum(c[2] for c in self._cubetas) / peticiones
+            if tasa >= self.umbral_error:
+                self._abrir(f"error {tasa:.0%} en {peticiones} peticiones")
+
+    def _abrir(self, motivo):
+        self._abierto_hasta = self.reloj() + self._espera
+        self._cambiar(ABIERTO, motivo)
+
+    def _cambiar(self, nuevo, motivo):
+        cambio = CambioEstado(self.reloj(), self.nombre, self.estado, nuevo, motivo)
+        self.estado = nuevo
+        self._generacion += 1
+        self._sondas_en_vuelo = 0
+        self._exitos = 0
+        self.historial.append(cambio)
+        if self.al_cambiar:
+            self.al_cambiar(cambio)
+
+    async def ejecutar_async(self, llamada, es_fallo=None):
+        """
+        await llamada() protegido por el circuito. Cuentan como fallo los errores de
+        red/timeout y los resultados para los que es_fallo(resultado) sea cierto. Un
+        PlazoAgotado es neutro: el tiempo lo agotó el llamador, no el endpoint.
+        """
+        testigo = self.permitir()
+        exito = None
+        try:
+            resultado = await llamada()
+        except PlazoAgotado:
+            raise
+        except ERRORES_TRANSPORTE:
+            exito = False
+            raise
+        else:
+            exito = not (es_fallo and es_fallo(resultado))
+            return resultado
+        finally:
+            self.registrar(testigo, exito)
+
+    def metricas(self):
+        return {
+            "estado": self.estado,
+            "tasa_error": self.tasa_error(),
+            "peticiones_ventana": sum(c[1] for c in self._cubetas),
+            "rechazadas": self.rechazadas,
+            "reintentar_en": max(0.0, self._abierto_hasta - self.reloj()) if self.estado == ABIERTO else 0.0,
+            "cambios": len(self.historial),
+        }
+
+class RegistroCircuitos:
+    """Un Circuito por endpoint, creado al primer uso con las mismas opciones."""
+
+    def __init__(self, al_cambiar=None, historial=1000, **opciones):
+        self.al_cambiar = al_cambiar
+        self.historial = deque(maxlen=historial)  # Transiciones de todos los circuitos
+        self.opciones = opciones
+        self._circuitos = {}
+
+    def obtener(self, nombre) -> Circuito:
+        circuito = self._circuitos.get(nombre)
+        if circuito is None:
+            circuito = Circuito(nombre, al_cambiar=self._registrar, **self.opciones)
+            self._circuitos[nombre] = circuito
+        return circuito
+
+    def _registrar(self, cambio):
+        self.historial.append(cambio)
+        if self.al_cambiar:
+            self.al_cambiar(cambio)
+
+    def estados(self):
+        return {nombre: c.estado for nombre, c in self._circuitos.items()}
+
+    def metricas(self):
+        return {nombre: c.metricas() for nombre, c in self._circuitos.items()}
@@ -1,51 +1,201 @@
 import asyncio
+import os
+import sys
 import aiohttp
 import time
+from lotes import procesar_lote_async, ResumenLote
+from json_incremental import ParserArrayJSON
+from paginacion import PaginadorAsync
+from cache_http import CacheHTTP, Respuesta
+from single_flight import SingleFlight
+from reintentos import PoliticaReintentos
+from circuito import RegistroCircuitos
+from hedging import PoliticaHedging
+from plazos import con_plazo, dentro_del_plazo
+from metricas import endpoint_de, trazas_aiohttp
+from yarl import URL
+
+# Validadores compilados desde la especificación OpenAPI (semana 2)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "semana 2"))
+from validador_compilado import validar_producto
 
 BASE_URL = "http://localhost:3000/api"
+TAMANO_TROZO = 64 * 1024
+# Caché HTTP compartida por las funciones GET; None = sin caché (p. ej. CACHE_HTTP = CacheHTTP())
+CACHE_HTTP: CacheHTTP = None
+# GETs idénticos y simultáneos comparten una sola petición (ver SINGLE_FLIGHT.metricas)
+SINGLE_FLIGHT = SingleFlight()
+# Errores de conexión y 429/5xx se reintentan con backoff; None = sin reintentos
+REINTENTOS = PoliticaReintentos()
+# Un circuit breaker por endpoint (/productos, /pedidos...): si uno está caído se falla
+# al instante con CircuitoAbierto en vez de esperar el timeout; None = sin circuitos
+CIRCUITOS = RegistroCircuitos()
+# Opcional: GETs de obtener_producto/listar_productos cubiertos con un duplicado si
+# tardan más que el p95 reciente; None = desactivado (p. ej. HEDGING = PoliticaHedging())
+HEDGING: PoliticaHedging = None
+# Latencia por endpoint/estado, peticiones en vuelo y reutilización del pool en metricas.REGISTRO;
+# la traza solo se engancha si las métricas están activas al crear la sesión
+
+def nueva_sesion():
+    return aiohttp.ClientSession(trace_configs=trazas_aiohttp("cliente_async"))
 
 class EcoMarketError(Exception): pass
+class RecursoNoEncontrado(EcoMarketError): pass
+class ConflictoRecurso(EcoMarketError): pass
 
 # --- 1. Funciones CRUD Asíncronas ---
+async def _get(session, url, params=None, cubrir=None) -> Respuesta:
+    """
+    GET que lee el cuerpo completo, pasa por CACHE_HTTP si está configurada y se
+    coalesce con otros GET idénticos en vuelo. Cada llamador parsea su propio JSON.
+    `cubrir` es la clave de latencias para HEDGING (None = sin duplicados).
+    """
+    if params:
+        url = str(URL(url).update_query(params))
+    clave = (url, tuple(sorted(session.headers.items())))
+    if SINGLE_FLIGHT is None:
+        return await _get_real(session, url, cubrir)
+    # Métricas por endpoint: ni un contador por id/página ni el token de la sesión en memoria
+    return await SINGLE_FLIGHT.ejecutar(clave, lambda: _get_real(session, url, cubrir),
+                                        etiqueta=endpoint_de(URL(url).path))
+
+def _endpoint(url):
+    """'/productos' para .../api/productos/7?x=1: el circuito se comparte por recurso."""
+    ruta = URL(url).path[len(URL(BASE_URL).path):]
+    return "/" + ruta.strip("/").split("/")[0]
+
+def _es_fallo(resp):
+    return resp.status >= 500
+
+async def _peticion(session, metodo, url, headers=None, **kwargs) -> Respuesta:
+    """
+    Cualquier método, con reintentos (REINTENTOS) y circuit breaker (CIRCUITOS). Cada
+    intento pasa por el circuito: si se abre a mitad de los reintentos, se deja de insistir.
+    Cada intento usa solo lo que queda del plazo del contexto (ver plazos.con_plazo).
+    El cuerpo se lee y la conexión se libera; si se cancela, aiohttp la cierra.
+    """
+    async def leer(cabeceras):
+        async with session.request(metodo, url, headers=cabeceras, **kwargs) as resp:
+            return Respuesta(resp.status, resp.headers, await resp.read())
+
+    async def intento(cabeceras):
+        return await dentro_del_plazo(leer(cabeceras))
+
+    if CIRCUITOS is None:
+        enviar = intento
+    else:
+        circuito = CIRCUITOS.obtener(_endpoint(url))
+
+        async def enviar(cabeceras):
+            return await circuito.ejecutar_async(lambda: intento(cabeceras), _es_fallo)
+
+    if REINTENTOS is None:
+        return await enviar(headers or {})
+    return await REINTENTOS.ejecutar_async(metodo, enviar, headers)
+
+async def _get_red(session, url, cubrir, headers=None) -> Respuesta:
+    # El duplicado va por debajo de SINGLE_FLIGHT: si no, se coalescería con la primaria
+    if HEDGING is None or cubrir is None:
+        return await _peticion(session, "GET", url, headers=headers)
+    return await HEDGING.ejecutar(cubrir, lambda: _peticion(session, "GET", url, headers=headers))
+
+async def _get_real(session, url, cubrir=None) -> Respuesta:
+    if CACHE_HTTP is None:
+        return await _get_red(session, url, cubrir)
+
+    async def pedir(cabeceras_extra):
+        resp = await _get_red(session, url, cubrir, cabeceras_extra)
+        return resp.status, resp.cabeceras, resp.cuerpo
+
+    return await CACHE_HTTP.consultar_async(url, session.headers, pedir)
+
+def _invalidar(producto_id=None):
+    if CACHE_HTTP is not None:
+        CACHE_HTTP.invalidar(f"{BASE_URL}/productos")
+        if producto_id is not None:
+            CACHE_HTTP.invalidar(f"{BASE_URL}/productos/{producto_id}")
+
 async def listar_productos(session, nombre=None):
+    params = {'nombre': nombre} if nombre else {}
+    resp = await _get(session, f"{BASE_URL}/productos", params, cubrir="listar_productos")
+    if resp.status != 200: raise EcoMarketError("Error al listar")
+    return resp.json()
+
+async def stream_productos(session, nombre=None, validar=True):
+    """Uso: async for p in stream_productos(session). Memoria constante por producto."""
     params = {'nombre': nombre} if nombre else {}
     async with session.get(f"{BASE_URL}/productos", params=params) as resp:
         if resp.status != 200: raise EcoMarketError("Error al listar")
-        return await resp.json()
+        parser = ParserArrayJSON()
+        async for trozo in resp.content.iter_chunked(TAMANO_TROZO):
+            for producto in parser.alimentar(trozo):
+                yield validar_producto(producto) if validar else producto
+        for producto in parser.terminar():
+            yield validar_producto(producto) if validar else producto
+
+async def obtener_pagina(session, ruta, numero, limite, params=None):
+    params = {**(params or {}), 'page': numero, 'limit': limite}
+    resp = await _get(session, f"{BASE_URL}{ruta}", params)
+    if resp.status != 200: raise EcoMarketError(f"Error en la página {numero} de {ruta}")
+    return resp.json()
+
+def paginar(session, ruta="/productos", limite=100, ventana=3, max_items_en_memoria=5000, params=None,
+            max_paginas=None):
+    """Uso: async for p in paginar(session, "/pedidos"). Pide por adelantado `ventana` páginas."""
+    return PaginadorAsync(
+        lambda numero: obtener_pagina(session, ruta, numero, limite, params),
+        limite, ventana, max_items_en_memoria, max_paginas=max_paginas
+    )
 
 async def obtener_producto(session, producto_id):
-    async with session.get(f"{BASE_URL}/productos/{producto_id}") as resp:
-        if resp.status == 404: return None
-        return await resp.json()
+    resp = await _get(session, f"{BASE_URL}/productos/{producto_id}", cubrir="obtener_producto")
+    if resp.status == 404: return None
+    return resp.json()
 
 async def crear_producto(session, datos):
-    async with session.post(f"{BASE_URL}/productos", json=datos) as resp:
-        if resp.status != 201: raise EcoMarketError("Datos inválidos")
-        return await resp.json()
+    # Lleva Idempotency-Key: reintentarlo no crea el producto dos veces
+    resp = await _peticion(session, "POST", f"{BASE_URL}/productos", json=datos)
+    _invalidar()
+    if resp.status == 409: raise ConflictoRecurso("Producto duplicado")
+    if resp.status != 201: raise EcoMarketError("Datos inválidos")
+    return resp.json()
 
 async def actualizar_producto_total(session, producto_id, datos):
-    async with session.put(f"{BASE_URL}/productos/{producto_id}", json=datos) as resp:
-        return await resp.json()
+    resp = await _peticion(session, "PUT", f"{BASE_URL}/productos/{producto_id}", json=datos)
+    _invalidar(producto_id)
+    if resp.status == 404: raise RecursoNoEncontrado("Producto no encontrado")
+    if resp.status != 200: raise EcoMarketError("Error en actualización total")
+    return resp.json()
 
 async def actualizar_producto_parcial(session, producto_id, campos):
-    async with session.patch(f"{BASE_URL}/productos/{id}/precio", json=campos) as resp:
-        if resp.status == 422: raise EcoMarketError("Precio inválido")
-        return await resp.json()
+    resp = await _peticion(session, "PATCH", f"{BASE_URL}/productos/{producto_id}/precio", json=campos)
+    _invalidar(producto_id)
+    if resp.status == 404: raise RecursoNoEncontrado("Producto no encontrado")
+    if resp.status == 409: raise ConflictoRecurso("Conflicto al actualizar producto")
+    if resp.status == 422: raise EcoMarketError("Precio inválido")
+    if resp.status != 200: raise EcoMarketError("Error en actualización parcial")
+    return resp.json()
 
 async def eliminar_producto(session, producto_id):
-    async with session.delete(f"{BASE_URL}/productos/{producto_id}") as resp:
-        return resp.status == 204
+    resp = await _peticion(session, "DELETE", f"{BASE_URL}/productos/{producto_id}")
+    _invalidar(producto_id)
+    return resp.status == 204
 
 # --- 2. Carga del Dashboard ---
-async def cargar_dashboard():
-    timeout = aiohttp.ClientTimeout(total=2)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        # Lanzamos las peticiones en paralelo
+async def cargar_dashboard(segundos=2):
+    # Un único plazo para todo el dashboard (antes, 2s por petición): cada subpetición
+    # y sus reintentos usan lo que quede
+    with con_plazo(segundos):
+        return await _cargar_dashboard()
+
+async def _cargar_dashboard():
+    async with nueva_sesion() as session:
+        # Lanzamos las peticiones en paralelo (vía _get: se leen, se liberan y se coalescen)
         tareas = [
             listar_productos(session),
             # Simulamos endpoints adicionales para el dashboard
-            session.get(f"{BASE_URL}/productores"), 
-            session.get(f"{BASE_URL}/pedidos")
+            _get(session, f"{BASE_URL}/productores"),
+            _get(session, f"{BASE_URL}/pedidos")
         ]
         
         resultados = await asyncio.gather(*tareas, return_exceptions=True)
@@ -53,7 +203,10 @@ async def cargar_dashboard():
         return {
             "productos": resultados[0] if not isinstance(resultados[0], Exception) else "Error",
             "productores": "Cargado" if not isinstance(resultados[1], Exception) else "Fallo",
-            "errores": [r for r in resultados if isinstance(r, Exception)]
+            "errores": [r for r in resultados if isinstance(r, Exception)],
+            # Un endpoint con el circuito abierto aparece en errores como CircuitoAbierto
+            # sin haber esperado el timeout
+            "circuitos": CIRCUITOS.estados() if CIRCUITOS is not None else {}
         }
 
 # --- 3. Creación Múltiple con Semáforo ---
@@ -66,10 +219,40 @@ async def crear_con_semaforo(sem, session, datos):
 
 async def crear_multiples_productos(lista_productos):
     sem = asyncio.Semaphore(5) 
-    async with aiohttp.ClientSession() as session:
+    async with nueva_sesion() as session:
         tareas = [crear_con_semaforo(sem, session, p) for p in lista_productos]
         return await asyncio.gather(*tareas)
 
+# --- 4. Operaciones por Lotes (streaming + resumen) ---
+# A diferencia de crear_multiples_productos, no se crea una tarea por producto de golpe:
+# se leen `tamano_lote` elementos por adelantado y los resultados salen conforme terminan.
+async def crear_productos_lote(session, productos, tamano_lote=100, max_concurrencia=5,
+                               al_resultado=None) -> ResumenLote:
+    return await procesar_lote_async(
+        lambda p: crear_producto(session, p), productos,
+        tamano_lote, max_concurrencia, ConflictoRecurso, al_resultado
+    )
+
+async def actualizar_lote(session, cambios, tamano_lote=100, max_concurrencia=5,
+                          al_resultado=None) -> ResumenLote:
+    """`cambios` es un iterable de tuplas (producto_id, campos)."""
+    return await procesar_lote_async(
+        lambda c: actualizar_producto_parcial(session, *c), cambios,
+        tamano_lote, max_concurrencia, ConflictoRecurso, al_resultado
+    )
+
+async def _eliminar_o_fallar(session, producto_id):
+    if not await eliminar_producto(session, producto_id):
+        raise EcoMarketError(f"No se pudo eliminar el producto {producto_id}")
+    return True
+
+async def eliminar_lote(session, producto_ids, tamano_lote=100, max_concurrencia=5,
+                        al_resultado=None) -> ResumenLote:
+    return await procesar_lote_async(
+        lambda i: _eliminar_o_fallar(session, i), producto_ids,
+        tamano_lote, max_concurrencia, ConflictoRecurso, al_resultado
+    )
+
 # --- Manejo de Errores de Red ---
 async def ejecutar_ejemplo():
     print("Iniciando prueba de tiempos...")
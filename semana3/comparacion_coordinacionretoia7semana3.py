@@ -1,5 +1,7 @@
 import asyncio
+import random
 import time
+from hedging import PoliticaHedging
 
 async def fetch(name, delay, fail=False):
     await asyncio.sleep(delay)
@@ -55,11 +57,32 @@ async def estrategia_first_exception():
     print(f"Operación abortada. Una tarea falló. Pendientes canceladas: {len(pending)}")
     for p in pending: p.cancel()
 
+# --- ESTRATEGIA 5: HEDGING (Cola de latencia) ---
+async def estrategia_hedging(n=300):
+    print("\n--- Ejecutando HEDGING (Duplicar las lentas a partir del p95) ---")
+    def latencia():
+        # 3% de las llamadas se quedan atascadas 1s (GC, conexión lenta, réplica cargada)
+        return 1.0 if random.random() < 0.03 else random.uniform(0.01, 0.03)
+
+    for nombre, politica in (("sin hedging", None), ("con hedging", PoliticaHedging(max_tasa=0.1))):
+        tiempos = []
+        for _ in range(n):
+            start = time.time()
+            if politica is None:
+                await fetch("Producto", latencia())
+            else:
+                await politica.ejecutar("producto", lambda: fetch("Producto", latencia()))
+            tiempos.append(time.time() - start)
+        tiempos.sort()
+        extra = f" | Duplicados: {politica.coberturas}" if politica else ""
+        print(f"{nombre}: p50 {tiempos[n // 2]:.3f}s | p99 {tiempos[int(n * 0.99)]:.3f}s{extra}")
+
 async def main():
     await estrategia_gather()
     await estrategia_first_completed()
     await estrategia_as_completed()
     await estrategia_first_exception()
+    await estrategia_hedging()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Generador de carga para el cliente async de EcoMarket (SmartSession + ThrottledClient).
+- Modelo abierto: llegadas a `tasa` peticiones/s (Poisson o a intervalos constantes),
+  independientes de lo que tarde el servidor. Cada petición tiene su instante previsto
+  de envío y la latencia se mide desde ahí: si el generador, el limitador o el pool se
+  atascan, ese retraso cuenta (sin omisión coordinada).
+- Modelo cerrado: `usuarios` concurrentes que piden, esperan la respuesta y piensan
+  un tiempo exponencial de media `pensar` antes de la siguiente.
+- Histogramas log-lineales (histograma.py) de la latencia desde el instante previsto,
+  del tiempo desde el envío real y del retraso de envío.
+- barrer(): curvas throughput-latencia para varios tamaños de pool y límites de concurrencia.
+Uso: python generador_carga.py --modelo abierto --tasas 200 500 1000 --pools 10 100 --limites 0 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+from histograma import Histograma
+from retoia5semana3 import ThrottledClient
+from servidor_local import DISTRIBUCIONES, ServidorEnProceso
+from smart_sessionretoia10semana3 import SmartSession
+
+SIN_LIMITE_DE_TASA = 1e9  # ThrottledClient se usa solo por su límite de concurrencia
+
+@dataclass
+class ResultadoCarga:
+    modelo: str
+    carga: float            # Peticiones/s objetivo (abierto) o usuarios (cerrado)
+    pool: int
+    limite: int             # Límite de concurrencia del ThrottledClient (0 = sin límite)
+    duracion: float
+    ventana: tuple = (0.0, 0.0)  # (inicio, fin) de la medición, en perf_counter
+    enviadas: int = 0
+    completadas: int = 0
+    en_ventana: int = 0     # Completadas dentro de la ventana (enviadas antes o durante)
+    errores: int = 0
+    descartadas: int = 0    # No lanzadas por superar max_en_vuelo (modelo abierto)
+    latencia: Histograma = field(default_factory=Histograma)       # Desde el instante previsto
+    desde_envio: Histograma = field(default_factory=Histograma)    # Desde el envío real
+    retraso_envio: Histograma = field(default_factory=Histograma)  # Envío real - previsto
+
+    def throughput(self):
+        # Lo que el servidor llegó a servir en la ventana: con sobrecarga es menor que la
+        # tasa ofrecida aunque al final se completen todas las enviadas
+        return self.en_ventana / self.duracion if self.duracion else 0.0
+
+    def resumen(self):
+        return {
+            "modelo": self.modelo, "carga": self.carga, "pool": self.pool, "limite": self.limite,
+            "enviadas": self.enviadas, "completadas": self.completadas, "errores": self.errores,
+            "descartadas": self.descartadas, "throughput": self.throughput(),
+            "latencia": {**self.latencia.resumen(), "p999": self.latencia.percentil(99.9)},
+            "desde_envio": self.desde_envio.resumen(),
+            "retraso_envio": self.retraso_envio.resumen(),
+        }
+
+class GeneradorCarga:
+    def __init__(self, url, pool=100, limite=0, max_en_vuelo=10000, rng=None):
+        self.url = url
+        self.pool = pool
+        self.limite = limite
+        self.max_en_vuelo = max_en_vuelo
+        self.rng = rng or random.Random()
+        self.smart = None
+        self.throttled = None
+
+    async def __aenter__(self):
+        self.smart = SmartSession(limit=self.pool)
+        if self.limite:
+            self.throttled = ThrottledClient(self.limite, SIN_LIMITE_DE_TASA)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.smart.__aexit__(*exc)
+
+    async def _pedir(self):
+        async with self.smart.session.get(self.url) as r:
+            await r.read()
+            return r.status
+
+    async def _una(self, previsto, resultado, medir):
+        envio = time.perf_counter()
+        try:
+            if self.throttled is not None:
+                estado, _ = await self.throttled.execute(self._pedir())
+            else:
+                estado = await self._pedir()
+            error = estado >= 400
+        except Exception:
+            error = True
+        fin = time.perf_counter()
+        if resultado.ventana[0] <= fin <= resultado.ventana[1]:
+            resultado.en_ventana += 1
+        if not medir:
+            return
+        resultado.completadas += 1
+        resultado.errores += error
+        resultado.latencia.registrar(fin - previsto)
+        resultado.desde_envio.registrar(fin - envio)
+        resultado.retraso_envio.registrar(envio - previsto)
+
+    async def abierto(self, tasa, duracion, calentamiento=1.0, poisson=True) -> ResultadoCarga:
+        resultado = ResultadoCarga("abierto", tasa, self.pool, self.limite, duracion)
+        inicio = time.perf_counter()
+        medir_desde, fin = resultado.ventana = (inicio + calentamiento, inicio + calentamiento + duracion)
+        tareas = set()
+        previsto = inicio
+        while True:
+            previsto += self.rng.expovariate(tasa) if poisson else 1 / tasa
+            if previsto >= fin:
+                break
+            espera = previsto - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            # Si vamos tarde se lanza ya: el retraso queda en la latencia desde `previsto`
+            medir = previsto >= medir_desde
+            if len(tareas) >= self.max_en_vuelo:
+                resultado.descartadas += medir
+                continue
+            resultado.enviadas += medir
+            tarea = asyncio.create_task(self._una(previsto, resultado, medir))
+            tareas.add(tarea)
+            tarea.add_done_callback(tareas.discard)
+        await asyncio.gather(*tareas)
+        return resultado
+
+    async def cerrado(self, usuarios, duracion, calentamiento=1.0, pensar=0.0) -> ResultadoCarga:
+        resultado = ResultadoCarga("cerrado", usuarios, self.pool, self.limite, duracion)
+        inicio = time.perf_counter()
+        medir_desde, fin = resultado.ventana = (inicio + calentamiento, inicio + calentamiento + duracion)
+
+        async def usuario():
+            previsto = time.perf_counter()
+            while previsto < fin:
+                medir = previsto >= medir_desde
+                resultado.enviadas += medir
+                await self._una(previsto, resultado, medir)
+                previsto = time.perf_counter() + (self.rng.expovariate(1 / pensar) if pensar else 0.0)
+                espera = previsto - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+
+        await asyncio.gather(*[usuario() for _ in range(int(usuarios))])
+        return resultado
+
+async def barrer(url, modelo="abierto", cargas=(100, 200, 400), pools=(100,), limites=(0,),
+                 duracion=5.0, calentamiento=1.0, poisson=True, pensar=0.0, rng=None, al_punto=None):
+    """Un punto de la curva por (pool, límite, carga). Devuelve la lista de resúmenes."""
+    puntos = []
+    for pool in pools:
+        for limite in limites:
+            for carga in cargas:
+                async with GeneradorCarga(url, pool, limite, rng=rng) as generador:
+                    if modelo == "abierto":
+                        resultado = await generador.abierto(carga, duracion, calentamiento, poisson)
+                    else:
+                        resultado = await generador.cerrado(carga, duracion, calentamiento, pensar)
+                puntos.append(resultado.resumen())
+                if al_punto:
+                    al_punto(puntos[-1])
+    return puntos
+
+def imprimir_punto(p):
+    l = {k: v * 1000 for k, v in p["latencia"].items() if k != "n"}
+    print(f"{p['pool']:>6}{p['limite'] or '-':>8}{p['carga']:>9g}{p['throughput']:>10.1f}"
+          f"{l['p50']:>9.1f}{l['p99']:>9.1f}{l['p999']:>9.1f}{l['max']:>9.1f}"
+          f"{p['errores']:>7}{p['descartadas']:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para EcoMarket")
+    parser.add_argument("--url", help="Servidor ya arrancado (por defecto se lanza servidor_local)")
+    parser.add_argument("--ruta", default="/api/productos/1")
+    parser.add_argument("--modelo", choices=("abierto", "cerrado"), default="abierto")
+    parser.add_argument("--tasas", type=float, nargs="+", default=[100, 200, 400], help="Modelo abierto: req/s")
+    parser.add_argument("--usuarios", type=int, nargs="+", default=[1, 10, 50], help="Modelo cerrado")
+    parser.add_argument("--pensar", type=float, default=0.0, help="Modelo cerrado: segundos medios entre peticiones")
+    parser.add_argument("--constante", action="store_true", help="Llegadas a intervalos fijos en vez de Poisson")
+    parser.add_argument("--pools", type=int, nargs="+", default=[100])
+    parser.add_argument("--limites", type=int, nargs="+", default=[0], help="Concurrencia del ThrottledClient (0 = sin límite)")
+    parser.add_argument("--duracion", type=float, default=5.0)
+    parser.add_argument("--calentamiento", type=float, default=1.0)
+    parser.add_argument("--latencia-ms", type=float, default=10.0, help="Servidor local")
+    parser.add_argument("--distribucion", choices=list(DISTRIBUCIONES), default="lognormal", help="Servidor local")
+    parser.add_argument("--salida", help="JSON con todos los puntos")
+    parser.add_argument("--semilla", type=int)
+    args = parser.parse_args()
+
+    cargas = args.tasas if args.modelo == "abierto" else args.usuarios
+    print(f"{'Pool':>6}{'Límite':>8}{'Carga':>9}{'req/s':>10}{'p50 ms':>9}{'p99':>9}{'p99.9':>9}"
+          f"{'max':>9}{'Err':>7}{'Desc':>6}")
+
+    def correr(base):
+        return asyncio.run(barrer(base + args.ruta, args.modelo, cargas, args.pools, args.limites,
+                                  args.duracion, args.calentamiento, not args.constante, args.pensar,
+                                  random.Random(args.semilla), imprimir_punto))
+
+    if args.url:
+        puntos = correr(args.url)
+    else:
+        with ServidorEnProceso("--latencia-ms", args.latencia_ms, "--distribucion", args.distribucion) as servidor:
+            puntos = correr(servidor.url)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"configuracion": vars(args), "puntos": puntos}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Peticiones cubiertas (hedging) para GETs idempotentes.
+Si la petición no ha respondido cuando ya supera el percentil `percentil` de las
+latencias recientes de esa clave, se lanza un duplicado y gana el primero que
+responda bien; el otro se cancela (aiohttp cierra su conexión).
+- Las latencias salen de histogramas vivos por clave: dos ventanas de
+  `muestras_por_ventana` que rotan, así el umbral sigue al régimen actual.
+- Tasa de coberturas acotada: cada petición aporta `max_tasa` fichas (hasta
+  `rafaga`) y cada duplicado gasta una. Con el servidor saturado (todas lentas)
+  no se duplica la carga.
+"""
+import asyncio
+import time
+
+from histograma import Histograma
+
+class _LatenciasVivas:
+    def __init__(self, muestras_por_ventana):
+        self.muestras_por_ventana = muestras_por_ventana
+        self.actual = Histograma()
+        self.anterior = Histograma()
+        self._umbrales = {}
+
+    def registrar(self, latencia):
+        self.actual.registrar(latencia)
+        if self.actual.total >= self.muestras_por_ventana:
+            self.anterior, self.actual = self.actual, Histograma()
+        if self.total() % 10 == 0:
+            self._umbrales.clear()  # Se recalculan como mucho cada 10 muestras
+
+    def total(self):
+        return self.actual.total + self.anterior.total
+
+    def percentil(self, p):
+        if p not in self._umbrales:
+            combinado = Histograma()
+            combinado.fusionar(self.anterior)
+            combinado.fusionar(self.actual)
+            self._umbrales[p] = combinado.percentil(p)
+        return self._umbrales[p]
+
+class PoliticaHedging:
+    def __init__(self, percentil=95, max_tasa=0.05, rafaga=10, minimo_muestras=20,
+                 retraso_minimo=0.002, muestras_por_ventana=1000):
+        self.percentil = percentil
+        self.max_tasa = max_tasa
+        self.rafaga = rafaga
+        self.minimo_muestras = minimo_muestras
+        self.retraso_minimo = retraso_minimo
+        self.muestras_por_ventana = muestras_por_ventana
+        self._latencias = {}
+        self._fichas = float(rafaga)
+        # Métricas
+        self.peticiones = 0
+        self.coberturas = 0            # Duplicados lanzados
+        self.ganadas_por_cobertura = 0
+        self.denegadas = 0             # Superaban el umbral pero no quedaban fichas
+
+    def latencias(self, clave) -> _LatenciasVivas:
+        latencias = self._latencias.get(clave)
+        if latencias is None:
+            latencias = self._latencias[clave] = _LatenciasVivas(self.muestras_por_ventana)
+        return latencias
+
+    def retraso(self, clave):
+        """Segundos antes de cubrir, o None mientras no haya muestras suficientes."""
+        latencias = self.latencias(clave)
+        if latencias.total() < self.minimo_muestras:
+            return None
+        return max(self.retraso_minimo, latencias.percentil(self.percentil))
+
+    async def _medir(self, clave, llamada):
+        inicio = time.monotonic()
+        resultado = await llamada()
+        self.latencias(clave).registrar(time.monotonic() - inicio)
+        return resultado
+
+    async def ejecutar(self, clave, llamada):
+        """`llamada()` devuelve una corrutina nueva en cada invocación (una por intento)."""
+        self.peticiones += 1
+        self._fichas = min(self.rafaga, self._fichas + self.max_tasa)
+        primaria = asyncio.ensure_future(self._medir(clave, llamada))
+        tareas = [primaria]
+        try:
+            retraso = self.retraso(clave)
+            if retraso is None:
+                return await primaria
+            hechas, _ = await asyncio.wait(tareas, timeout=retraso)
+            if not hechas:
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    self.coberturas += 1
+                    tareas.append(asyncio.ensure_future(self._medir(clave, llamada)))
+                else:
+                    self.denegadas += 1
+            pendientes = set(tareas)
+            while pendientes:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        if tarea is not primaria:
+                            self.ganadas_por_cobertura += 1
+                        return tarea.result()
+            return primaria.result()  # Fallaron todas: se propaga el error de la primaria
+        finally:
+            for tarea in tareas:
+                if not tarea.done():
+                    tarea.cancel()
+                elif not tarea.cancelled():
+                    tarea.exception()  # Marca como leído el error de la que perdió
+
+    def metricas(self):
+        return {
+            "peticiones": self.peticiones,
+            "coberturas": self.coberturas,
+            "tasa_cobertura": self.coberturas / self.peticiones if self.peticiones else 0.0,
+            "ganadas_por_cobertura": self.ganadas_por_cobertura,
+            "denegadas": self.denegadas,
+            "umbrales": {clave: self.retraso(clave) for clave in self._latencias},
+        }
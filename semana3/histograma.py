@@ -0,0 +1,83 @@
+"""
+Histograma log-lineal (estilo HDR): cada potencia de 2 se divide en SUBCUBETAS
+cubetas iguales, así el error relativo de cualquier percentil queda acotado
+(~1/SUBCUBETAS) con memoria fija y registro O(1). Sirve para latencias en
+segundos, profundidades de cola o cualquier magnitud positiva.
+"""
+import math
+from collections import defaultdict
+
+SUBCUBETAS = 64
+
+class Histograma:
+    def __init__(self):
+        self._cubetas = defaultdict(int)
+        self.ceros = 0
+        self.total = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def registrar(self, valor, veces=1):
+        self.total += veces
+        self.suma += valor * veces
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+        if valor <= 0:
+            self.ceros += veces
+            return
+        mantisa, exponente = math.frexp(valor)  # valor = mantisa * 2**exponente, mantisa en [0.5, 1)
+        self._cubetas[exponente * SUBCUBETAS + int((mantisa - 0.5) * 2 * SUBCUBETAS)] += veces
+
+    @staticmethod
+    def _valor_cubeta(indice):
+        exponente, sub = divmod(indice, SUBCUBETAS)
+        return math.ldexp(0.5 + (sub + 0.5) / (2 * SUBCUBETAS), exponente)
+
+    def percentil(self, p):
+        """p en [0, 100]. Devuelve el valor representativo de la cubeta correspondiente."""
+        if not self.total:
+            return 0.0
+        objetivo = max(1, math.ceil(self.total * p / 100))
+        acumulado = self.ceros
+        if acumulado >= objetivo:
+            return 0.0
+        for indice in sorted(self._cubetas):
+            acumulado += self._cubetas[indice]
+            if acumulado >= objetivo:
+                return min(self._valor_cubeta(indice), self.maximo)
+        return self.maximo
+
+    def media(self):
+        return self.suma / self.total if self.total else 0.0
+
+    def fusionar(self, otro):
+        for indice, cuenta in otro._cubetas.items():
+            self._cubetas[indice] += cuenta
+        self.ceros += otro.ceros
+        self.total += otro.total
+        self.suma += otro.suma
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def cubetas(self):
+        """Pares (limite_superior, cuenta) ordenados; útil para exportar."""
+        pares = [(0.0, self.ceros)] if self.ceros else []
+        for indice in sorted(self._cubetas):
+            exponente, sub = divmod(indice, SUBCUBETAS)
+            limite = math.ldexp(0.5 + (sub + 1) / (2 * SUBCUBETAS), exponente)
+            pares.append((limite, self._cubetas[indice]))
+        return pares
+
+    def resumen(self):
+        return {
+            "n": self.total,
+            "media": self.media(),
+            "min": self.minimo if self.total else 0.0,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+            "max": self.maximo,
+        }
@@ -1,72 +1,103 @@
 import asyncio
 import aiohttp
 import time
+from cache_http import Respuesta
+from plazos import PlazoAgotado, con_plazo, dentro_del_plazo
 
 BASE_URL = "http://localhost:3000/api"
 
+# Todas las funciones trabajan dentro del plazo del contexto (plazos.con_plazo): un
+# timeout anidado nunca dura más que el del llamador, y cada subpetición usa lo que queda.
+async def obtener(session, url) -> Respuesta:
+    """GET que lee el cuerpo y devuelve la conexión al pool. Si se cancela (plazo
+    agotado o tarea padre cancelada), aiohttp cierra la conexión a medio leer."""
+    async def pedir():
+        async with session.get(url) as resp:
+            return Respuesta(resp.status, resp.headers, await resp.read())
+    return await dentro_del_plazo(pedir())
+
+async def _cancelar_y_esperar(tareas):
+    """Cancela las pendientes y espera a que terminen: así liberan su conexión ya."""
+    for t in tareas:
+        if not t.done():
+            t.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+
 # --- 1. Timeout Individual con Wrapper ---
 async def peticion_con_timeout(coro, segundos):
-    """Envuelve una petición con un tiempo límite específico."""
-    try:
-        return await asyncio.wait_for(coro, timeout=segundos)
-    except asyncio.TimeoutError:
-        print(f"⚠️ [Timeout] Una petición excedió los {segundos}s y fue abortada.")
-        return None
+    """Envuelve una petición con un tiempo límite específico (acotado por el plazo actual)."""
+    with con_plazo(segundos) as plazo:
+        try:
+            return await plazo.cumplir(coro)
+        except PlazoAgotado:
+            print(f"⚠️ [Timeout] Una petición excedió los {segundos}s (o el plazo del llamador) y fue abortada.")
+            return None
 
 # --- 2. Cancelación en Grupo ---
-async def cargar_con_seguridad(session):
+async def cargar_con_seguridad(session, segundos=None):
     """Si el perfil falla con 401, cancela todo lo demás."""
-    tareas = {
-        "productos": asyncio.create_task(session.get(f"{BASE_URL}/productos")),
-        "perfil": asyncio.create_task(session.get(f"{BASE_URL}/perfil")) # Simular 401 aquí
-    }
+    with con_plazo(segundos):
+        # Las tareas heredan el plazo al crearse
+        tareas = {
+            "productos": asyncio.create_task(obtener(session, f"{BASE_URL}/productos")),
+            "perfil": asyncio.create_task(obtener(session, f"{BASE_URL}/perfil")) # Simular 401 aquí
+        }
     
     try:
-        # Esperamos a que cualquiera termine
-        done, pending = await asyncio.wait(tareas.values(), return_when=asyncio.FIRST_COMPLETED)
-        
-        for task in done:
-            resp = await task
-            if resp.url.path.endswith("/perfil") and resp.status == 401:
+        pendientes = set(tareas.values())
+        while pendientes:
+            done, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            perfil = tareas["perfil"]
+            if perfil in done and perfil.exception() is None and perfil.result().status == 401:
                 print("🚨 [Auth] 401 Detectado. Cancelando peticiones restantes...")
-                for p in pending:
-                    p.cancel()
                 return {"error": "No autorizado", "data": None}
-                
+
+        for task in tareas.values():
+            task.result()  # Propaga el error de red / PlazoAgotado
         return {"error": None, "data": "Dashboard cargado"}
     except Exception as e:
-        return {"error": str(e)}
+        return {"error": str(e) or type(e).__name__}
+    finally:
+        # También si nos cancelan a nosotros: ninguna petición queda huérfana
+        await _cancelar_y_esperar(tareas.values())
 
 # --- 3. Carga con Prioridad (Procesamiento conforme llegan) ---
-async def cargar_con_prioridad(session):
+async def _con_ruta(ruta, coro):
+    return ruta, await coro
+
+async def cargar_con_prioridad(session, segundos=None):
     """Procesa resultados conforme llegan y prioriza datos críticos."""
-    urls = [
-        f"{BASE_URL}/productos",  # Crítica
-        f"{BASE_URL}/perfil",     # Crítica
-        f"{BASE_URL}/categorias", # Secundaria (lenta)
-        f"{BASE_URL}/pedidos"     # Secundaria
+    rutas = [
+        "/productos",  # Crítica
+        "/perfil",     # Crítica
+        "/categorias", # Secundaria (lenta)
+        "/pedidos"     # Secundaria
     ]
     
-    tareas = [asyncio.create_task(session.get(u)) for u in urls]
+    with con_plazo(segundos):
+        tareas = [asyncio.create_task(_con_ruta(r, obtener(session, f"{BASE_URL}{r}"))) for r in rutas]
     criticos_listos = 0
     resultados = []
 
-    # as_completed nos da un iterador que rinde conforme terminan
-    for coro_listo in asyncio.as_completed(tareas):
-        try:
-            resp = await coro_listo
-            resultados.append(resp.url.path)
-            print(f"✅ Llegó respuesta de: {resp.url.path}")
-            
-            # Lógica de prioridad
-            if "/productos" in resp.url.path or "/perfil" in resp.url.path:
-                criticos_listos += 1
-            
-            if criticos_listos == 2:
-                print("⚡ [Prioridad] Datos críticos listos. Renderizando Dashboard Parcial...")
+    try:
+        # as_completed nos da un iterador que rinde conforme terminan
+        for coro_listo in asyncio.as_completed(tareas):
+            try:
+                ruta, resp = await coro_listo
+                resultados.append(ruta)
+                print(f"✅ Llegó respuesta de: {ruta}")
+                
+                # Lógica de prioridad
+                if ruta in ("/productos", "/perfil"):
+                    criticos_listos += 1
                 
-        except Exception as e:
-            print(f"❌ Error en petición: {e}")
+                if criticos_listos == 2:
+                    print("⚡ [Prioridad] Datos críticos listos. Renderizando Dashboard Parcial...")
+                    
+            except Exception as e:
+                print(f"❌ Error en petición: {type(e).__name__} {e}")
+    finally:
+        await _cancelar_y_esperar(tareas)
 
     return resultados
 
@@ -76,11 +107,12 @@ async def main():
         print("\n--- TEST 1: Timeout Individual ---")
         # Simulamos que categorías tarda 8s, pero el timeout es 3s
         # (En un server real se vería el delay, aquí usamos un mock mental)
-        res = await peticion_con_timeout(session.get(f"{BASE_URL}/productos"), 5)
+        res = await peticion_con_timeout(obtener(session, f"{BASE_URL}/productos"), 5)
         print("Productos completado con éxito.")
 
         print("\n--- TEST 2: Carga con Prioridad ---")
-        await cargar_con_prioridad(session)
+        # Presupuesto total de 3s para las cuatro peticiones
+        await cargar_con_prioridad(session, segundos=3)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import codecs
+import json
+import re
+
+_ESPACIOS = re.compile(r"[ \t\n\r]*")
+
+class ErrorJSONIncremental(ValueError):
+    pass
+
+class ParserArrayJSON:
+    """
+    Parser incremental de un array JSON de nivel superior: [ {...}, {...}, ... ].
+    Se alimenta con trozos de bytes (tal como llegan por la red) y devuelve cada
+    elemento en cuanto está completo, sin guardar el documento entero en memoria.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self._decoder_texto = codecs.getincrementaldecoder(encoding)()
+        self._decoder_json = json.JSONDecoder()
+        self._buffer = ""
+        self._estado = "inicio"  # inicio -> elemento -> separador -> ... -> fin
+
+    def alimentar(self, trozo: bytes) -> list:
+        self._buffer += self._decoder_texto.decode(trozo)
+        return self._procesar()
+
+    def terminar(self) -> list:
+        """Procesa lo que quede en el buffer y verifica que el array se cerró."""
+        self._buffer += self._decoder_texto.decode(b"", final=True)
+        elementos = self._procesar()
+        if self._estado != "fin" or self._buffer:
+            raise ErrorJSONIncremental("El array JSON está incompleto")
+        return elementos
+
+    def _procesar(self) -> list:
+        elementos = []
+        pos = 0
+        buffer = self._buffer
+        while True:
+            pos = _ESPACIOS.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            caracter = buffer[pos]
+
+            if self._estado == "inicio":
+                if caracter != "[":
+                    raise ErrorJSONIncremental("Se esperaba un array JSON")
+                pos += 1
+                self._estado = "primero"
+            elif self._estado in ("primero", "separador") and caracter == "]":
+                pos += 1
+                self._estado = "fin"
+            elif self._estado == "separador":
+                if caracter != ",":
+                    raise ErrorJSONIncremental(f"Se esperaba ',' o ']' en la posición {pos}")
+                pos += 1
+                self._estado = "elemento"
+            elif self._estado in ("primero", "elemento"):
+                try:
+                    valor, fin = self._decoder_json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Elemento incompleto: esperamos al siguiente trozo
+                if fin == len(buffer):
+                    # Un número al final del buffer podría continuar en el siguiente trozo
+                    break
+                elementos.append(valor)
+                pos = fin
+                self._estado = "separador"
+            else:
+                raise ErrorJSONIncremental("Datos después del final del array")
+
+        # Solo se conserva lo que aún no se ha consumido: memoria constante
+        self._buffer = buffer[pos:]
+        return elementos
@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from itertools import islice
+
+# Estados posibles de cada elemento de un lote
+OK, CONFLICTO, FALLO = "ok", "conflicto", "fallo"
+
+@dataclass
+class ResultadoItem:
+    indice: int
+    item: object
+    estado: str
+    valor: object = None  # Respuesta del servidor o la excepción capturada
+
+@dataclass
+class ResumenLote:
+    """Resumen de un lote: solo se guardan en memoria los conflictos y fallos."""
+    exitos: int = 0
+    conflictos: list = field(default_factory=list)
+    fallos: list = field(default_factory=list)
+
+    @property
+    def total(self):
+        return self.exitos + len(self.conflictos) + len(self.fallos)
+
+    def registrar(self, resultado):
+        if resultado.estado == OK:
+            self.exitos += 1
+        elif resultado.estado == CONFLICTO:
+            self.conflictos.append(resultado)
+        else:
+            self.fallos.append(resultado)
+
+def _clasificar(indice, item, error, valor, conflicto):
+    if error is None:
+        return ResultadoItem(indice, item, OK, valor)
+    if isinstance(error, conflicto):
+        return ResultadoItem(indice, item, CONFLICTO, error)
+    return ResultadoItem(indice, item, FALLO, error)
+
+# --- 1. Versión síncrona (hilos) ---
+def _ejecutar(operacion, indice, item, conflicto):
+    try:
+        return _clasificar(indice, item, None, operacion(item), conflicto)
+    except Exception as e:
+        return _clasificar(indice, item, e, None, conflicto)
+
+def iterar_lote(operacion, items, tamano_lote=100, max_concurrencia=5, conflicto=()):
+    """
+    Aplica `operacion` a cada item y rinde los ResultadoItem conforme terminan.
+    Nunca lee más de `tamano_lote` elementos de `items` por adelantado.
+    """
+    entrada = enumerate(items)
+    executor = ThreadPoolExecutor(max_workers=max_concurrencia)
+    pendientes = set()
+
+    def rellenar():
+        for indice, item in islice(entrada, tamano_lote - len(pendientes)):
+            pendientes.add(executor.submit(_ejecutar, operacion, indice, item, conflicto))
+
+    try:
+        rellenar()
+        while pendientes:
+            hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                yield futuro.result()
+            rellenar()
+    finally:
+        # Si el consumidor abandona la iteración se descarta lo que aún no ha empezado;
+        # las operaciones ya en curso (como mucho max_concurrencia) terminan en segundo plano
+        executor.shutdown(wait=not pendientes, cancel_futures=True)
+
+def procesar_lote(operacion, items, tamano_lote=100, max_concurrencia=5,
+                  conflicto=(), al_resultado=None) -> ResumenLote:
+    resumen = ResumenLote()
+    for resultado in iterar_lote(operacion, items, tamano_lote, max_concurrencia, conflicto):
+        resumen.registrar(resultado)
+        if al_resultado:
+            al_resultado(resultado)
+    return resumen
+
+# --- 2. Versión asíncrona (tareas) ---
+async def _ejecutar_async(sem, operacion, indice, item, conflicto):
+    async with sem:
+        try:
+            return _clasificar(indice, item, None, await operacion(item), conflicto)
+        except Exception as e:
+            return _clasificar(indice, item, e, None, conflicto)
+
+async def iterar_lote_async(operacion, items, tamano_lote=100, max_concurrencia=5, conflicto=()):
+    """Igual que iterar_lote, pero `operacion` es una corrutina por item."""
+    sem = asyncio.Semaphore(max_concurrencia)
+    entrada = enumerate(items)
+    pendientes = set()
+
+    def rellenar():
+        for indice, item in islice(entrada, tamano_lote - len(pendientes)):
+            pendientes.add(asyncio.create_task(
+                _ejecutar_async(sem, operacion, indice, item, conflicto)
+            ))
+
+    rellenar()
+    try:
+        while pendientes:
+            hechos, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in hechos:
+                yield tarea.result()
+            rellenar()
+    finally:
+        # Si el consumidor abandona la iteración no dejamos tareas huérfanas
+        for tarea in pendientes:
+            tarea.cancel()
+
+async def procesar_lote_async(operacion, items, tamano_lote=100, max_concurrencia=5,
+                              conflicto=(), al_resultado=None) -> ResumenLote:
+    resumen = ResumenLote()
+    async for resultado in iterar_lote_async(operacion, items, tamano_lote, max_concurrencia, conflicto):
+        resumen.registrar(resultado)
+        if al_resultado:
+            al_resultado(resultado)
+    return resumen
@@ -0,0 +1,337 @@
+"""
+Instrumentación compartida por los clientes (requests, aiohttp, httpx) y los limitadores.
+- Métricas: Contador, Medidor (gauge) e HistogramaMetrica (sobre histograma.Histograma),
+  con etiquetas posicionales. Exportación en formato de texto de Prometheus.
+- Desactivada (lo normal) cada observación es una comprobación de `registro.activo`
+  y nada más. Se activa con activar() o con ECOMARKET_METRICAS=1.
+- Enganches: trace_config_aiohttp() (latencia por endpoint/método/estado, peticiones
+  en vuelo, conexiones creadas/reutilizadas y espera por el pool), TransporteMedido (httpx)
+  y hook_requests(). medir_pool() publica las conexiones ociosas/ocupadas de un conector;
+  trazas_aiohttp() solo engancha el TraceConfig si las métricas están activas.
+"""
+import math
+import os
+import re
+import time
+import weakref
+from types import SimpleNamespace
+
+from histograma import Histograma
+
+# Límites (segundos) de las cubetas exportadas; los percentiles salen del Histograma
+CUBETAS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_NUMERICO = re.compile(r"/\d+(?=/|$)")
+
+def endpoint_de(ruta):
+    """'/api/productos/7/precio' -> '/api/productos/{id}/precio' (cardinalidad acotada)."""
+    return _NUMERICO.sub("/{id}", ruta)
+
+def _escapar(valor):
+    """Escapes del formato de texto en valores de etiqueta: barra invertida, comillas y saltos de línea."""
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres, valores, extra=""):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _numero(valor):
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=()):
+        self.registro = registro
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}  # tupla de valores de etiquetas -> valor
+
+    def exportar(self):
+        lineas = self._cabecera()
+        for clave, valor in sorted(self.valores.items()):
+            lineas.append(f"{self.nombre}{self._sufijo()}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}")
+        return lineas
+
+    def _cabecera(self):
+        # En HELP solo se escapan la barra invertida y los saltos de línea
+        ayuda = self.ayuda.replace("\\", "\\\\").replace("\n", "\\n")
+        return [f"# HELP {self.nombre} {ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def _sufijo(self):
+        return ""
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, *etiquetas, valor=1):
+        if self.registro.activo:
+            self.valores[etiquetas] = self.valores.get(etiquetas, 0) + valor
+
+    def _sufijo(self):
+        return "_total"
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=(), funcion=None):
+        super().__init__(registro, nombre, ayuda, etiquetas)
+        self.funcion = funcion  # Si se da, el valor se calcula al exportar: {etiquetas: valor}
+
+    def sumar(self, *etiquetas, valor=1):
+        if self.registro.activo:
+            self.valores[etiquetas] = self.valores.get(etiquetas, 0) + valor
+
+    def fijar(self, *etiquetas, valor):
+        if self.registro.activo:
+            self.valores[etiquetas] = valor
+
+    def exportar(self):
+        if self.funcion is not None:
+            self.valores = {tuple(k) if isinstance(k, tuple) else (k,): v for k, v in self.funcion().items()}
+        return super().exportar()
+
+class HistogramaMetrica(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=(), cubetas=CUBETAS):
+        super().__init__(registro, nombre, ayuda, etiquetas)
+        self.cubetas = tuple(cubetas) + (math.inf,)
+
+    def observar(self, valor, *etiquetas):
+        if self.registro.activo:
+            histograma = self.valores.get(etiquetas)
+            if histograma is None:
+                histograma = self.valores[etiquetas] = Histograma()
+            histograma.registrar(valor)
+
+    def histograma(self, *etiquetas) -> Histograma:
+        return self.valores.get(etiquetas) or Histograma()
+
+    def exportar(self):
+        lineas = self._cabecera()
+        for clave, histograma in sorted(self.valores.items()):
+            pares = histograma.cubetas()  # (límite superior, cuenta) ordenados
+            acumulado, i = 0, 0
+            for limite in self.cubetas:
+                while i < len(pares) and pares[i][0] <= limite:
+                    acumulado += pares[i][1]
+                    i += 1
+                if limite == math.inf:
+                    acumulado = histograma.total
+                le = f'le="{_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(histograma.suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {histograma.total}")
+        return lineas
+
+class Registro:
+    def __init__(self, prefijo="ecomarket_", activo=False):
+        self.prefijo = prefijo
+        self.activo = activo
+        self._metricas = {}
+        self.pools = {}  # cliente -> weakref al conector de aiohttp, para medir_pool()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **opciones):
+        nombre = self.prefijo + nombre
+        metrica = self._metricas.get(nombre)
+        if metrica is None:
+            metrica = self._metricas[nombre] = clase(self, nombre, ayuda, etiquetas, **opciones)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()) -> Contador:
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda, etiquetas=(), funcion=None) -> Medidor:
+        return self._obtener(Medidor, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS) -> HistogramaMetrica:
+        return self._obtener(HistogramaMetrica, nombre, ayuda, etiquetas, cubetas=cubetas)
+
+    def exportar(self) -> str:
+        """Texto de exposición de Prometheus (text/plain; version=0.0.4)."""
+        lineas = []
+        for nombre in sorted(self._metricas):
+            lineas += self._metricas[nombre].exportar()
+        return "\n".join(lineas) + "\n"
+
+    def reiniciar(self):
+        for metrica in self._metricas.values():
+            metrica.valores = {}
+
+REGISTRO = Registro(activo=os.environ.get("ECOMARKET_METRICAS") == "1")
+
+def activar(activo=True):
+    REGISTRO.activo = activo
+
+# --- Métricas comunes ---
+def metricas_http(registro=REGISTRO):
+    return SimpleNamespace(
+        latencia=registro.histograma("http_latencia_segundos", "Latencia de las peticiones HTTP",
+                                     ("cliente", "metodo", "endpoint", "estado")),
+        en_vuelo=registro.medidor("http_en_vuelo", "Peticiones HTTP en curso", ("cliente",)),
+        errores=registro.contador("http_errores", "Peticiones sin respuesta (red, timeout...)",
+                                  ("cliente", "metodo", "endpoint", "error")),
+        creadas=registro.contador("pool_conexiones_creadas", "Conexiones nuevas abiertas", ("cliente",)),
+        reutilizadas=registro.contador("pool_conexiones_reutilizadas", "Peticiones sobre una conexión keep-alive",
+                                       ("cliente",)),
+        espera_pool=registro.histograma("pool_espera_segundos", "Espera por una conexión libre del pool",
+                                        ("cliente",)),
+    )
+
+# --- aiohttp ---
+def trace_config_aiohttp(cliente="aiohttp", registro=REGISTRO):
+    """aiohttp.TraceConfig para ClientSession(trace_configs=[...])."""
+    import aiohttp
+
+    m = metricas_http(registro)
+    traza = aiohttp.TraceConfig()
+
+    async def inicio(session, ctx, params):
+        if registro.activo:
+            ctx.inicio = time.perf_counter()
+            m.en_vuelo.sumar(cliente)
+
+    async def fin(session, ctx, params):
+        if registro.activo and hasattr(ctx, "inicio"):
+            m.en_vuelo.sumar(cliente, valor=-1)
+            m.latencia.observar(time.perf_counter() - ctx.inicio, cliente, params.method,
+                                endpoint_de(params.url.path), params.response.status)
+
+    async def excepcion(session, ctx, params):
+        if registro.activo and hasattr(ctx, "inicio"):
+            m.en_vuelo.sumar(cliente, valor=-1)
+            m.errores.inc(cliente, params.method, endpoint_de(params.url.path), type(params.exception).__name__)
+
+    async def creada(session, ctx, params):
+        m.creadas.inc(cliente)
+
+    async def reutilizada(session, ctx, params):
+        m.reutilizadas.inc(cliente)
+
+    async def en_cola(session, ctx, params):
+        if registro.activo:
+            ctx.en_cola = time.perf_counter()
+
+    async def fuera_de_cola(session, ctx, params):
+        if registro.activo and hasattr(ctx, "en_cola"):
+            m.espera_pool.observar(time.perf_counter() - ctx.en_cola, cliente)
+
+    traza.on_request_start.append(inicio)
+    traza.on_request_end.append(fin)
+    traza.on_request_exception.append(excepcion)
+    traza.on_connection_create_end.append(creada)
+    traza.on_connection_reuseconn.append(reutilizada)
+    traza.on_connection_queued_start.append(en_cola)
+    traza.on_connection_queued_end.append(fuera_de_cola)
+    return traza
+
+def trazas_aiohttp(cliente="aiohttp", registro=REGISTRO):
+    """
+    trace_configs para una ClientSession nueva: vacío si las métricas están desactivadas.
+    Con cualquier TraceConfig aiohttp crea el contexto de traza y espera cada señal en
+    todas las peticiones, aunque luego no se registre nada.
+    """
+    return [trace_config_aiohttp(cliente, registro)] if registro.activo else []
+
+def _conectores(registro):
+    for cliente, referencia in list(registro.pools.items()):
+        conector = referencia()
+        if conector is None or conector.closed:
+            del registro.pools[cliente]
+        else:
+            yield cliente, conector
+
+def medir_pool(conector, cliente="aiohttp", registro=REGISTRO):
+    """
+    Medidores de conexiones ociosas y ocupadas de un aiohttp.TCPConnector, leídos al
+    exportar. Solo se guarda una referencia débil; olvidar_pool() lo quita al cerrar.
+    """
+    registro.pools[cliente] = weakref.ref(conector)
+    registro.medidor("pool_conexiones_ociosas", "Conexiones keep-alive libres", ("cliente",),
+                     funcion=lambda: {c: sum(len(v) for v in con._conns.values()) for c, con in _conectores(registro)})
+    registro.medidor("pool_conexiones_ocupadas", "Conexiones en uso", ("cliente",),
+                     funcion=lambda: {c: len(con._acquired) for c, con in _conectores(registro)})
+
+def olvidar_pool(conector, cliente="aiohttp", registro=REGISTRO):
+    referencia = registro.pools.get(cliente)
+    if referencia is not None and referencia() is conector:
+        del registro.pools[cliente]
+
+# --- httpx ---
+try:
+    import httpx
+
+    class TransporteMedido(httpx.AsyncBaseTransport):
+        """
+        Transporte de httpx.AsyncClient(transport=...) que mide cada petición. A
+        diferencia de los event_hooks, ve también las que fallan (red, timeouts):
+        el medidor de en vuelo siempre se descuenta y el error queda en http_errores.
+        Las conexiones nuevas se detectan con la traza de httpcore.
+        """
+
+        def __init__(self, cliente="httpx", transporte=None, registro=REGISTRO, **kwargs):
+            self.cliente = cliente
+            self.registro = registro
+            self.m = metricas_http(registro)
+            self._transporte = transporte or httpx.AsyncHTTPTransport(**kwargs)
+
+        async def handle_async_request(self, request):
+            if not self.registro.activo:
+                return await self._transporte.handle_async_request(request)
+            m, cliente = self.m, self.cliente
+            conexion = {"creada": False}
+            request.extensions = {**request.extensions,
+                                  "trace": _traza_httpx(conexion, request.extensions.get("trace"))}
+            endpoint = endpoint_de(request.url.path)
+            m.en_vuelo.sumar(cliente)
+            inicio = time.perf_counter()
+            try:
+                response = await self._transporte.handle_async_request(request)
+            except Exception as e:
+                m.errores.inc(cliente, request.method, endpoint, type(e).__name__)
+                raise
+            finally:
+                m.en_vuelo.sumar(cliente, valor=-1)
+            (m.creadas if conexion["creada"] else m.reutilizadas).inc(cliente)
+            m.latencia.observar(time.perf_counter() - inicio, cliente, request.method, endpoint,
+                                response.status_code)
+            return response
+
+        async def aclose(self):
+            await self._transporte.aclose()
+except ImportError:
+    pass
+
+def _traza_httpx(conexion, anterior=None):
+    async def traza(evento, info):
+        if evento == "connection.connect_tcp.complete":
+            conexion["creada"] = True
+        if anterior is not None:
+            await anterior(evento, info)
+    return traza
+
+# --- requests ---
+def hook_requests(cliente="requests", registro=REGISTRO):
+    """Hook de respuesta para requests.Session().hooks["response"] (usa response.elapsed)."""
+    m = metricas_http(registro)
+
+    def hook(response, *args, **kwargs):
+        if registro.activo:
+            m.latencia.observar(response.elapsed.total_seconds(), cliente, response.request.method,
+                                endpoint_de(response.request.path_url.split("?")[0]), response.status_code)
+    return hook
+
+# --- Exposición ---
+def manejador_aiohttp(registro=REGISTRO):
+    """Handler de aiohttp.web para servir /metrics."""
+    from aiohttp import web
+
+    async def metricas(request):
+        return web.Response(text=registro.exportar(), content_type="text/plain",
+                            headers={"X-Prometheus-Version": "0.0.4"})
+    return metricas
@@ -0,0 +1,106 @@
+"""
+Recorrido paginado (page/limit) con lectura anticipada: mientras el consumidor
+procesa la página actual ya están en vuelo las `ventana` siguientes.
+Con paginación por cursor no se puede pedir la página N+1 sin la respuesta de la N,
+por eso aquí solo se soporta page/limit, que es lo que expone la API.
+El recorrido termina con la primera página incompleta, con una página idéntica a la
+anterior (el servidor ignora `page`), con una página mayor que `limite` (ignora `limit`
+y lo ha devuelto todo) o al llegar a `max_paginas`.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class _Config:
+    def __init__(self, obtener_pagina, limite, ventana, max_items_en_memoria, primera_pagina, max_paginas):
+        self.obtener_pagina = obtener_pagina
+        self.limite = limite
+        self.primera_pagina = primera_pagina
+        self.fin = None if max_paginas is None else primera_pagina + max_paginas
+        # Como mucho (ventana + 1) páginas en memoria: las pedidas más la actual
+        if max_items_en_memoria // limite < 2:
+            raise ValueError(f"max_items_en_memoria={max_items_en_memoria} no da para la página actual "
+                             f"y una más de {limite} elementos")
+        self.ventana = min(ventana, max_items_en_memoria // limite - 1)
+
+    def _quedan(self, numero):
+        return self.fin is None or numero < self.fin
+
+    def _ultima(self, pagina):
+        return len(pagina) != self.limite
+
+# --- 1. Versión síncrona ---
+class Paginador(_Config):
+    """`obtener_pagina(numero)` devuelve la lista de elementos de esa página."""
+
+    def __init__(self, obtener_pagina, limite=100, ventana=3, max_items_en_memoria=5000, primera_pagina=1,
+                 max_paginas=None):
+        super().__init__(obtener_pagina, limite, ventana, max_items_en_memoria, primera_pagina, max_paginas)
+
+    def paginas(self):
+        executor = ThreadPoolExecutor(max_workers=self.ventana)
+        siguiente = self.primera_pagina
+        pendientes = deque()
+        anterior = None
+        try:
+            while len(pendientes) < self.ventana and self._quedan(siguiente):
+                pendientes.append(executor.submit(self.obtener_pagina, siguiente))
+                siguiente += 1
+            while pendientes:
+                pagina = pendientes.popleft().result()
+                if pagina == anterior:
+                    return  # El servidor repite la página: no hay más
+                if self._ultima(pagina):
+                    # Última página: lo que quede en vuelo ya no hace falta
+                    yield pagina
+                    return
+                if self._quedan(siguiente):
+                    pendientes.append(executor.submit(self.obtener_pagina, siguiente))
+                    siguiente += 1
+                anterior = pagina
+                yield pagina
+        finally:
+            # Con max_workers == ventana todo lo pedido ya está en curso: no se espera a
+            # esas peticiones, terminan en segundo plano y su resultado se descarta
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __iter__(self):
+        for pagina in self.paginas():
+            yield from pagina
+
+# --- 2. Versión asíncrona ---
+class PaginadorAsync(_Config):
+    """`obtener_pagina(numero)` es una corrutina que devuelve la lista de esa página."""
+
+    def __init__(self, obtener_pagina, limite=100, ventana=3, max_items_en_memoria=5000, primera_pagina=1,
+                 max_paginas=None):
+        super().__init__(obtener_pagina, limite, ventana, max_items_en_memoria, primera_pagina, max_paginas)
+
+    async def paginas(self):
+        siguiente = self.primera_pagina
+        pendientes = deque()
+        anterior = None
+        try:
+            while len(pendientes) < self.ventana and self._quedan(siguiente):
+                pendientes.append(asyncio.create_task(self.obtener_pagina(siguiente)))
+                siguiente += 1
+            while pendientes:
+                pagina = await pendientes.popleft()
+                if pagina == anterior:
+                    return
+                if self._ultima(pagina):
+                    yield pagina
+                    return
+                if self._quedan(siguiente):
+                    pendientes.append(asyncio.create_task(self.obtener_pagina(siguiente)))
+                    siguiente += 1
+                anterior = pagina
+                yield pagina
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    async def __aiter__(self):
+        async for pagina in self.paginas():
+            for item in pagina:
+                yield item
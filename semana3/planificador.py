@@ -0,0 +1,118 @@
+"""
+Planificador de sondeos: decide cuánto esperar hasta el siguiente según el resultado
+del anterior.
+- Sin cambios el intervalo crece hasta `maximo`; un cambio lo devuelve a `base`.
+- Un 304 (If-None-Match) cuesta poco al servidor: el intervalo crece más despacio y
+  con un techo menor (`maximo_304`), así se detectan antes los cambios.
+- Sobrecarga (429/503) y errores de red: backoff exponencial con jitter completo o
+  decorrelado. Retry-After del servidor es un mínimo que siempre se respeta.
+- Los sondeos normales llevan una dispersión de ±`dispersion` para que una flota
+  de monitores arrancada a la vez no consulte al mismo tiempo.
+"""
+import random
+from collections import Counter, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from histograma import Histograma
+
+# Resultado de un sondeo
+CAMBIO = "cambio"
+SIN_CAMBIO = "sin_cambio"        # 200 con el mismo contenido
+NO_MODIFICADO = "no_modificado"  # 304 o copia fresca de la caché
+SOBRECARGA = "sobrecarga"        # 429 / 503
+ERROR = "error"                  # Red o 5xx
+FALLO_CLIENTE = "fallo_cliente"  # 4xx: reintentar no lo arregla, se espera lo máximo
+
+def segundos_retry_after(valor, ahora=None):
+    """Retry-After en segundos o como fecha HTTP; None si no viene o no se entiende."""
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (fecha - (ahora or datetime.now(timezone.utc))).total_seconds())
+
+# --- Estrategias de jitter para el backoff: (objetivo, anterior, base, tope, rng) -> espera ---
+def sin_jitter(objetivo, anterior, base, tope, rng):
+    return objetivo
+
+def jitter_completo(objetivo, anterior, base, tope, rng):
+    return rng.uniform(0, objetivo)
+
+def jitter_decorrelado(objetivo, anterior, base, tope, rng):
+    return min(tope, rng.uniform(base, max(anterior, base) * 3))
+
+JITTERS = {"ninguno": sin_jitter, "completo": jitter_completo, "decorrelado": jitter_decorrelado}
+
+class MetricasPlanificador:
+    def __init__(self, max_decisiones=100):
+        self.por_resultado = Counter()
+        self.esperas = Histograma()
+        self.por_retry_after = 0  # Esperas alargadas por Retry-After
+        self.tiempo_total = 0.0
+        self.decisiones = deque(maxlen=max_decisiones)  # (resultado, objetivo, espera)
+
+    def sondeos(self):
+        return sum(self.por_resultado.values())
+
+class PlanificadorSondeo:
+    def __init__(self, base=5, maximo=60, incremento=5, maximo_304=None,
+                 jitter="decorrelado", dispersion=0.2, rng=None):
+        self.base = base
+        self.maximo = maximo
+        self.incremento = incremento
+        self.maximo_304 = maximo_304 if maximo_304 is not None else maximo / 2
+        self.jitter = JITTERS[jitter] if isinstance(jitter, str) else jitter
+        self.dispersion = dispersion
+        self.rng = rng or random.Random()
+        self.objetivo = base  # Intervalo sin jitter
+        self.anterior = base  # Última espera real (la usa el jitter decorrelado)
+        self.metricas = MetricasPlanificador()
+
+    def siguiente(self, resultado, retry_after=None) -> float:
+        if resultado == CAMBIO:
+            self.objetivo = self.base
+        elif resultado == NO_MODIFICADO:
+            self.objetivo = min(self.objetivo + self.incremento / 2, self.maximo_304)
+        elif resultado == SIN_CAMBIO:
+            self.objetivo = min(self.objetivo + self.incremento, self.maximo)
+        elif resultado == FALLO_CLIENTE:
+            self.objetivo = self.maximo
+        else:
+            self.objetivo = min(self.objetivo * 2, self.maximo)
+
+        if resultado in (SOBRECARGA, ERROR):
+            espera = self.jitter(self.objetivo, self.anterior, self.base, self.maximo, self.rng)
+        else:
+            espera = self.objetivo * self.rng.uniform(1 - self.dispersion, 1 + self.dispersion)
+        if retry_after is not None and espera < retry_after:
+            # Nunca antes de lo que pidió el servidor, y sin volver todos en el mismo instante
+            espera = retry_after * self.rng.uniform(1, 1 + self.dispersion)
+            self.metricas.por_retry_after += 1
+
+        self.anterior = espera
+        self.metricas.por_resultado[resultado] += 1
+        self.metricas.esperas.registrar(espera)
+        self.metricas.tiempo_total += espera
+        self.metricas.decisiones.append((resultado, self.objetivo, espera))
+        return espera
+
+    def resumen(self):
+        """Incluye la reducción de carga frente a sondear siempre cada `base` segundos."""
+        m = self.metricas
+        sondeos = m.sondeos()
+        equivalentes = m.tiempo_total / self.base if m.tiempo_total else 0
+        return {
+            "sondeos": sondeos,
+            "por_resultado": dict(m.por_resultado),
+            "por_retry_after": m.por_retry_after,
+            "espera_p50": m.esperas.percentil(50),
+            "espera_p95": m.esperas.percentil(95),
+            "sondeos_por_minuto": sondeos / m.tiempo_total * 60 if m.tiempo_total else 0.0,
+            "reduccion_vs_base": 1 - sondeos / equivalentes if equivalentes else 0.0,
+        }
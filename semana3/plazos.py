@@ -0,0 +1,79 @@
+"""
+Plazos (deadlines) que se propagan por el contexto.
+`with con_plazo(2):` fija un instante límite en una ContextVar; las tareas creadas
+dentro lo heredan y un plazo anidado nunca va más allá que el de fuera. Cada
+subpetición espera con `dentro_del_plazo(...)`, que usa solo el tiempo que queda y
+cancela la operación al vencer (aiohttp cierra entonces la conexión en vez de
+dejarla colgada).
+"""
+import asyncio
+import contextlib
+import contextvars
+import time
+
+_PLAZO = contextvars.ContextVar("plazo", default=None)
+
+class PlazoAgotado(asyncio.TimeoutError):
+    """Se acabó el tiempo del llamador (no es culpa del servidor: no abre circuitos ni se reintenta)."""
+
+class Plazo:
+    def __init__(self, segundos, reloj=time.monotonic):
+        self.reloj = reloj
+        self.vence = reloj() + segundos
+
+    def restante(self) -> float:
+        return max(0.0, self.vence - self.reloj())
+
+    def vencido(self) -> bool:
+        return self.reloj() >= self.vence
+
+    def acotar(self, segundos=None) -> "Plazo":
+        """Plazo hijo: `segundos` desde ahora, pero nunca después que este."""
+        hijo = Plazo(self.restante() if segundos is None else segundos, self.reloj)
+        hijo.vence = min(hijo.vence, self.vence)
+        return hijo
+
+    async def cumplir(self, aw):
+        """await aw con el tiempo que queda; si vence se cancela aw y se lanza PlazoAgotado."""
+        if self.vencido():
+            if asyncio.iscoroutine(aw):
+                aw.close()
+            raise PlazoAgotado("Plazo agotado antes de empezar")
+        limite = asyncio.timeout(self.restante())
+        try:
+            async with limite:
+                return await aw
+        except TimeoutError:
+            if limite.expired():
+                raise PlazoAgotado("Plazo agotado") from None
+            raise  # Timeout propio de la operación, no del plazo
+
+def plazo_actual():
+    return _PLAZO.get()
+
+@contextlib.contextmanager
+def con_plazo(segundos=None):
+    """Fija un plazo de `segundos` (acotado por el actual). Con None se mantiene el actual."""
+    actual = _PLAZO.get()
+    if segundos is None:
+        yield actual
+        return
+    plazo = actual.acotar(segundos) if actual is not None else Plazo(segundos)
+    testigo = _PLAZO.set(plazo)
+    try:
+        yield plazo
+    finally:
+        _PLAZO.reset(testigo)
+
+def contexto_sin_plazo():
+    """Copia del contexto actual sin plazo, para tareas compartidas por varios llamadores."""
+    contexto = contextvars.copy_context()
+    contexto.run(_PLAZO.set, None)
+    return contexto
+
+async def dentro_del_plazo(aw):
+    """await aw respetando el plazo del contexto, si lo hay."""
+    plazo = _PLAZO.get()
+    if plazo is None:
+        return await aw
+    return await plazo.cumplir(aw)
@@ -0,0 +1,241 @@
+"""
+Reintentos compartidos por los clientes de requests, aiohttp y httpx.
+- Backoff exponencial con jitter (las mismas estrategias que planificador.py);
+  Retry-After del servidor es un mínimo.
+- Por defecto solo se reintentan métodos idempotentes. Los POST/PATCH llevan una
+  cabecera Idempotency-Key (la misma en todos los intentos), así el servidor puede
+  reconocer el duplicado y también se pueden reintentar.
+- Un presupuesto global limita los reintentos a una fracción de las peticiones
+  recientes: durante una caída no se multiplica la carga por max_intentos.
+- Con un plazo en el contexto (plazos.py) no se reintenta si la espera no cabe en
+  lo que queda, y PlazoAgotado nunca se reintenta.
+"""
+import asyncio
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+from planificador import JITTERS, segundos_retry_after
+from plazos import PlazoAgotado, plazo_actual
+
+METODOS_IDEMPOTENTES = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+ESTADOS_REINTENTABLES = frozenset({429, 500, 502, 503, 504})
+CABECERA_IDEMPOTENCIA = "Idempotency-Key"
+
+def _errores_transporte():
+    """Errores de conexión/timeout de las librerías instaladas (antes de tener respuesta)."""
+    errores = [ConnectionError, asyncio.TimeoutError]
+    try:
+        import requests
+        errores += [requests.ConnectionError, requests.Timeout]
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+        errores += [aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errores.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errores)
+
+ERRORES_TRANSPORTE = _errores_transporte()
+
+def _tiene_cabecera(cabeceras, nombre):
+    nombre = nombre.lower()
+    return any(k.lower() == nombre for k in cabeceras)
+
+def _estado(respuesta):
+    estado = getattr(respuesta, "status_code", None)
+    return estado if estado is not None else getattr(respuesta, "status", None)
+
+def _retry_after(respuesta):
+    cabeceras = getattr(respuesta, "headers", None)
+    if cabeceras is None:
+        cabeceras = getattr(respuesta, "cabeceras", {})
+    return segundos_retry_after(cabeceras.get("Retry-After") or cabeceras.get("retry-after"))
+
+class PresupuestoReintentos:
+    """
+    En cada ventana de `ventana` segundos se permiten `minimo_por_segundo * ventana`
+    reintentos más `proporcion` por cada petición original. Se cuenta por segundos
+    (memoria constante) y es seguro entre hilos.
+    """
+
+    def __init__(self, proporcion=0.2, minimo_por_segundo=5, ventana=10):
+        self.proporcion = proporcion
+        self.minimo_por_segundo = minimo_por_segundo
+        self.ventana = ventana
+        self.denegados = 0
+        self._cubetas = deque()  # [segundo, peticiones, reintentos]
+        self._lock = threading.Lock()
+
+    def _actual(self):
+        segundo = int(time.monotonic())
+        while self._cubetas and self._cubetas[0][0] <= segundo - self.ventana:
+            self._cubetas.popleft()
+        if not self._cubetas or self._cubetas[-1][0] != segundo:
+            self._cubetas.append([segundo, 0, 0])
+        return self._cubetas[-1]
+
+    def registrar_peticion(self):
+        with self._lock:
+            self._actual()[1] += 1
+
+    def retirar(self) -> bool:
+        """True si queda presupuesto para un reintento (y lo consume)."""
+        with self._lock:
+            cubeta = self._actual()
+            peticiones = sum(c[1] for c in self._cubetas)
+            reintentos = sum(c[2] for c in self._cubetas)
+            if reintentos >= self.minimo_por_segundo * self.ventana + self.proporcion * peticiones:
+                self.denegados += 1
+                return False
+            cubeta[2] += 1
+            return True
+
+# Compartido por todas las políticas que no traigan uno propio
+PRESUPUESTO_GLOBAL = PresupuestoReintentos()
+
+class PoliticaReintentos:
+    def __init__(self, max_intentos=3, base=0.1, tope=5.0, jitter="completo",
+                 metodos=METODOS_IDEMPOTENTES, estados=ESTADOS_REINTENTABLES,
+                 claves_idempotencia=True, presupuesto=None, rng=None):
+        self.max_intentos = max_intentos
+        self.base = base
+        self.tope = tope
+        self.jitter = JITTERS[jitter] if isinstance(jitter, str) else jitter
+        self.metodos = metodos
+        self.estados = estados
+        self.claves_idempotencia = claves_idempotencia
+        self.presupuesto = presupuesto if presupuesto is not None else PRESUPUESTO_GLOBAL
+        self.rng = rng or random.Random()
+        self.reintentos = 0
+        self.agotados = 0  # Fallaron tras max_intentos
+
+    def preparar(self, metodo, cabeceras=None) -> dict:
+        """Cabeceras del primer intento; añade Idempotency-Key a POST/PATCH si hace falta."""
+        cabeceras = dict(cabeceras or {})
+        if (self.claves_idempotencia and metodo.upper() in ("POST", "PATCH")
+                and not _tiene_cabecera(cabeceras, CABECERA_IDEMPOTENCIA)):
+            cabeceras[CABECERA_IDEMPOTENCIA] = str(uuid.uuid4())
+        return cabeceras
+
+    def reintentable(self, metodo, cabeceras) -> bool:
+        return metodo.upper() in self.metodos or _tiene_cabecera(cabeceras, CABECERA_IDEMPOTENCIA)
+
+    def _decidir(self, metodo, cabeceras, intento, anterior, respuesta=None):
+        """Segundos a esperar antes del siguiente intento, o None si no se reintenta."""
+        if respuesta is not None and _estado(respuesta) not in self.estados:
+            return None
+        if not self.reintentable(metodo, cabeceras):
+            return None
+        if intento + 1 >= self.max_intentos:
+            self.agotados += 1
+            return None
+        espera = self.jitter(min(self.tope, self.base * 2 ** intento), anterior, self.base, self.tope, self.rng)
+        retry_after = _retry_after(respuesta) if respuesta is not None else None
+        if retry_after is not None:
+            espera = max(espera, retry_after)
+        plazo = plazo_actual()
+        if plazo is not None and espera >= plazo.restante():
+            return None  # El reintento llegaría cuando el llamador ya no espera
+        if not self.presupuesto.retirar():
+            return None
+        self.reintentos += 1
+        return espera
+
+    def ejecutar(self, metodo, enviar, cabeceras=None):
+        """Versión síncrona. `enviar(cabeceras)` hace la petición y devuelve la respuesta."""
+        cabeceras = self.preparar(metodo, cabeceras)
+        self.presupuesto.registrar_peticion()
+        intento, anterior = 0, self.base
+        while True:
+            try:
+                respuesta = enviar(cabeceras)
+            except PlazoAgotado:
+                raise
+            except ERRORES_TRANSPORTE:
+                espera = self._decidir(metodo, cabeceras, intento, anterior)
+                if espera is None:
+                    raise
+            else:
+                espera = self._decidir(metodo, cabeceras, intento, anterior, respuesta)
+                if espera is None:
+                    return respuesta
+                if hasattr(respuesta, "close"):
+                    respuesta.close()  # Devuelve la conexión al pool antes de esperar
+            time.sleep(espera)
+            intento, anterior = intento + 1, espera
+
+    async def ejecutar_async(self, metodo, enviar, cabeceras=None):
+        """Igual que ejecutar, pero `enviar(cabeceras)` es una corrutina (aiohttp, httpx)."""
+        cabeceras = self.preparar(metodo, cabeceras)
+        self.presupuesto.registrar_peticion()
+        intento, anterior = 0, self.base
+        while True:
+            try:
+                respuesta = await enviar(cabeceras)
+            except PlazoAgotado:
+                raise
+            except ERRORES_TRANSPORTE:
+                espera = self._decidir(metodo, cabeceras, intento, anterior)
+                if espera is None:
+                    raise
+            else:
+                espera = self._decidir(metodo, cabeceras, intento, anterior, respuesta)
+                if espera is None:
+                    return respuesta
+                if hasattr(respuesta, "aclose"):
+                    await respuesta.aclose()
+                elif hasattr(respuesta, "release"):
+                    respuesta.release()
+            await asyncio.sleep(espera)
+            intento, anterior = intento + 1, espera
+
+# --- Adaptadores ---
+try:
+    from requests.adapters import HTTPAdapter
+
+    class AdaptadorRequests(HTTPAdapter):
+        """HTTPAdapter que reintenta según la política; se monta en una requests.Session."""
+
+        def __init__(self, politica=None, **kwargs):
+            self.politica = politica or PoliticaReintentos()
+            super().__init__(**kwargs)
+
+        def send(self, request, **kwargs):
+            def enviar(cabeceras):
+                request.headers.update(cabeceras)
+                return super(AdaptadorRequests, self).send(request, **kwargs)
+
+            return self.politica.ejecutar(request.method, enviar, request.headers)
+except ImportError:
+    pass
+
+try:
+    import httpx
+
+    class TransporteHttpx(httpx.AsyncBaseTransport):
+        """Transporte de httpx.AsyncClient que reintenta según la política."""
+
+        def __init__(self, politica=None, transporte=None, **kwargs):
+            self.politica = politica or PoliticaReintentos()
+            self._transporte = transporte or httpx.AsyncHTTPTransport(**kwargs)
+
+        async def handle_async_request(self, request):
+            async def enviar(cabeceras):
+                request.headers.update(cabeceras)
+                return await self._transporte.handle_async_request(request)
+
+            return await self.politica.ejecutar_async(request.method, enviar, request.headers)
+
+        async def aclose(self):
+            await self._transporte.aclose()
+except ImportError:
+    pass
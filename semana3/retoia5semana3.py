@@ -2,66 +2,294 @@ import asyncio
 import time
 import aiohttp
 from collections import deque
+from dataclasses import dataclass
+
+from histograma import Histograma
+from metricas import REGISTRO
+
+# Métricas compartidas (metricas.REGISTRO); sin coste mientras estén desactivadas
+M_EN_VUELO = REGISTRO.medidor("limitador_en_vuelo", "Peticiones dentro del limitador de concurrencia",
+                              ("limitador",))
+M_LIMITE = REGISTRO.medidor("limitador_limite", "Límite actual del limitador adaptativo", ("limitador",))
+M_ESPERA_TASA = REGISTRO.histograma("limitador_espera_segundos", "Espera por un token del limitador de tasa",
+                                    ("limitador",))
 
 # --- 1. Limitador de Concurrencia (Semaphore) ---
 class ConcurrencyLimiter:
-    def __init__(self, n):
+    def __init__(self, n, nombre="concurrencia"):
         self.semaphore = asyncio.Semaphore(n)
         self.in_flight = 0
+        self.nombre = nombre
 
     async def __aenter__(self):
         await self.semaphore.acquire()
         self.in_flight += 1
-        print(f"🚀 Petición en vuelo. Total actual: {self.in_flight}")
+        M_EN_VUELO.fijar(self.nombre, valor=self.in_flight)
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         self.in_flight -= 1
+        M_EN_VUELO.fijar(self.nombre, valor=self.in_flight)
         self.semaphore.release()
 
-# --- 2. Limitador de Tasa (Token Bucket) ---
+# --- 2. Limitador de Concurrencia Adaptativo (AIMD) ---
+# Señales de sobrecarga del backend: recorte multiplicativo inmediato
+ESTADOS_SOBRECARGA = (429, 503)
+EXCEPCIONES_TIMEOUT = (asyncio.TimeoutError, aiohttp.ServerTimeoutError)
+
+@dataclass
+class CambioLimite:
+    instante: float
+    anterior: int
+    nuevo: int
+    motivo: str
+
+class _Permiso:
+    __slots__ = ("inicio", "estado")
+
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.estado = None  # Código HTTP de la respuesta, si lo hay
+
+def estado_http(respuesta):
+    """Código de estado de una respuesta de aiohttp (status) o requests/httpx (status_code)."""
+    estado = getattr(respuesta, "status", None)
+    return estado if estado is not None else getattr(respuesta, "status_code", None)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Sustituto de ConcurrencyLimiter cuyo límite se ajusta solo:
+    - Aumento aditivo (+1 por "ventana" de `limite` respuestas) mientras la latencia
+      suavizada se mantiene por debajo de `tolerancia` x la latencia base y el límite
+      se está usando de verdad.
+    - Recorte multiplicativo ante timeouts, 429/503 o latencia degradada. Solo un
+      recorte por ronda: se ignoran las señales de peticiones que empezaron antes
+      del último recorte.
+    Cada cambio queda en `historial` con su motivo.
+    """
+
+    def __init__(self, inicial=10, minimo=1, maximo=200, tolerancia=2.0,
+                 factor_recorte=0.5, factor_latencia=0.9, al_cambiar=None, historial=1000,
+                 nombre="adaptativo"):
+        self.nombre = nombre
+        self.minimo = minimo
+        self.maximo = maximo
+        self.tolerancia = tolerancia
+        self.factor_recorte = factor_recorte
+        self.factor_latencia = factor_latencia
+        self.al_cambiar = al_cambiar
+        self._limite = float(min(max(inicial, minimo), maximo))
+        self.in_flight = 0
+        self.latencia_base = None
+        self.latencia_suavizada = None
+        self.historial = deque(maxlen=historial)
+        self._ultimo_recorte = 0.0
+        self._esperando = deque()
+        self._permisos = {}
+
+    @property
+    def limite(self) -> int:
+        return int(self._limite)
+
+    async def __aenter__(self):
+        while self._esperando and self._esperando[0].done():
+            self._esperando.popleft()  # Cancelados mientras esperaban
+        if self.in_flight >= self.limite or self._esperando:
+            futuro = asyncio.get_running_loop().create_future()
+            self._esperando.append(futuro)
+            try:
+                await futuro
+            except asyncio.CancelledError:
+                if not futuro.cancelled():
+                    # El hueco ya era nuestro: se cede al siguiente
+                    self.in_flight -= 1
+                    self._despertar()
+                raise
+        else:
+            self.in_flight += 1
+        M_EN_VUELO.fijar(self.nombre, valor=self.in_flight)
+        permiso = _Permiso(time.monotonic())
+        self._permisos[asyncio.current_task()] = permiso
+        return permiso
+
+    async def __aexit__(self, exc_type, exc, tb):
+        permiso = self._permisos.pop(asyncio.current_task())
+        self.in_flight -= 1
+        M_EN_VUELO.fijar(self.nombre, valor=self.in_flight)
+        ocupacion = self.in_flight + 1 + len(self._esperando)
+        if exc_type is not None and issubclass(exc_type, EXCEPCIONES_TIMEOUT):
+            self._recortar(permiso, self.factor_recorte, "timeout")
+        elif permiso.estado in ESTADOS_SOBRECARGA:
+            self._recortar(permiso, self.factor_recorte, f"http {permiso.estado}")
+        elif exc_type is None:
+            self._muestra(permiso, time.monotonic() - permiso.inicio, ocupacion)
+        self._despertar()
+
+    def _muestra(self, permiso, latencia, ocupacion):
+        if self.latencia_base is None:
+            self.latencia_base = self.latencia_suavizada = latencia
+            return
+        self.latencia_suavizada += (latencia - self.latencia_suavizada) * 0.2
+        # La base sigue al mínimo, pero sube muy despacio si el backend cambia de régimen
+        self.latencia_base = min(latencia, self.latencia_base + (latencia - self.latencia_base) * 0.01)
+        if self.latencia_suavizada > self.latencia_base * self.tolerancia:
+            self._recortar(permiso, self.factor_latencia, "latencia")
+        elif ocupacion >= self.limite:
+            # Solo crece si el límite actual es el que está frenando
+            self._cambiar(self._limite + 1 / self._limite, "aumento")
+
+    def _recortar(self, permiso, factor, motivo):
+        if permiso.inicio < self._ultimo_recorte:
+            return
+        self._ultimo_recorte = time.monotonic()
+        self._cambiar(self._limite * factor, motivo)
+
+    def _cambiar(self, nuevo, motivo):
+        anterior = self.limite
+        self._limite = min(max(nuevo, self.minimo), self.maximo)
+        if self.limite != anterior:
+            M_LIMITE.fijar(self.nombre, valor=self.limite)
+            cambio = CambioLimite(time.monotonic(), anterior, self.limite, motivo)
+            self.historial.append(cambio)
+            if self.al_cambiar:
+                self.al_cambiar(cambio)
+
+    def _despertar(self):
+        while self._esperando and self.in_flight < self.limite:
+            futuro = self._esperando.popleft()
+            if not futuro.done():
+                self.in_flight += 1
+                futuro.set_result(None)
+
+    def metricas(self):
+        return {
+            "limite": self.limite,
+            "en_vuelo": self.in_flight,
+            "en_cola": len(self._esperando),
+            "latencia_base": self.latencia_base,
+            "latencia_suavizada": self.latencia_suavizada,
+            "cambios": len(self.historial),
+        }
+
+# --- 3. Limitador de Tasa (Token Bucket) ---
 class RateLimiter:
-    def __init__(self, rate_per_second):
+    """
+    Token bucket con cola FIFO: quien llega con cola no vacía se pone detrás,
+    y un único temporizador despierta al siguiente cuando hay un token para él
+    (sin estampidas de despertares ni recursión). `burst` es la capacidad del
+    cubo y es independiente de la tasa.
+    """
+
+    def __init__(self, rate_per_second, burst=None, nombre="tasa"):
+        self.nombre = nombre
         self.rate = rate_per_second
-        self.tokens = rate_per_second
+        self.burst = burst if burst is not None else rate_per_second
+        self.tokens = float(self.burst)
         self.updated_at = time.monotonic()
-        self.queue = deque()
+        self.queue = deque()  # Futuros de los que esperan, en orden de llegada
+        self.esperando = 0    # Futuros de la cola aún no cancelados
+        self._timer = None
+        # Métricas
+        self.despertares = 0
+        self.max_cola = 0
+        self.histograma_espera = Histograma()
+        self.histograma_cola = Histograma()
+
+    def _rellenar(self, now, tope=None):
+        tope = self.burst if tope is None else tope
+        self.tokens = min(tope, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
 
     async def wait(self):
+        """Espera un token respetando el orden de llegada. Devuelve los segundos esperados."""
         now = time.monotonic()
-        # Rellenar tokens basados en el tiempo transcurrido
-        self.tokens += (now - self.updated_at) * self.rate
-        if self.tokens > self.rate:
-            self.tokens = self.rate
-        self.updated_at = now
+        self.histograma_cola.registrar(self.esperando)
+        if not self.esperando:
+            self._rellenar(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.histograma_espera.registrar(0.0)
+                M_ESPERA_TASA.observar(0.0, self.nombre)
+                return 0.0
 
-        if self.tokens < 1:
-            wait_time = (1 - self.tokens) / self.rate
-            print(f"⏳ Rate limit excedido. Esperando {wait_time:.2f}s en cola...")
-            await asyncio.sleep(wait_time)
-            # Recursión para re-verificar tras la espera
-            return await self.wait()
-        
-        self.tokens -= 1
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self.queue.append(futuro)
+        self.esperando += 1
+        if self.esperando > self.max_cola:
+            self.max_cola = self.esperando
+        self._programar(loop)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            if futuro.cancelled():
+                # Nunca recibió token: _despertar lo saltará al llegar a él
+                self.esperando -= 1
+            else:
+                # Se le concedió el token justo al cancelarse: se devuelve al cubo
+                self.tokens = min(self.burst, self.tokens + 1)
+                self._programar(loop)
+            raise
+        espera = time.monotonic() - now
+        self.histograma_espera.registrar(espera)
+        M_ESPERA_TASA.observar(espera, self.nombre)
+        return espera
+
+    def _programar(self, loop):
+        if self._timer is None and self.esperando:
+            retraso = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = loop.call_later(retraso, self._despertar, loop)
+
+    def _despertar(self, loop):
+        self._timer = None
+        self.despertares += 1
+        # Los tokens generados mientras había cola son de los que esperan aunque el
+        # temporizador llegue tarde (resolución del bucle ~1 ms): sin esto, con burst
+        # pequeño se perderían y la tasa real quedaría muy por debajo de `rate`.
+        self._rellenar(time.monotonic(), self.burst + self.esperando)
+        # Margen para el error de coma flotante del cálculo del retraso
+        while self.queue and self.tokens >= 1 - 1e-9:
+            futuro = self.queue.popleft()
+            if futuro.done():
+                continue  # Cancelado mientras esperaba
+            self.tokens -= 1
+            self.esperando -= 1
+            futuro.set_result(None)
+        self.tokens = min(self.tokens, self.burst)
+        self._programar(loop)
+
+    def metricas(self):
+        return {
+            "en_cola": self.esperando,
+            "max_cola": self.max_cola,
+            "despertares": self.despertares,
+            "espera": self.histograma_espera.resumen(),
+            "cola": self.histograma_cola.resumen(),
+        }
 
-# --- 3. ThrottledClient (Combinado) ---
+# --- 4. ThrottledClient (Combinado) ---
 class ThrottledClient:
-    def __init__(self, max_concurrent, max_per_second):
-        self.concurrency = ConcurrencyLimiter(max_concurrent)
-        self.rate_limiter = RateLimiter(max_per_second)
+    def __init__(self, max_concurrent, max_per_second, burst=None, adaptive=False, **opciones_adaptativas):
+        # En modo adaptativo max_concurrent es solo el límite de partida
+        if adaptive:
+            self.concurrency = AdaptiveConcurrencyLimiter(max_concurrent, **opciones_adaptativas)
+        else:
+            self.concurrency = ConcurrencyLimiter(max_concurrent)
+        self.adaptive = adaptive
+        self.rate_limiter = RateLimiter(max_per_second, burst)
 
     async def execute(self, coro):
         # Primero respetamos la tasa (cuántas por segundo)
-        wait_start = time.monotonic()
-        await self.rate_limiter.wait()
-        wait_duration = time.monotonic() - wait_start
+        wait_duration = await self.rate_limiter.wait()
 
         # Luego respetamos la concurrencia (cuántas abiertas al mismo tiempo)
-        async with self.concurrency:
+        async with self.concurrency as permiso:
             result = await coro
+            if self.adaptive:
+                permiso.estado = estado_http(result)
             return result, wait_duration
 
-# --- 4. Test de Stress: 50 Productos ---
+# --- 5. Test de Stress: 50 Productos ---
 async def test_throttling():
     client = ThrottledClient(max_concurrent=10, max_per_second=20)
     
@@ -0,0 +1,617 @@
+"""
+Servidor local que imita la API de EcoMarket (aiohttp.web), para probar y medir
+los clientes con sockets reales (pool, keep-alive) sin depender del servidor real:
+- GET  /api/v1/inventario          JSON completo con ETag; If-None-Match -> 304.
+- GET  /api/v1/inventario/stream   Server-Sent Events: primero el inventario completo
+                                   y luego un evento por producto cambiado. Con
+                                   Last-Event-ID se reenvía solo lo que faltó.
+- POST /api/v1/alertas             201, o 422 si faltan campos.
+- /api/...                         Todas las rutas de la especificación OpenAPI de
+                                   semana 2 (productos, productores, pedidos) sobre
+                                   colecciones en memoria. Ver AlmacenEcoMarket.
+Con sse=False el stream responde 404, como un servidor que solo sabe de polling.
+Con `simulacion` cada respuesta (salvo el stream) se retrasa según la distribución
+de latencia y se inyectan fallos: 500, 429 con Retry-After, 503 y cortes de conexión.
+Para miles de peticiones por segundo: sin log de accesos, cuerpos serializados en
+caché por versión y, si hace falta más, --procesos N (SO_REUSEPORT; cada proceso
+tiene su propio estado).
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+
+import yaml
+from aiohttp import web
+
+PREFIJO = "/api/v1"
+CAMPOS_ALERTA = ("producto_id", "stock_actual", "stock_minimo", "timestamp")
+LATIDO = 15  # Segundos entre comentarios ": ping" para que proxies y clientes no corten
+PREFIJO_ECOMARKET = "/api"
+ESPECIFICACION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "semana 2",
+                              "reto ia 1 semana 2.yaml")
+CATEGORIAS = ("frutas", "verduras", "lacteos", "miel", "conservas")
+
+# --- Distribuciones de latencia: rng -> segundos ---
+def latencia_exponencial(media):
+    return lambda rng: rng.expovariate(1 / media)
+
+def latencia_lognormal(mediana, sigma=0.5):
+    """Cola larga a la derecha, como las latencias reales."""
+    return lambda rng: rng.lognormvariate(math.log(mediana), sigma)
+
+def latencia_bimodal(rapida, lenta, prob_lenta=0.05):
+    """La mayoría rápidas y unas pocas muy lentas (GC, caché fría, réplica cargada)."""
+    return lambda rng: lenta if rng.random() < prob_lenta else rapida
+
+@dataclass
+class Simulacion:
+    latencia: float = 0.0    # Segundos de retraso de cada respuesta
+    jitter: float = 0.0      # ± segundos, uniforme
+    tasa_error: float = 0.0  # Fracción de respuestas 500
+    rng: random.Random = field(default_factory=random.Random)
+    distribucion: object = None  # rng -> segundos; sustituye a latencia ± jitter
+    tasa_429: float = 0.0
+    tasa_503: float = 0.0
+    tasa_corte: float = 0.0      # Se cierra la conexión sin responder
+    retry_after: int = 1         # Segundos en Retry-After de los 429/503
+    inyectados: Counter = field(default_factory=Counter)
+
+    def retraso(self) -> float:
+        if self.distribucion is not None:
+            return max(0.0, self.distribucion(self.rng))
+        return max(0.0, self.latencia + self.rng.uniform(-self.jitter, self.jitter))
+
+    def fallo(self):
+        """'corte', 429, 503, 500 o None, según las tasas (se sortea una vez por petición)."""
+        sorteo = self.rng.random()
+        for tipo, tasa in (("corte", self.tasa_corte), (429, self.tasa_429),
+                           (503, self.tasa_503), (500, self.tasa_error)):
+            if sorteo < tasa:
+                self.inyectados[tipo] += 1
+                return tipo
+            sorteo -= tasa
+        return None
+
+def catalogo(n=50):
+    """Productos con el esquema Producto de la especificación OpenAPI."""
+    return [{"id": i, "nombre": f"Producto {i}", "precio": round(1 + (i * 37 % 500) / 10, 2),
+             "categoria": CATEGORIAS[i % len(CATEGORIAS)], "disponible": i % 7 != 0,
+             "productor": {"id": i % 10 + 1, "nombre": f"Productor {i % 10 + 1}"}}
+            for i in range(1, n + 1)]
+
+# --- API EcoMarket generada desde la especificación ---
+_TIPOS = {"string": str, "integer": int, "number": (int, float), "boolean": bool,
+          "array": list, "object": dict}
+
+def _tipo_valido(valor, tipo):
+    if tipo not in _TIPOS:
+        return True
+    if isinstance(valor, bool) and tipo in ("integer", "number"):
+        return False
+    return isinstance(valor, _TIPOS[tipo])
+
+class AlmacenEcoMarket:
+    """
+    Una colección en memoria por cada recurso de primer nivel de la especificación
+    (/productos, /productores, /pedidos). Cada colección tiene una versión que sube
+    con cada escritura: sirve de ETag y de clave de la caché de cuerpos serializados.
+    """
+
+    def __init__(self, especificacion=ESPECIFICACION, productos=50, productores=10, pedidos=20,
+                 max_idempotencia=10000):
+        with open(especificacion, encoding="utf-8") as f:
+            self.especificacion = yaml.safe_load(f)
+        self.esquemas = self.especificacion.get("components", {}).get("schemas", {})
+        self.colecciones = {ruta.strip("/").split("/")[0]: {} for ruta in self.especificacion["paths"]}
+        self.versiones = Counter()
+        self.peticiones = Counter()  # "GET /productos/{id}" -> nº
+        self._cuerpos = {}           # (coleccion, version, clave) -> bytes
+        # Idempotency-Key -> (estado, cuerpo). LRU acotada: el generador de carga manda
+        # una clave nueva en cada POST y el servidor puede estar horas en marcha
+        self._idempotencia = OrderedDict()
+        self.max_idempotencia = max_idempotencia
+        self._sembrar("productos", catalogo(productos))
+        self._sembrar("productores", [{"id": i, "nombre": f"Productor {i}", "ubicacion": f"Región {i % 4 + 1}"}
+                                      for i in range(1, productores + 1)])
+        self._sembrar("pedidos", [{"id": i, "cliente": f"cliente{i}@ecomarket.test", "estado": "pendiente",
+                                   "items": [{"productoId": i % max(productos, 1) + 1, "cantidad": 1}]}
+                                  for i in range(1, pedidos + 1)])
+
+    def _sembrar(self, coleccion, elementos):
+        if coleccion in self.colecciones:
+            self.colecciones[coleccion] = {e["id"]: e for e in elementos}
+
+    def etag(self, coleccion):
+        return f'"{coleccion}-v{self.versiones[coleccion]}"'
+
+    def _modificada(self, coleccion):
+        self.versiones[coleccion] += 1
+
+    def respuesta_idempotente(self, clave):
+        respuesta = self._idempotencia.get(clave)
+        if respuesta is not None:
+            self._idempotencia.move_to_end(clave)
+        return respuesta
+
+    def recordar_idempotente(self, clave, estado, cuerpo):
+        self._idempotencia[clave] = (estado, cuerpo)
+        self._idempotencia.move_to_end(clave)
+        while len(self._idempotencia) > self.max_idempotencia:
+            self._idempotencia.popitem(last=False)
+
+    def serializar(self, coleccion, clave, construir) -> bytes:
+        """Cuerpo JSON en caché mientras la colección no cambie."""
+        entrada = (coleccion, self.versiones[coleccion], clave)
+        cuerpo = self._cuerpos.get(entrada)
+        if cuerpo is None:
+            if len(self._cuerpos) > 10000:
+                self._cuerpos.clear()
+            cuerpo = self._cuerpos[entrada] = json.dumps(construir()).encode()
+        return cuerpo
+
+    def esquema_recurso(self, coleccion):
+        """'productos' -> esquema Producto (si existe), para las restricciones de los campos."""
+        for nombre in (coleccion[:-1], coleccion[:-2]):
+            esquema = self.esquemas.get(nombre.capitalize())
+            if esquema:
+                return esquema
+        return {}
+
+    def _resolver(self, esquema):
+        referencia = (esquema or {}).get("$ref")
+        if referencia:
+            return self.esquemas.get(referencia.rsplit("/", 1)[-1], {})
+        return esquema or {}
+
+    def errores(self, coleccion, operacion, datos):
+        """Campos del cuerpo con tipo o valor inválidos según la especificación."""
+        if not isinstance(datos, dict):
+            return ["el cuerpo debe ser un objeto JSON"]
+        cuerpo = operacion.get("requestBody", {}).get("content", {}).get("application/json", {})
+        propiedades = self._resolver(cuerpo.get("schema")).get("properties", {})
+        recurso = self.esquema_recurso(coleccion).get("properties", {})
+        errores = []
+        for campo, valor in datos.items():
+            regla = {**recurso.get(campo, {}), **propiedades.get(campo, {})}
+            if "type" in regla and not _tipo_valido(valor, regla["type"]):
+                errores.append(f"{campo}: se esperaba {regla['type']}")
+            elif "minimum" in regla and isinstance(valor, (int, float)):
+                if valor < regla["minimum"] or (regla.get("exclusiveMinimum") and valor == regla["minimum"]):
+                    errores.append(f"{campo}: fuera de rango")
+            elif "enum" in regla and valor not in regla["enum"]:
+                errores.append(f"{campo}: valor no permitido")
+        return errores
+
+def _estado_declarado(operacion, preferidos, defecto):
+    respuestas = {str(c) for c in operacion.get("responses", {})}
+    return next((int(c) for c in preferidos if c in respuestas), defecto)
+
+def _manejador(almacen, metodo, ruta, operacion):
+    """Handler genérico según la forma de la ruta: /col, /col/{id} o /col/{id}/campo."""
+    partes = ruta.strip("/").split("/")
+    coleccion = partes[0]
+    clave_metrica = f"{metodo} {ruta}"
+    estado_invalido = _estado_declarado(operacion, ("422", "400"), 400)
+    elementos = lambda: almacen.colecciones[coleccion]
+
+    def con_etag(request, cuerpo, etag):
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=cabeceras)
+        return web.Response(body=cuerpo, content_type="application/json", headers=cabeceras)
+
+    def buscar(request):
+        try:
+            return elementos().get(int(request.match_info["id"]))
+        except ValueError:
+            return None
+
+    async def leer_json(request):
+        try:
+            return await request.json()
+        except json.JSONDecodeError:
+            return None
+
+    async def listar(request):
+        consulta = request.query
+        try:
+            pagina = max(1, int(consulta.get("page", 1)))
+            limite = min(500, max(1, int(consulta.get("limit", 100))))
+        except ValueError:
+            return web.json_response({"error": "page/limit deben ser enteros"}, status=400)
+        nombre = consulta.get("nombre", "").lower()
+
+        def construir():
+            lista = [e for e in elementos().values() if nombre in str(e.get("nombre", "")).lower()]
+            return lista[(pagina - 1) * limite:pagina * limite]
+
+        cuerpo = almacen.serializar(coleccion, (pagina, limite, nombre), construir)
+        return con_etag(request, cuerpo, almacen.etag(coleccion))
+
+    async def obtener(request):
+        elemento = buscar(request)
+        if elemento is None:
+            return web.json_response({"error": "no encontrado"}, status=404)
+        cuerpo = almacen.serializar(coleccion, elemento["id"], lambda: elemento)
+        return con_etag(request, cuerpo, f'W/"{coleccion}-{elemento["id"]}-v{almacen.versiones[coleccion]}"')
+
+    async def sublista(request):
+        # /productores/{id}/productos: elementos de la subcolección que apuntan a este
+        padre = buscar(request)
+        if padre is None:
+            return web.json_response({"error": "no encontrado"}, status=404)
+        hija, singular = partes[2], coleccion[:-2] if coleccion.endswith("es") else coleccion[:-1]
+
+        def apunta(e):
+            referencia = e.get(singular)
+            return (isinstance(referencia, dict) and referencia.get("id") == padre["id"]) \
+                or e.get(f"{singular}Id") == padre["id"]
+
+        cuerpo = almacen.serializar(hija, ("de", coleccion, padre["id"]),
+                                    lambda: [e for e in almacen.colecciones.get(hija, {}).values() if apunta(e)])
+        return con_etag(request, cuerpo, almacen.etag(hija))
+
+    async def crear(request):
+        clave = request.headers.get("Idempotency-Key")
+        respuesta = almacen.respuesta_idempotente(clave) if clave else None
+        if respuesta is not None:
+            estado, cuerpo = respuesta  # Reintento: misma respuesta, sin duplicar
+            return web.Response(status=estado, body=cuerpo, content_type="application/json")
+        datos = await leer_json(request)
+        errores = almacen.errores(coleccion, operacion, datos)
+        if errores:
+            return web.json_response({"errores": errores}, status=estado_invalido)
+        nuevo_id = max(elementos(), default=0) + 1
+        elemento = elementos()[nuevo_id] = {**datos, "id": nuevo_id}  # El id lo asigna el servidor
+        almacen._modificada(coleccion)
+        cuerpo = json.dumps(elemento).encode()
+        if clave:
+            almacen.recordar_idempotente(clave, 201, cuerpo)
+        return web.Response(status=201, body=cuerpo, content_type="application/json")
+
+    async def modificar(request):
+        elemento = buscar(request)
+        if elemento is None:
+            return web.json_response({"error": "no encontrado"}, status=404)
+        datos = await leer_json(request)
+        errores = almacen.errores(coleccion, operacion, datos)
+        if errores:
+            return web.json_response({"errores": errores}, status=estado_invalido)
+        if metodo == "PUT":
+            elemento = {**datos, "id": elemento["id"]}
+        else:
+            elemento = {**elemento, **datos, "id": elemento["id"]}
+        elementos()[elemento["id"]] = elemento
+        almacen._modificada(coleccion)
+        return web.json_response(elemento)
+
+    async def eliminar(request):
+        elemento = buscar(request)
+        if elemento is None:
+            return web.json_response({"error": "no encontrado"}, status=404)
+        del elementos()[elemento["id"]]
+        almacen._modificada(coleccion)
+        return web.Response(status=204)
+
+    if len(partes) == 1:
+        base = {"GET": listar, "POST": crear}.get(metodo)
+    elif len(partes) == 2:
+        base = {"GET": obtener, "PUT": modificar, "PATCH": modificar, "DELETE": eliminar}.get(metodo)
+    else:
+        base = {"GET": sublista, "PATCH": modificar, "PUT": modificar}.get(metodo)
+    if base is None:
+        return None
+
+    async def manejador(request):
+        almacen.peticiones[clave_metrica] += 1
+        return await base(request)
+    return manejador
+
+def rutas_especificacion(app, almacen, prefijo=PREFIJO_ECOMARKET):
+    for ruta, operaciones in almacen.especificacion["paths"].items():
+        for metodo, operacion in operaciones.items():
+            manejador = _manejador(almacen, metodo.upper(), ruta, operacion or {})
+            if manejador is not None:
+                app.router.add_route(metodo.upper(), prefijo + ruta, manejador)
+
+class InventarioSimulado:
+    def __init__(self, n_productos=100, stock_minimo=10, max_eventos=1000):
+        self.productos = {}
+        for i in range(n_productos):
+            pid = f"PROD-{i:03d}"
+            self.productos[pid] = self._producto(pid, f"Producto {i}", random.randint(0, 100), stock_minimo)
+        self.version = 0
+        self.eventos = deque(maxlen=max_eventos)  # (version, tipo, datos) para reenviar tras reconexión
+        self.peticiones = {"inventario": 0, "no_modificado": 0, "stream": 0, "alertas": 0}
+        self._suscriptores = set()
+        self._cache = None  # (version, cuerpo) del último JSON servido
+
+    @staticmethod
+    def _producto(pid, nombre, stock, stock_minimo):
+        status = "BAJO_MINIMO" if stock < stock_minimo else "DISPONIBLE"
+        return {"id": pid, "nombre": nombre, "stock": stock, "stock_minimo": stock_minimo, "status": status}
+
+    def etag(self):
+        return f'"v{self.version}"'
+
+    def cuerpo(self) -> bytes:
+        if self._cache is None or self._cache[0] != self.version:
+            self._cache = (self.version, json.dumps({"productos": list(self.productos.values())}).encode())
+        return self._cache[1]
+
+    def cambiar_stock(self, pid, stock):
+        anterior = self.productos[pid]
+        producto = self._producto(pid, anterior["nombre"], stock, anterior["stock_minimo"])
+        self.productos[pid] = producto
+        self.version += 1
+        evento = (self.version, "producto", json.dumps(producto))
+        self.eventos.append(evento)
+        for cola in self._suscriptores:
+            cola.put_nowait(evento)
+        return producto
+
+    def cambio_aleatorio(self):
+        pid = random.choice(list(self.productos))
+        return self.cambiar_stock(pid, random.randint(0, 100))
+
+    def eventos_desde(self, ultimo_id):
+        """Eventos posteriores a `ultimo_id`, o None si ya no están en el buffer."""
+        try:
+            ultimo = int(ultimo_id)
+        except (TypeError, ValueError):
+            return None
+        if ultimo == self.version:
+            return []
+        if ultimo > self.version or not self.eventos or ultimo < self.eventos[0][0] - 1:
+            return None
+        return [e for e in self.eventos if e[0] > ultimo]
+
+def _formato_sse(version, tipo, datos, retry=None):
+    lineas = [f"retry: {retry}"] if retry else []
+    lineas += [f"id: {version}", f"event: {tipo}"]
+    lineas += [f"data: {linea}" for linea in datos.split("\n")]
+    return ("\n".join(lineas) + "\n\n").encode()
+
+# Claves tipadas de la aplicación: app[INVENTARIO], app[ALMACEN]
+INVENTARIO = web.AppKey("inventario", InventarioSimulado)
+ALMACEN = web.AppKey("almacen", AlmacenEcoMarket)
+CAMBIOS = web.AppKey("cambios", asyncio.Task)
+
+def crear_app(inventario=None, sse=True, retry_ms=1000, simulacion=None, productos=50,
+              almacen=None) -> web.Application:
+    inventario = inventario or InventarioSimulado()
+    almacen = almacen or AlmacenEcoMarket(productos=productos)
+
+    @web.middleware
+    async def simular(request, handler):
+        if simulacion is None or request.path.endswith("/stream"):
+            return await handler(request)
+        retraso = simulacion.retraso()
+        if retraso:
+            await asyncio.sleep(retraso)
+        fallo = simulacion.fallo()
+        if fallo == "corte":
+            request.transport.abort()  # El cliente ve ServerDisconnected / RemoteProtocolError
+            return web.Response(status=500)
+        if fallo in (429, 503):
+            return web.json_response({"error": "sobrecarga simulada"}, status=fallo,
+                                     headers={"Retry-After": str(simulacion.retry_after)})
+        if fallo == 500:
+            return web.json_response({"error": "fallo simulado"}, status=500)
+        return await handler(request)
+
+    async def get_inventario(request):
+        inventario.peticiones["inventario"] += 1
+        etag = inventario.etag()
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == etag:
+            inventario.peticiones["no_modificado"] += 1
+            return web.Response(status=304, headers=cabeceras)
+        return web.Response(body=inventario.cuerpo(), content_type="application/json", headers=cabeceras)
+
+    async def stream_inventario(request):
+        if not sse:
+            raise web.HTTPNotFound()
+        inventario.peticiones["stream"] += 1
+        respuesta = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await respuesta.prepare(request)
+        cola = asyncio.Queue()
+        inventario._suscriptores.add(cola)
+        try:
+            pendientes = inventario.eventos_desde(request.headers.get("Last-Event-ID"))
+            if pendientes is None:
+                # Cliente nuevo o demasiado atrasado: inventario completo
+                await respuesta.write(_formato_sse(inventario.version, "inventario",
+                                                   inventario.cuerpo().decode(), retry_ms))
+            else:
+                for evento in pendientes:
+                    await respuesta.write(_formato_sse(*evento))
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), LATIDO)
+                except asyncio.TimeoutError:
+                    await respuesta.write(b": ping\n\n")
+                    continue
+                if evento is None:
+                    break  # El servidor se está apagando
+                await respuesta.write(_formato_sse(*evento))
+        except ConnectionResetError:
+            pass
+        finally:
+            inventario._suscriptores.discard(cola)
+        return respuesta
+
+    async def post_alerta(request):
+        inventario.peticiones["alertas"] += 1
+        try:
+            datos = await request.json()
+        except json.JSONDecodeError:
+            datos = None
+        if not isinstance(datos, dict) or any(c not in datos for c in CAMPOS_ALERTA):
+            return web.json_response({"error": "campos faltantes"}, status=422)
+        return web.json_response(datos, status=201)
+
+    async def cerrar_streams(app):
+        for cola in inventario._suscriptores:
+            cola.put_nowait(None)
+
+    app = web.Application(middlewares=[simular])
+    app[INVENTARIO] = inventario
+    app[ALMACEN] = almacen
+    app.on_shutdown.append(cerrar_streams)
+    app.router.add_get(f"{PREFIJO}/inventario", get_inventario)
+    app.router.add_get(f"{PREFIJO}/inventario/stream", stream_inventario)
+    app.router.add_post(f"{PREFIJO}/alertas", post_alerta)
+    rutas_especificacion(app, almacen)
+    return app
+
+async def arrancar(app, host="127.0.0.1", puerto=8000) -> web.AppRunner:
+    """Arranca el servidor dentro del bucle actual; parar con `await runner.cleanup()`."""
+    runner = web.AppRunner(app, access_log=None)  # El log de accesos limita mucho el throughput
+    await runner.setup()
+    await web.TCPSite(runner, host, puerto).start()
+    return runner
+
+class ServidorEnHilo:
+    """
+    El servidor en un hilo aparte con su propio bucle, para clientes síncronos
+    (requests) o para que el servidor no compita con el cliente medido.
+    Uso: with ServidorEnHilo(crear_app()) as srv: requests.get(srv.url + "/api/productos")
+    """
+
+    def __init__(self, app, host="127.0.0.1", puerto=0):
+        self.app = app
+        self.host = host
+        self.puerto = puerto
+        self._listo = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.puerto}"
+
+    def _correr(self):
+        self._loop = asyncio.new_event_loop()
+        runner = self._loop.run_until_complete(arrancar(self.app, self.host, self.puerto))
+        self.puerto = runner.addresses[0][1]  # Con puerto=0 lo elige el sistema
+        self._listo.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self):
+        self._hilo.start()
+        self._listo.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join()
+
+class ServidorEnProceso:
+    """
+    servidor_local.py en otro proceso, para generar carga sin compartir el GIL con el
+    servidor. `argumentos` son los de la línea de comandos (p. ej. "--latencia-ms", "20").
+    """
+
+    def __init__(self, *argumentos, host="127.0.0.1", puerto=None):
+        self.argumentos = [str(a) for a in argumentos]
+        self.host = host
+        self.puerto = puerto or _puerto_libre(host)
+        self._proceso = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.puerto}"
+
+    def __enter__(self):
+        self._proceso = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--host", self.host, "--puerto", str(self.puerto),
+             *self.argumentos], stdout=subprocess.DEVNULL)
+        limite = time.monotonic() + 15
+        while True:
+            try:
+                socket.create_connection((self.host, self.puerto), timeout=1).close()
+                return self
+            except OSError:
+                if self._proceso.poll() is not None or time.monotonic() > limite:
+                    self.__exit__()
+                    raise RuntimeError(f"El servidor local no arrancó en {self.url}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        self._proceso.terminate()
+        self._proceso.wait()
+
+def _puerto_libre(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+async def _cambios_periodicos(app, cada):
+    while True:
+        await asyncio.sleep(random.expovariate(1 / cada))
+        app[INVENTARIO].cambio_aleatorio()
+
+DISTRIBUCIONES = {
+    "fija": lambda ms, jitter: None,
+    "exponencial": lambda ms, jitter: latencia_exponencial(ms / 1000),
+    "lognormal": lambda ms, jitter: latencia_lognormal(ms / 1000),
+    "bimodal": lambda ms, jitter: latencia_bimodal(ms / 1000, ms / 1000 * 20),
+}
+
+def _servir(args):
+    simulacion = Simulacion(args.latencia_ms / 1000, args.jitter_ms / 1000, args.tasa_error,
+                            distribucion=DISTRIBUCIONES[args.distribucion](args.latencia_ms, args.jitter_ms),
+                            tasa_429=args.tasa_429, tasa_503=args.tasa_503, tasa_corte=args.tasa_corte)
+    app = crear_app(InventarioSimulado(args.productos), sse=not args.sin_sse,
+                    simulacion=simulacion, productos=args.productos)
+
+    async def al_arrancar(app):
+        app[CAMBIOS] = asyncio.create_task(_cambios_periodicos(app, args.cambio_cada))
+
+    async def al_parar(app):
+        app[CAMBIOS].cancel()
+
+    app.on_startup.append(al_arrancar)
+    app.on_cleanup.append(al_parar)
+    web.run_app(app, host=args.host, port=args.puerto, access_log=None,
+                reuse_port=args.procesos > 1, print=print if args.procesos == 1 else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de EcoMarket (API + inventario)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000, help="Los clientes de semana 2/3 usan 3000")
+    parser.add_argument("--productos", type=int, default=100)
+    parser.add_argument("--sin-sse", action="store_true", help="Solo polling (el stream responde 404)")
+    parser.add_argument("--cambio-cada", type=float, default=5.0, help="Segundos medios entre cambios de stock")
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--distribucion", choices=list(DISTRIBUCIONES), default="fija",
+                        help="fija usa latencia ± jitter; el resto usa --latencia-ms como media/mediana")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Fracción de 500")
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--tasa-503", type=float, default=0.0)
+    parser.add_argument("--tasa-corte", type=float, default=0.0, help="Fracción de conexiones cortadas sin responder")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos con SO_REUSEPORT (estado independiente)")
+    args = parser.parse_args()
+
+    hijos = [multiprocessing.Process(target=_servir, args=(args,), daemon=True) for _ in range(args.procesos - 1)]
+    for hijo in hijos:
+        hijo.start()
+    print(f"EcoMarket local en http://{args.host}:{args.puerto} ({args.procesos} proceso(s))")
+    _servir(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from plazos import contexto_sin_plazo, dentro_del_plazo
+
+@dataclass
+class MetricasClave:
+    peticiones: int = 0    # Llamadas recibidas para esta clave
+    ejecutadas: int = 0    # Las que realmente salieron a la red
+    deduplicadas: int = 0  # Las que se engancharon a una petición ya en vuelo
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones: mientras hay una petición en vuelo para una clave,
+    las llamadas idénticas esperan ese mismo futuro en lugar de abrir otra conexión.
+    Solo debe usarse con operaciones idempotentes (GET).
+    La petición compartida corre sin plazo propio: cada llamador espera con el suyo
+    (plazos.con_plazo) y, cuando se van todos, se cancela.
+    Las métricas van por `etiqueta` (por defecto la clave), que debe tener pocos valores
+    distintos: la clave solo vive mientras la petición está en vuelo, las métricas siempre.
+    """
+
+    def __init__(self):
+        self._en_vuelo = {}
+        self._llamadores = defaultdict(int)  # tarea -> llamadores esperándola
+        self.metricas = defaultdict(MetricasClave)  # etiqueta -> MetricasClave
+
+    def en_vuelo(self) -> int:
+        return len(self._en_vuelo)
+
+    def total_deduplicadas(self) -> int:
+        return sum(m.deduplicadas for m in self.metricas.values())
+
+    async def ejecutar(self, clave, fabrica, etiqueta=None):
+        """`fabrica()` crea la corrutina que hace la petición real."""
+        metricas = self.metricas[clave if etiqueta is None else etiqueta]
+        metricas.peticiones += 1
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            metricas.ejecutadas += 1
+            # Sin el plazo del primer llamador: si no, los demás heredarían el suyo
+            tarea = asyncio.get_running_loop().create_task(fabrica(), context=contexto_sin_plazo())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminada(clave, t))
+        else:
+            metricas.deduplicadas += 1
+        self._llamadores[tarea] += 1
+        try:
+            # shield: si un llamador se cancela o agota su plazo, la petición sigue para los demás
+            return await dentro_del_plazo(asyncio.shield(tarea))
+        finally:
+            self._llamadores[tarea] -= 1
+            if not self._llamadores[tarea]:
+                del self._llamadores[tarea]
+                if not tarea.done():
+                    tarea.cancel()  # Ya no la espera nadie
+
+    def _terminada(self, clave, tarea):
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        if not tarea.cancelled():
+            # Marca la excepción como recuperada aunque todos los llamadores se hayan ido
+            tarea.exception()
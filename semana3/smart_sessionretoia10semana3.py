@@ -1,63 +1,254 @@
+import argparse
 import asyncio
 import aiohttp
+import itertools
 import time
+from dataclasses import dataclass, field
+from histograma import Histograma
+from metricas import medir_pool, olvidar_pool, trazas_aiohttp
 
 class SmartSession:
-    def __init__(self, limit=20, ttl_dns=300):
+    """
+    ClientSession con un pool configurable y contabilidad real de conexiones:
+    - created/reused: eventos del TraceConfig (conexión nueva / keep-alive reutilizada).
+    - closed: conexiones abiertas alguna vez que ya no están en el pool (aiohttp no
+      tiene traza de cierre: keep-alive vencido, `Connection: close` o error).
+    - queued / queue_wait: peticiones que esperaron un hueco del pool y cuánto.
+    Las respuestas se leen siempre dentro de `async with`, así que la conexión
+    vuelve al pool aunque falle el parseo.
+    """
+
+    def __init__(self, limit=20, ttl_dns=300, limit_per_host=0, keepalive_timeout=60):
         # Configuramos el conector con límites específicos
         self.connector = aiohttp.TCPConnector(
-            limit=limit, 
+            limit=limit,
+            limit_per_host=limit_per_host,
             ttl_dns_cache=ttl_dns,
-            keepalive_timeout=60
+            keepalive_timeout=keepalive_timeout
         )
-        self.session = aiohttp.ClientSession(connector=self.connector)
-        self._metrics = {"created": 0, "reused": 0}
+        self._metrics = {"created": 0, "reused": 0, "queued": 0}
+        self.queue_wait = Histograma()    # Segundos esperando un hueco del pool
+        self.connect_time = Histograma()  # Segundos en abrir una conexión nueva
+        # Contadores propios siempre (solo señales de conexión); el resto (latencias, en
+        # vuelo...) en metricas.REGISTRO si las métricas están activas
+        traza = aiohttp.TraceConfig()
+        traza.on_connection_create_start.append(self._conectando)
+        traza.on_connection_create_end.append(self._conexion_creada)
+        traza.on_connection_reuseconn.append(self._conexion_reutilizada)
+        traza.on_connection_queued_start.append(self._en_cola)
+        traza.on_connection_queued_end.append(self._fuera_de_cola)
+        self.session = aiohttp.ClientSession(
+            connector=self.connector, trace_configs=[traza, *trazas_aiohttp("smart_session")])
+        medir_pool(self.connector, "smart_session")
+
+    async def _conectando(self, session, ctx, params):
+        ctx.conectando = time.perf_counter()
+
+    async def _conexion_creada(self, session, ctx, params):
+        self._metrics["created"] += 1
+        self.connect_time.registrar(time.perf_counter() - ctx.conectando)
+
+    async def _conexion_reutilizada(self, session, ctx, params):
+        self._metrics["reused"] += 1
+
+    async def _en_cola(self, session, ctx, params):
+        self._metrics["queued"] += 1
+        ctx.en_cola = time.perf_counter()
+
+    async def _fuera_de_cola(self, session, ctx, params):
+        self.queue_wait.registrar(time.perf_counter() - ctx.en_cola)
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         await self.session.close()
+        olvidar_pool(self.connector, "smart_session")
 
     async def get(self, url, **kwargs):
-        # Monitoreo simple del estado del pool
-        active = len(self.connector.active_connections)
-        total = self.connector.limit
-        print(f"📊 Pool Status: {active}/{total} conexiones activas")
-        
+        # El estado del pool se consulta con get_pool_report() o metricas.REGISTRO.exportar()
         async with self.session.get(url, **kwargs) as response:
             return await response.json()
 
+    async def fetch(self, method, url, **kwargs):
+        """Petición cualquiera con el cuerpo leído entero: (status, bytes). Libera la conexión."""
+        async with self.session.request(method, url, **kwargs) as response:
+            return response.status, await response.read()
+
     def get_pool_report(self):
+        idle = sum(len(conns) for conns in self.connector._conns.values())
+        acquired = len(self.connector._acquired)
+        created, reused = self._metrics["created"], self._metrics["reused"]
         return {
             "limit": self.connector.limit,
-            "active": len(self.connector.active_connections),
-            "acquired": self.connector.total_conns
+            "limit_per_host": self.connector.limit_per_host,
+            "open": idle + acquired,
+            "idle": idle,
+            "acquired": acquired,
+            "created": created,
+            "reused": reused,
+            "closed": created - idle - acquired,
+            "reuse_ratio": reused / (created + reused) if created + reused else 0.0,
+            "queued": self._metrics["queued"],
+            "queue_wait": self.queue_wait.resumen(),
+            "connect_time": self.connect_time.resumen(),
         }
 
 # --- 3. Benchmark de Configuración de Pool ---
-async def run_pool_benchmark(limit_size):
-    url = "http://localhost:3000/api/productos"
+async def run_pool_benchmark(limit_size, url="http://localhost:3000/api/productos"):
     start = time.perf_counter()
-    
+
+    async def pedir(session):
+        # Leer el cuerpo dentro de `async with` devuelve la conexión al pool; sin esto
+        # cada respuesta retenía su socket y se medían conexiones filtradas
+        async with session.get(url) as response:
+            await response.read()
+
     # 50 peticiones con 100ms de delay simulado
-    async with aiohttp.TCPConnector(limit=limit_size) as connector:
-        async with aiohttp.ClientSession(connector=connector) as session:
-            tasks = []
-            for _ in range(50):
-                tasks.append(asyncio.create_task(session.get(url)))
-                # Simulamos delay de red local
-                await asyncio.sleep(0.01) 
-            
-            await asyncio.gather(*tasks)
-            
+    async with SmartSession(limit=limit_size) as smart:
+        tasks = []
+        for _ in range(50):
+            tasks.append(asyncio.create_task(pedir(smart.session)))
+            # Simulamos delay de red local
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*tasks)
+        report = smart.get_pool_report()
+
     end = time.perf_counter()
-    return end - start
+    return end - start, report
+
+# --- 4. Autoajuste del Pool ---
+@dataclass
+class PoolTrial:
+    limit: int
+    limit_per_host: int
+    keepalive_timeout: float
+    requests: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latency: Histograma = field(default_factory=Histograma)
+    report: dict = field(default_factory=dict)
+
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return {
+            "limit": self.limit, "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout, "requests": self.requests,
+            "errors": self.errors, "throughput": self.throughput(),
+            "latency": self.latency.resumen(),
+            "created": self.report.get("created"), "reused": self.report.get("reused"),
+            "reuse_ratio": self.report.get("reuse_ratio"), "queue_wait_p99": self.report["queue_wait"]["p99"],
+        }
+
+async def _trial(url, limit, limit_per_host, keepalive_timeout, concurrency, requests, pause, warmup):
+    trial = PoolTrial(limit, limit_per_host, keepalive_timeout)
+    async with SmartSession(limit=limit, limit_per_host=limit_per_host,
+                            keepalive_timeout=keepalive_timeout) as smart:
+
+        async def worker(pending, measure):
+            # Modelo cerrado: `concurrency` usuarios que piden, esperan y (opcionalmente) pausan
+            for _ in pending:
+                start = time.perf_counter()
+                try:
+                    status, _ = await smart.fetch("GET", url)
+                    error = status >= 400
+                except aiohttp.ClientError:
+                    error = True
+                if measure:
+                    trial.requests += 1
+                    trial.errors += error
+                    trial.latency.registrar(time.perf_counter() - start)
+                if pause:
+                    await asyncio.sleep(pause)
+
+        async def run(n, measure):
+            pending = iter(range(n))  # Compartido: los usuarios se reparten las n peticiones
+            await asyncio.gather(*[worker(pending, measure) for _ in range(concurrency)])
+
+        # Calentamiento fuera de la medición (abre las conexiones del pool)
+        await run(warmup, False)
+        start = time.perf_counter()
+        await run(requests, True)
+        trial.elapsed = time.perf_counter() - start
+        trial.report = smart.get_pool_report()
+    return trial
+
+def recommend(trials, slo_p99=None, tolerance=0.05, latency_tolerance=0.2):
+    """
+    Entre las configuraciones sin errores (y con p99 <= slo_p99, si se da): las que
+    quedan a menos de `tolerance` del mejor throughput y a menos de `latency_tolerance`
+    del mejor p99 de esas; de ellas, la de menos conexiones (limit, limit_per_host) y,
+    a igualdad, la de menor p99.
+    """
+    valid = [t for t in trials if not t.errors and (slo_p99 is None or t.latency.percentil(99) <= slo_p99)]
+    if not valid:
+        return None
+    best = max(t.throughput() for t in valid)
+    candidates = [t for t in valid if t.throughput() >= best * (1 - tolerance)]
+    best_p99 = min(t.latency.percentil(99) for t in candidates)
+    candidates = [t for t in candidates if t.latency.percentil(99) <= best_p99 * (1 + latency_tolerance)]
+    # limit=0 es "sin límite" en aiohttp: cuenta como el mayor
+    return min(candidates, key=lambda t: (t.limit or float("inf"), t.limit_per_host or float("inf"),
+                                          t.latency.percentil(99)))
+
+async def tune_pool(url, limits=(10, 20, 50, 100), limits_per_host=(0,), keepalive_timeouts=(15, 60),
+                    concurrency=50, requests=500, pause=0.0, warmup=50, slo_p99=None, on_trial=None):
+    """
+    Barre limit x limit_per_host x keepalive_timeout contra `url` con `concurrency`
+    peticiones simultáneas y recomienda una configuración (ver recommend()). El
+    keepalive_timeout solo se nota con `pause` > 0 (conexiones ociosas entre peticiones).
+    Devuelve (recomendada, todas).
+    """
+    trials = []
+    for limit, per_host, keepalive in itertools.product(limits, limits_per_host, keepalive_timeouts):
+        trial = await _trial(url, limit, per_host, keepalive, concurrency, requests, pause, warmup)
+        trials.append(trial)
+        if on_trial:
+            on_trial(trial)
+    return recommend(trials, slo_p99), trials
+
+def print_trial(t):
+    l = t.latency.resumen()
+    print(f"{t.limit or '∞':>6}{t.limit_per_host or '∞':>9}{t.keepalive_timeout:>10g}{t.throughput():>10.1f}"
+          f"{l['p50'] * 1000:>9.1f}{l['p99'] * 1000:>9.1f}{t.report['created']:>8}{t.report['reused']:>8}{t.errors:>6}")
 
-async def main():
-    for limit in [5, 20, 0]: # 0 es ilimitado en aiohttp
-        t = await run_pool_benchmark(limit)
-        print(f"🚀 Pool Limit {limit if limit != 0 else '∞'}: {t:.4f}s")
+async def main(url, tune, args):
+    if not tune:
+        for limit in [5, 20, 0]: # 0 es ilimitado en aiohttp
+            t, report = await run_pool_benchmark(limit, url)
+            print(f"🚀 Pool Limit {limit if limit != 0 else '∞'}: {t:.4f}s "
+                  f"(creadas {report['created']}, reutilizadas {report['reused']})")
+        return
+    print(f"{'limit':>6}{'per_host':>9}{'keepalive':>10}{'req/s':>10}{'p50 ms':>9}{'p99':>9}"
+          f"{'nuevas':>8}{'reusos':>8}{'Err':>6}")
+    best, _ = await tune_pool(url, args.limits, args.per_host, args.keepalive, args.concurrencia,
+                              args.peticiones, args.pausa, slo_p99=args.slo_p99_ms and args.slo_p99_ms / 1000,
+                              on_trial=print_trial)
+    if best is None:
+        print("Ninguna configuración cumple el objetivo")
+    else:
+        print(f"Recomendado: limit={best.limit}, limit_per_host={best.limit_per_host}, "
+              f"keepalive_timeout={best.keepalive_timeout:g}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Benchmark y autoajuste del pool de SmartSession")
+    parser.add_argument("--url", help="Por defecto se lanza servidor_local con /api/productos")
+    parser.add_argument("--tune", action="store_true", help="Barrido de limit/limit_per_host/keepalive_timeout")
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 20, 50, 100])
+    parser.add_argument("--per-host", type=int, nargs="+", default=[0])
+    parser.add_argument("--keepalive", type=float, nargs="+", default=[15, 60])
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=500)
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos entre peticiones de cada usuario")
+    parser.add_argument("--slo-p99-ms", type=float)
+    parser.add_argument("--latencia-ms", type=float, default=10.0, help="Servidor local")
+    args = parser.parse_args()
+    if args.url:
+        asyncio.run(main(args.url, args.tune, args))
+    else:
+        from servidor_local import ServidorEnProceso
+        with ServidorEnProceso("--latencia-ms", args.latencia_ms) as servidor:
+            asyncio.run(main(servidor.url + "/api/productos", args.tune, args))
@@ -0,0 +1,57 @@
+import codecs
+import re
+from dataclasses import dataclass
+
+_FIN_LINEA = re.compile(r"\r\n|\r|\n")
+
+@dataclass
+class EventoSSE:
+    datos: str
+    evento: str = "message"
+    id: str = None     # Último id recibido (persiste entre eventos, como en el navegador)
+    retry: int = None  # Milisegundos de espera antes de reconectar, si el servidor lo indicó
+
+class ParserSSE:
+    """
+    Parser incremental de text/event-stream (Server-Sent Events).
+    Se alimenta con trozos de bytes y devuelve los eventos completos; las líneas
+    de comentario (": ping") solo mantienen viva la conexión y se ignoran.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._datos = []
+        self._evento = ""
+        self._retry = None
+        self.ultimo_id = None
+
+    def alimentar(self, trozo: bytes) -> list:
+        texto = self._buffer + self._decoder.decode(trozo)
+        # Un "\r" al final puede ser la mitad de un "\r\n": se espera al siguiente trozo
+        corte = len(texto) - 1 if texto.endswith("\r") else len(texto)
+        lineas = _FIN_LINEA.split(texto[:corte])
+        self._buffer = lineas.pop() + texto[corte:]
+
+        eventos = []
+        for linea in lineas:
+            if not linea:
+                if self._datos:
+                    eventos.append(EventoSSE("\n".join(self._datos), self._evento or "message",
+                                             self.ultimo_id, self._retry))
+                self._datos, self._evento, self._retry = [], "", None
+                continue
+            if linea.startswith(":"):
+                continue
+            campo, _, valor = linea.partition(":")
+            if valor.startswith(" "):
+                valor = valor[1:]
+            if campo == "data":
+                self._datos.append(valor)
+            elif campo == "event":
+                self._evento = valor
+            elif campo == "id" and "\0" not in valor:
+                self.ultimo_id = valor
+            elif campo == "retry" and valor.isdigit():
+                self._retry = int(valor)
+        return eventos
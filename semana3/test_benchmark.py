@@ -0,0 +1,26 @@
+import random
+import pytest
+import benchmark_sync_vs_asyncretoia9semana3 as bench
+from servidor_local import ServidorEnHilo, Simulacion, crear_app
+
+def test_percentil_interpola():
+    assert bench.percentil([1, 2, 3, 4], 50) == 2.5
+    assert bench.percentil([1, 2, 3, 4], 100) == 4
+    assert bench.percentil([5], 99) == 5
+
+def test_intervalo_bootstrap_contiene_la_media():
+    rng = random.Random(1)
+    muestras = [rng.gauss(10, 1) for _ in range(200)]
+    bajo, alto = bench.intervalo_bootstrap(muestras, bench.statistics.fmean, rng, remuestreos=500)
+    assert bajo < 10 < alto and alto - bajo < 1
+
+@pytest.mark.parametrize("estrategia", list(bench.ESTRATEGIAS))
+def test_estrategias_contra_el_servidor_local(estrategia):
+    simulacion = Simulacion(latencia=0.005, tasa_error=0.5, rng=random.Random(3))
+    with ServidorEnHilo(crear_app(simulacion=simulacion)) as servidor:
+        urls = [f"{servidor.url}/api/productos"] * 4
+        r = bench.run_benchmark(estrategia, urls, calentamiento=1, repeticiones=5, pasadas_memoria=1)
+    assert r["tiempos"]["n"] == 5
+    assert r["tiempos"]["p50"] >= 0.005
+    assert 0 < r["errores"] < 20
+    assert r["memoria_pico_kb"] > 0
@@ -0,0 +1,119 @@
+import sys
+import threading
+import pytest
+from cache_http import CacheHTTP, CACHE, RED, REVALIDADA
+
+URL = "http://ecomarket.test/api/productos/1"
+
+class ServidorFalso:
+    """Simula el GET real: registra las cabeceras condicionales que recibe."""
+    def __init__(self, cabeceras=None, cuerpo=b'{"id": 1}', etag='"v1"'):
+        self.cabeceras = cabeceras or {}
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.peticiones = []
+
+    def __call__(self, extra):
+        self.peticiones.append(extra)
+        if self.etag and extra.get("If-None-Match") == self.etag:
+            return 304, {"ETag": self.etag}, b""
+        return 200, {"ETag": self.etag, **self.cabeceras}, self.cuerpo
+
+def test_respuesta_fresca_no_toca_la_red():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "max-age=60"})
+    assert cache.consultar(URL, {}, servidor).origen == RED
+    r = cache.consultar(URL, {}, servidor)
+    assert r.origen == CACHE and r.json() == {"id": 1}
+    assert len(servidor.peticiones) == 1
+    assert cache.estadisticas.aciertos == 1
+
+def test_revalida_con_etag_y_sirve_304_desde_cache():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "no-cache"})
+    cache.consultar(URL, {}, servidor)
+    r = cache.consultar(URL, {}, servidor)
+    assert r.origen == REVALIDADA and r.estado == 200 and r.json() == {"id": 1}
+    assert servidor.peticiones[-1] == {"If-None-Match": '"v1"'}
+    # El 304 no trae Cache-Control: se conserva el no-cache original y se vuelve a revalidar
+    cache.consultar(URL, {}, servidor)
+    assert cache.estadisticas.no_modificados == 2
+
+def test_no_store_no_se_guarda():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "no-store"})
+    cache.consultar(URL, {}, servidor)
+    cache.consultar(URL, {}, servidor)
+    assert servidor.peticiones == [{}, {}]
+    assert cache.estadisticas.entradas == 0
+
+def test_clave_incluye_cabeceras_vary():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "max-age=60"})
+    cache.consultar(URL, {"Authorization": "Bearer a"}, servidor)
+    cache.consultar(URL, {"Authorization": "Bearer b"}, servidor)
+    assert len(servidor.peticiones) == 2
+
+def test_expulsion_lru_por_presupuesto_de_bytes():
+    cache = CacheHTTP(max_bytes=300)
+    servidor = ServidorFalso({"Cache-Control": "max-age=60"}, cuerpo=b"x" * 100)
+    cache.consultar(URL + "?a", {}, servidor)
+    cache.consultar(URL + "?b", {}, servidor)
+    cache.consultar(URL + "?a", {}, servidor)  # 'a' pasa a ser la más reciente
+    cache.consultar(URL + "?c", {}, servidor)
+    assert cache.estadisticas.expulsiones == 1
+    assert cache.estadisticas.bytes_usados <= 300
+    peticiones = len(servidor.peticiones)
+    cache.consultar(URL + "?a", {}, servidor)
+    assert len(servidor.peticiones) == peticiones
+
+def test_invalidar_tras_escritura():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "max-age=60"})
+    cache.consultar(URL, {}, servidor)
+    cache.invalidar(URL)
+    cache.consultar(URL, {}, servidor)
+    assert len(servidor.peticiones) == 2
+
+def test_304_no_solicitado_se_repite_la_peticion():
+    cache = CacheHTTP()
+    respuestas = [(304, {}, b""), (200, {"ETag": '"v1"'}, b'{"id": 1}')]
+    peticiones = []
+
+    def pedir(extra):
+        peticiones.append(extra)
+        return respuestas.pop(0)
+
+    r = cache.consultar(URL, {}, pedir)
+    assert r.origen == RED and r.estado == 200 and r.json() == {"id": 1}
+    assert peticiones == [{}, {}] and cache.estadisticas.no_solicitados == 1
+    # Si el servidor insiste, se devuelve el 304 tal cual, sin inventar un cuerpo
+    r = cache.consultar("http://ecomarket.test/otra", {}, lambda extra: (304, {}, b""))
+    assert r.estado == 304 and r.origen == RED
+
+def test_estadisticas_desde_varios_hilos():
+    cache = CacheHTTP()
+    cache.consultar(URL, {}, ServidorFalso({"Cache-Control": "max-age=60"}))
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Cambios de hilo muy frecuentes: sin lock se pierden sumas
+    try:
+        hilos = [threading.Thread(target=lambda: [cache.consultar(URL, {}, None) for _ in range(2000)])
+                 for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        sys.setswitchinterval(intervalo)
+    assert cache.estadisticas.aciertos == 8 * 2000
+
+@pytest.mark.asyncio
+async def test_consultar_async():
+    cache = CacheHTTP()
+    servidor = ServidorFalso({"Cache-Control": "max-age=60"})
+
+    async def pedir(extra):
+        return servidor(extra)
+
+    await cache.consultar_async(URL, {}, pedir)
+    assert (await cache.consultar_async(URL, {}, pedir)).origen == CACHE
@@ -0,0 +1,122 @@
+import asyncio
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from circuito import (Circuito, CircuitoAbierto, RegistroCircuitos,
+                      CERRADO, ABIERTO, SEMIABIERTO)
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+def circuito(**opciones):
+    reloj = Reloj()
+    opciones.setdefault("minimo_peticiones", 4)
+    return Circuito("/pedidos", reloj=reloj, **opciones), reloj
+
+def resultados(c, *exitos):
+    for exito in exitos:
+        c.registrar(c.permitir(), exito)
+
+class TestCircuito:
+
+    def test_se_abre_al_superar_el_umbral(self):
+        c, _ = circuito(umbral_error=0.5)
+        resultados(c, True, True, False)
+        assert c.estado == CERRADO
+        resultados(c, False)
+        assert c.estado == ABIERTO
+        with pytest.raises(CircuitoAbierto):
+            c.permitir()
+        assert c.rechazadas == 1
+
+    def test_no_se_abre_sin_el_minimo_de_peticiones(self):
+        c, _ = circuito(minimo_peticiones=10)
+        resultados(c, *[False] * 9)
+        assert c.estado == CERRADO
+
+    def test_la_ventana_olvida_los_fallos_antiguos(self):
+        c, reloj = circuito(ventana=10)
+        resultados(c, False, False, False)
+        reloj.ahora += 11
+        resultados(c, True, True, True, False)
+        assert c.estado == CERRADO
+
+    def test_semiabierto_limita_las_sondas_y_cierra(self):
+        c, reloj = circuito(espera_abierto=5, sondas=1, exitos_para_cerrar=2)
+        resultados(c, *[False] * 4)
+        reloj.ahora += 5
+        testigo = c.permitir()
+        assert c.estado == SEMIABIERTO
+        with pytest.raises(CircuitoAbierto):
+            c.permitir()  # Solo una sonda a la vez
+        c.registrar(testigo, True)
+        resultados(c, True)
+        assert c.estado == CERRADO
+        assert [(x.anterior, x.nuevo) for x in c.historial] == [
+            (CERRADO, ABIERTO), (ABIERTO, SEMIABIERTO), (SEMIABIERTO, CERRADO)]
+
+    def test_sonda_fallida_reabre_con_espera_doble(self):
+        c, reloj = circuito(espera_abierto=5, max_espera_abierto=8)
+        resultados(c, *[False] * 4)
+        for espera in (5, 8, 8):
+            reloj.ahora += espera - 0.1
+            with pytest.raises(CircuitoAbierto):
+                c.permitir()
+            reloj.ahora += 0.1
+            resultados(c, False)
+            assert c.estado == ABIERTO
+
+    def test_resultados_de_un_estado_anterior_se_ignoran(self):
+        c, reloj = circuito()
+        lenta = c.permitir()
+        resultados(c, *[False] * 4)
+        reloj.ahora += 5
+        sonda = c.permitir()
+        c.registrar(lenta, False)  # Empezó con el circuito cerrado
+        assert c.estado == SEMIABIERTO
+        c.registrar(sonda, None)   # Cancelada: libera la sonda sin contar
+        c.registrar(c.permitir(), True)
+        assert c.estado == SEMIABIERTO
+
+    def test_registro_comparte_historial_y_eventos(self):
+        eventos = []
+        registro = RegistroCircuitos(al_cambiar=eventos.append, minimo_peticiones=1)
+        resultados(registro.obtener("/pedidos"), False)
+        resultados(registro.obtener("/productos"), True)
+        assert registro.estados() == {"/pedidos": ABIERTO, "/productos": CERRADO}
+        assert [e.circuito for e in eventos] == ["/pedidos"] == [e.circuito for e in registro.historial]
+
+@pytest.mark.asyncio
+class TestClienteAsync:
+
+    async def test_dashboard_falla_rapido_con_el_endpoint_caido(self, monkeypatch):
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+        llamadas = {"/api/pedidos": 0}
+
+        async def caido(request):
+            llamadas[request.path] += 1
+            return web.Response(status=503)
+
+        async def productos(request):
+            return web.json_response([])
+
+        app = web.Application()
+        app.router.add_get("/api/pedidos", caido)
+        app.router.add_get("/api/productos", productos)
+        app.router.add_get("/api/productores", productos)
+        async with TestServer(app) as servidor:
+            monkeypatch.setattr(cliente, "BASE_URL", str(servidor.make_url("/api")))
+            monkeypatch.setattr(cliente, "REINTENTOS", None)
+            monkeypatch.setattr(cliente, "CIRCUITOS", RegistroCircuitos(minimo_peticiones=3))
+            for _ in range(10):
+                resultado = await cliente.cargar_dashboard()
+        assert llamadas["/api/pedidos"] == 3
+        assert resultado["productos"] == []
+        assert resultado["circuitos"]["/pedidos"] == ABIERTO
+        assert resultado["circuitos"]["/productos"] == CERRADO
+        assert isinstance(resultado["errores"][0], CircuitoAbierto)
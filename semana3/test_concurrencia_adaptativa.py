@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from retoia5semana3 import AdaptiveConcurrencyLimiter, ThrottledClient
+
+class RespuestaFalsa:
+    def __init__(self, status):
+        self.status = status
+
+async def peticion(limitador, latencia=0.005, estado=200, excepcion=None):
+    async with limitador as permiso:
+        await asyncio.sleep(latencia)
+        if excepcion:
+            raise excepcion
+        permiso.estado = estado
+
+@pytest.mark.asyncio
+class TestAdaptiveConcurrencyLimiter:
+
+    async def test_crece_mientras_la_latencia_es_estable(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=2, maximo=20)
+        for _ in range(10):
+            await asyncio.gather(*[peticion(limitador) for _ in range(30)])
+        assert limitador.limite > 2
+        assert all(c.motivo == "aumento" for c in limitador.historial)
+
+    async def test_no_crece_si_el_limite_no_se_usa(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=5)
+        for _ in range(20):
+            await peticion(limitador)
+        assert limitador.limite == 5
+
+    async def test_recorte_por_429_una_vez_por_ronda(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=16)
+        await asyncio.gather(*[peticion(limitador, estado=429) for _ in range(16)])
+        assert limitador.limite == 8
+        assert [c.motivo for c in limitador.historial] == ["http 429"]
+
+    async def test_recorte_por_timeout(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=10)
+        with pytest.raises(asyncio.TimeoutError):
+            await peticion(limitador, excepcion=asyncio.TimeoutError())
+        assert limitador.limite == 5
+        assert limitador.historial[-1].motivo == "timeout"
+        assert limitador.in_flight == 0
+
+    async def test_recorte_por_latencia_degradada(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=10, tolerancia=2.0)
+        for _ in range(5):
+            await peticion(limitador, latencia=0.002)
+        for _ in range(10):
+            await peticion(limitador, latencia=0.03)
+        assert limitador.limite < 10
+        assert "latencia" in {c.motivo for c in limitador.historial}
+
+    async def test_nunca_supera_el_limite_en_vuelo(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=3, maximo=3)
+        maximo = 0
+
+        async def medir():
+            nonlocal maximo
+            async with limitador:
+                maximo = max(maximo, limitador.in_flight)
+                await asyncio.sleep(0.002)
+
+        await asyncio.gather(*[medir() for _ in range(30)])
+        assert maximo == 3
+
+    async def test_cancelar_en_cola_no_bloquea_a_los_demas(self):
+        limitador = AdaptiveConcurrencyLimiter(inicial=1)
+        ocupado = asyncio.create_task(peticion(limitador, latencia=0.02))
+        await asyncio.sleep(0)
+        en_cola = asyncio.create_task(peticion(limitador))
+        await asyncio.sleep(0)
+        en_cola.cancel()
+        await ocupado
+        await asyncio.wait_for(peticion(limitador), 0.1)
+        assert limitador.in_flight == 0
+
+    async def test_throttled_client_adaptativo(self):
+        cambios = []
+        cliente = ThrottledClient(8, 1000, adaptive=True, al_cambiar=cambios.append)
+
+        async def backend():
+            await asyncio.sleep(0.001)
+            return RespuestaFalsa(503)
+
+        resultado, espera = await cliente.execute(backend())
+        assert resultado.status == 503
+        assert cliente.concurrency.limite == 4
+        assert cambios[0].motivo == "http 503"
@@ -0,0 +1,46 @@
+import random
+import pytest
+from aiohttp.test_utils import TestServer
+from generador_carga import GeneradorCarga, barrer
+from servidor_local import Simulacion, crear_app
+
+def servidor(latencia):
+    return TestServer(crear_app(simulacion=Simulacion(latencia=latencia)))
+
+@pytest.mark.asyncio
+class TestGeneradorCarga:
+
+    async def test_modelo_abierto_sigue_la_tasa(self):
+        async with servidor(0.002) as srv:
+            async with GeneradorCarga(str(srv.make_url("/api/productos/1")), rng=random.Random(1)) as g:
+                r = await g.abierto(200, duracion=1.0, calentamiento=0.2)
+        assert 150 < r.enviadas < 250
+        assert r.completadas == r.enviadas and r.errores == 0
+        assert 150 < r.throughput() < 250
+        assert r.latencia.percentil(50) < 0.05
+
+    async def test_la_sobrecarga_se_ve_desde_el_instante_previsto(self):
+        # Capacidad ~2 / 20 ms = 100 req/s; se ofrecen 200
+        async with servidor(0.02) as srv:
+            async with GeneradorCarga(str(srv.make_url("/api/productos/1")), limite=2,
+                                      rng=random.Random(2)) as g:
+                r = await g.abierto(200, duracion=1.0, calentamiento=0.2)
+        assert r.throughput() < 130
+        # Sin corregir la omisión coordinada la mediana sería ~20 ms
+        assert r.latencia.percentil(50) > 0.1
+
+    async def test_modelo_cerrado(self):
+        async with servidor(0.01) as srv:
+            async with GeneradorCarga(str(srv.make_url("/api/productos/1"))) as g:
+                r = await g.cerrado(4, duracion=1.0, calentamiento=0.2)
+        # 4 usuarios sin pensar y ~10 ms por petición: ~400 req/s como mucho
+        assert 150 < r.throughput() < 420
+        assert r.retraso_envio.percentil(99) < 0.01
+
+    async def test_barrido_devuelve_un_punto_por_combinacion(self):
+        async with servidor(0.001) as srv:
+            puntos = await barrer(str(srv.make_url("/api/productos")), "cerrado", cargas=(1, 2),
+                                  pools=(1, 5), limites=(0, 1), duracion=0.2, calentamiento=0)
+        assert len(puntos) == 8
+        assert {(p["pool"], p["limite"], p["carga"]) for p in puntos} == {
+            (pool, limite, carga) for pool in (1, 5) for limite in (0, 1) for carga in (1, 2)}
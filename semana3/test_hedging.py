@@ -0,0 +1,96 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from hedging import PoliticaHedging
+
+def politica(**opciones):
+    opciones.setdefault("minimo_muestras", 5)
+    return PoliticaHedging(**opciones)
+
+async def calentar(p, clave="k", latencia=0.01, n=5):
+    for _ in range(n):
+        await p.ejecutar(clave, lambda: asyncio.sleep(latencia))
+
+class Llamadas:
+    """llamada() que responde con las latencias dadas, en orden; anota cancelaciones."""
+    def __init__(self, *latencias, error=None):
+        self.latencias = list(latencias)
+        self.error = error
+        self.canceladas = 0
+
+    def __call__(self):
+        return self._una(len(self.latencias), self.latencias.pop(0))
+
+    async def _una(self, n, latencia):
+        try:
+            await asyncio.sleep(latencia)
+        except asyncio.CancelledError:
+            self.canceladas += 1
+            raise
+        if self.error and n == 2:  # La primaria falla
+            raise self.error
+        return latencia
+
+@pytest.mark.asyncio
+class TestPoliticaHedging:
+
+    async def test_sin_muestras_no_duplica(self):
+        p = politica()
+        assert await p.ejecutar("k", Llamadas(0.05)) == 0.05
+        assert p.coberturas == 0
+
+    async def test_la_lenta_se_cubre_y_se_cancela(self):
+        p = politica()
+        await calentar(p)
+        llamadas = Llamadas(1.0, 0.01)
+        inicio = time.monotonic()
+        assert await p.ejecutar("k", llamadas) == 0.01
+        assert time.monotonic() - inicio < 0.5
+        assert p.coberturas == p.ganadas_por_cobertura == 1
+        await asyncio.sleep(0)
+        assert llamadas.canceladas == 1
+
+    async def test_tasa_de_coberturas_acotada(self):
+        p = politica(rafaga=1, max_tasa=0)
+        await calentar(p)
+        for _ in range(3):
+            await p.ejecutar("k", Llamadas(0.1, 0.01))
+        assert p.coberturas == 1 and p.denegadas == 2
+
+    async def test_si_la_primaria_falla_gana_el_duplicado(self):
+        p = politica()
+        await calentar(p)
+        assert await p.ejecutar("k", Llamadas(0.05, 0.1, error=ConnectionError())) == 0.1
+
+    async def test_las_claves_tienen_umbrales_propios(self):
+        p = politica()
+        await calentar(p, "rapida", 0.005)
+        await calentar(p, "lenta", 0.05)
+        assert p.retraso("rapida") < 0.02 < p.retraso("lenta")
+
+    async def test_obtener_producto_con_hedging(self, monkeypatch):
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+        import aiohttp
+        llamadas = 0
+
+        async def producto(request):
+            nonlocal llamadas
+            llamadas += 1
+            if llamadas == 6:  # Tras 5 de calentamiento, una se queda colgada
+                await asyncio.sleep(2)
+            return web.json_response({"id": 1})
+
+        app = web.Application()
+        app.router.add_get("/api/productos/1", producto)
+        async with TestServer(app) as servidor:
+            monkeypatch.setattr(cliente, "BASE_URL", str(servidor.make_url("/api")))
+            monkeypatch.setattr(cliente, "HEDGING", politica())
+            async with aiohttp.ClientSession() as session:
+                for _ in range(5):
+                    await cliente.obtener_producto(session, 1)
+                inicio = time.monotonic()
+                assert await cliente.obtener_producto(session, 1) == {"id": 1}
+                assert time.monotonic() - inicio < 1
+        assert cliente.HEDGING.coberturas == 1 and llamadas == 7
@@ -0,0 +1,47 @@
+import json
+import pytest
+from json_incremental import ParserArrayJSON, ErrorJSONIncremental
+
+PRODUCTOS = [
+    {"id": i, "nombre": f"Café ñ {i}", "precio": i + 0.5, "tags": ["a", {"b": [1, 2]}]}
+    for i in range(50)
+]
+
+def trocear(datos, tamano):
+    return [datos[i:i + tamano] for i in range(0, len(datos), tamano)]
+
+@pytest.mark.parametrize("tamano", [1, 3, 7, 64, 100000])
+def test_reconstruye_el_array_con_cualquier_troceo(tamano):
+    """Los cortes pueden caer a mitad de un objeto o de un carácter UTF-8"""
+    parser = ParserArrayJSON()
+    resultado = []
+    for trozo in trocear(json.dumps(PRODUCTOS, ensure_ascii=False).encode(), tamano):
+        resultado.extend(parser.alimentar(trozo))
+    resultado.extend(parser.terminar())
+    assert resultado == PRODUCTOS
+
+def test_rinde_elementos_antes_del_final():
+    parser = ParserArrayJSON()
+    assert parser.alimentar(b'[{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.alimentar(b': 2}]') == [{"id": 2}]
+    assert parser.terminar() == []
+
+def test_numero_partido_entre_trozos():
+    parser = ParserArrayJSON()
+    assert parser.alimentar(b'[12') == []
+    assert parser.alimentar(b'34, 5]') == [1234, 5]
+
+def test_array_vacio():
+    parser = ParserArrayJSON()
+    assert parser.alimentar(b' [ ] ') == []
+    assert parser.terminar() == []
+
+def test_array_incompleto():
+    parser = ParserArrayJSON()
+    parser.alimentar(b'[{"id": 1},')
+    with pytest.raises(ErrorJSONIncremental):
+        parser.terminar()
+
+def test_no_es_un_array():
+    with pytest.raises(ErrorJSONIncremental):
+        ParserArrayJSON().alimentar(b'{"id": 1}')
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from lotes import CONFLICTO, FALLO, OK, iterar_lote, iterar_lote_async, procesar_lote, procesar_lote_async
+
+class Conflicto(Exception): pass
+
+def operacion(item):
+    if item % 5 == 0:
+        raise Conflicto(item)
+    if item % 7 == 0:
+        raise ValueError(item)
+    return item * 2
+
+async def operacion_async(item):
+    await asyncio.sleep(0)
+    return operacion(item)
+
+class Entrada:
+    """Iterable que anota cuántos elementos se han leído."""
+    def __init__(self, n):
+        self.n = n
+        self.leidos = 0
+
+    def __iter__(self):
+        for i in range(1, self.n + 1):
+            self.leidos += 1
+            yield i
+
+def comprobar_resumen(resumen):
+    assert resumen.total == 20
+    assert [r.item for r in resumen.conflictos] == [5, 10, 15, 20]
+    assert sorted(r.item for r in resumen.fallos) == [7, 14]
+    assert resumen.exitos == 14
+    assert all(isinstance(r.valor, ValueError) for r in resumen.fallos)
+
+def test_sync_clasifica_exitos_conflictos_y_fallos():
+    vistos = []
+    comprobar_resumen(procesar_lote(operacion, range(1, 21), 4, 2, Conflicto, vistos.append))
+    assert sorted(r.indice for r in vistos) == list(range(20))
+    assert {r.estado for r in vistos} == {OK, CONFLICTO, FALLO}
+
+def test_sync_respeta_la_concurrencia_y_la_lectura_anticipada():
+    en_curso = maximo = 0
+    cerrojo = threading.Lock()
+
+    def lenta(item):
+        nonlocal en_curso, maximo
+        with cerrojo:
+            en_curso += 1
+            maximo = max(maximo, en_curso)
+        time.sleep(0.005)
+        with cerrojo:
+            en_curso -= 1
+        return item
+
+    entrada = Entrada(30)
+    for resultado in iterar_lote(lenta, entrada, tamano_lote=5, max_concurrencia=3):
+        # Nunca más de tamano_lote elementos leídos por delante de los entregados
+        assert entrada.leidos - resultado.indice <= 5 + 3
+    assert maximo <= 3 and entrada.leidos == 30
+
+def test_sync_salida_anticipada_descarta_lo_pendiente():
+    ejecutados = []
+
+    def lenta(item):
+        time.sleep(0.02)
+        ejecutados.append(item)
+        return item
+
+    entrada = Entrada(1000)
+    inicio = time.monotonic()
+    iterador = iterar_lote(lenta, entrada, tamano_lote=50, max_concurrencia=2)
+    next(iterador)
+    iterador.close()
+    assert time.monotonic() - inicio < 0.3  # No espera a los 50 encolados
+    time.sleep(0.1)
+    assert len(ejecutados) <= 4 and entrada.leidos == 50
+
+@pytest.mark.asyncio
+class TestLotesAsync:
+
+    async def test_clasifica_exitos_conflictos_y_fallos(self):
+        comprobar_resumen(await procesar_lote_async(operacion_async, range(1, 21), 4, 2, Conflicto))
+
+    async def test_respeta_la_concurrencia_y_la_lectura_anticipada(self):
+        en_curso = maximo = 0
+
+        async def lenta(item):
+            nonlocal en_curso, maximo
+            en_curso += 1
+            maximo = max(maximo, en_curso)
+            await asyncio.sleep(0.001)
+            en_curso -= 1
+            return item
+
+        entrada = Entrada(30)
+        async for resultado in iterar_lote_async(lenta, entrada, tamano_lote=5, max_concurrencia=3):
+            assert entrada.leidos - resultado.indice <= 5 + 3
+        assert maximo == 3 and entrada.leidos == 30
+
+    async def test_salida_anticipada_cancela_lo_pendiente(self):
+        terminadas = 0
+
+        async def lenta(item):
+            nonlocal terminadas
+            await asyncio.sleep(0.01 * item)
+            terminadas += 1
+            return item
+
+        iterador = iterar_lote_async(lenta, range(1, 11), tamano_lote=10, max_concurrencia=10)
+        assert (await iterador.__anext__()).item == 1
+        await iterador.aclose()
+        await asyncio.sleep(0.15)
+        assert terminadas == 1
+
+    async def test_actualizar_lote_cuenta_404_y_5xx_como_fallos(self, monkeypatch):
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+        estados = {1: 200, 2: 404, 3: 409, 4: 500, 5: 422}
+
+        async def precio(request):
+            estado = estados[int(request.match_info["id"])]
+            return web.json_response({"id": 1} if estado == 200 else {"error": estado}, status=estado)
+
+        app = web.Application()
+        app.router.add_patch("/api/productos/{id}/precio", precio)
+        monkeypatch.setattr(cliente, "REINTENTOS", None)
+        monkeypatch.setattr(cliente, "CIRCUITOS", None)
+        async with TestServer(app) as servidor:
+            monkeypatch.setattr(cliente, "BASE_URL", str(servidor.make_url("/api")))
+            async with aiohttp.ClientSession() as session:
+                resumen = await cliente.actualizar_lote(session, [(i, {"precio": 1}) for i in estados])
+        assert resumen.exitos == 1
+        assert [r.item[0] for r in resumen.conflictos] == [3]
+        fallos = {r.item[0]: r.valor for r in resumen.fallos}
+        assert isinstance(fallos.pop(2), cliente.RecursoNoEncontrado)
+        assert sorted(fallos) == [4, 5] and all(isinstance(e, cliente.EcoMarketError) for e in fallos.values())
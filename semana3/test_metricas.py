@@ -0,0 +1,122 @@
+import asyncio
+import aiohttp
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from metricas import (Registro, TransporteMedido, endpoint_de, manejador_aiohttp, medir_pool,
+                      olvidar_pool, trace_config_aiohttp, trazas_aiohttp)
+from retoia5semana3 import M_ESPERA_TASA, RateLimiter
+
+def lineas(registro):
+    return registro.exportar().splitlines()
+
+def test_desactivado_no_registra_nada():
+    r = Registro()
+    r.contador("x", "x").inc()
+    r.histograma("h", "h", ("a",)).observar(0.1, "a")
+    r.medidor("g", "g").sumar()
+    assert [l for l in lineas(r) if not l.startswith("#")] == []
+
+def test_formato_prometheus():
+    r = Registro(prefijo="t_", activo=True)
+    r.contador("peticiones", "Peticiones", ("estado",)).inc(200, valor=3)
+    h = r.histograma("latencia", "Latencia", ("endpoint",), cubetas=(0.01, 0.1))
+    for valor in (0.005, 0.05, 0.05, 1.0):
+        h.observar(valor, "/p")
+    salida = lineas(r)
+    assert "# TYPE t_peticiones counter" in salida
+    assert 't_peticiones_total{estado="200"} 3' in salida
+    assert 't_latencia_bucket{endpoint="/p",le="0.01"} 1' in salida
+    assert 't_latencia_bucket{endpoint="/p",le="0.1"} 3' in salida
+    assert 't_latencia_bucket{endpoint="/p",le="+Inf"} 4' in salida
+    assert 't_latencia_count{endpoint="/p"} 4' in salida
+    assert h.histograma("/p").percentil(50) == pytest.approx(0.05, rel=0.05)
+
+def test_escapa_valores_de_etiqueta():
+    r = Registro(prefijo="t_", activo=True)
+    r.contador("errores", "Errores\ncon \\ barra", ("error",)).inc('a"b\\c\nd')
+    salida = lineas(r)
+    assert "# HELP t_errores Errores\\ncon \\\\ barra" in salida
+    assert 't_errores_total{error="a\\"b\\\\c\\nd"} 1' in salida
+
+def test_endpoint_sin_identificadores():
+    assert endpoint_de("/api/productos/17") == "/api/productos/{id}"
+    assert endpoint_de("/api/productos/17/precio") == "/api/productos/{id}/precio"
+    assert endpoint_de("/api/v2/productos") == "/api/v2/productos"
+
+@pytest.mark.asyncio
+class TestEnganches:
+
+    async def test_espera_del_limitador_de_tasa(self):
+        M_ESPERA_TASA.registro.activo = True
+        try:
+            limitador = RateLimiter(100, burst=1, nombre="prueba")
+            await limitador.wait()
+            await limitador.wait()
+            assert M_ESPERA_TASA.histograma("prueba").total == 2
+            assert M_ESPERA_TASA.histograma("prueba").maximo > 0
+        finally:
+            M_ESPERA_TASA.registro.activo = False
+
+    async def test_aiohttp_y_httpx(self):
+        async def producto(request):
+            return web.json_response({"id": 1}, status=404 if request.match_info["id"] == "9" else 200)
+
+        r = Registro(activo=True)
+        app = web.Application()
+        app.router.add_get("/api/productos/{id}", producto)
+        app.router.add_get("/metrics", manejador_aiohttp(r))
+        async with TestServer(app) as servidor:
+            conector = aiohttp.TCPConnector(limit=5)
+            medir_pool(conector, "a", r)
+            async with aiohttp.ClientSession(connector=conector,
+                                             trace_configs=[trace_config_aiohttp("a", r)]) as session:
+                for i in (1, 2, 9):
+                    async with session.get(servidor.make_url(f"/api/productos/{i}")) as resp:
+                        await resp.read()
+                async with session.get(servidor.make_url("/metrics")) as resp:
+                    texto = await resp.text()
+            async with httpx.AsyncClient(transport=TransporteMedido("x", registro=r)) as client:
+                await asyncio.gather(*[client.get(str(servidor.make_url("/api/productos/3"))) for _ in range(3)])
+                await client.get(str(servidor.make_url("/api/productos/3")))
+
+        assert 'ecomarket_http_latencia_segundos_count{cliente="a",metodo="GET",endpoint="/api/productos/{id}",estado="200"} 2' in texto
+        # Al exportar, la única conexión es la que está sirviendo /metrics
+        assert 'ecomarket_pool_conexiones_ociosas{cliente="a"} 0' in texto
+        assert 'ecomarket_pool_conexiones_ocupadas{cliente="a"} 1' in texto
+        salida = lineas(r)
+        assert 'ecomarket_pool_conexiones_creadas_total{cliente="a"} 1' in salida
+        assert 'ecomarket_pool_conexiones_reutilizadas_total{cliente="a"} 3' in salida
+        assert 'ecomarket_http_en_vuelo{cliente="a"} 0' in salida
+        assert 'ecomarket_http_latencia_segundos_count{cliente="x",metodo="GET",endpoint="/api/productos/{id}",estado="200"} 4' in salida
+        assert 'ecomarket_pool_conexiones_creadas_total{cliente="x"} 3' in salida
+        assert 'ecomarket_pool_conexiones_reutilizadas_total{cliente="x"} 1' in salida
+
+    async def test_httpx_con_fallos_de_red(self):
+        r = Registro(activo=True)
+        async with httpx.AsyncClient(transport=TransporteMedido("x", registro=r), timeout=1) as client:
+            for _ in range(3):
+                with pytest.raises(httpx.ConnectError):
+                    await client.get("http://127.0.0.1:1/api/productos/4")
+        salida = lineas(r)
+        assert 'ecomarket_http_en_vuelo{cliente="x"} 0' in salida
+        assert 'ecomarket_http_errores_total{cliente="x",metodo="GET",endpoint="/api/productos/{id}",error="ConnectError"} 3' in salida
+        assert not any(l.startswith("ecomarket_pool_conexiones_creadas_total") for l in salida)
+
+    async def test_sin_traza_si_desactivado_y_pool_olvidado_al_cerrar(self):
+        r = Registro()
+        assert trazas_aiohttp("a", r) == []
+        r.activo = True
+        assert len(trazas_aiohttp("a", r)) == 1
+        conectores = [aiohttp.TCPConnector(), aiohttp.TCPConnector()]
+        medir_pool(conectores[0], "a", r)
+        medir_pool(conectores[1], "b", r)
+        olvidar_pool(conectores[1], "a", r)  # Otro conector: no toca "a"
+        assert 'ecomarket_pool_conexiones_ociosas{cliente="a"} 0' in lineas(r)
+        olvidar_pool(conectores[0], "a", r)
+        await conectores[1].close()
+        salida = lineas(r)  # El cerrado se descarta al exportar
+        assert not any(l.startswith("ecomarket_pool_conexiones_ociosas{") for l in salida)
+        assert r.pools == {}
+        await conectores[0].close()
@@ -0,0 +1,108 @@
+import asyncio
+import random
+import threading
+import time
+import pytest
+from paginacion import Paginador, PaginadorAsync
+
+class Servidor:
+    """Listado de `total` elementos servido por page/limit; anota las páginas pedidas."""
+
+    def __init__(self, total, limite=10, ignora_page=False, ignora_limit=False):
+        self.datos = list(range(total))
+        self.limite = limite
+        self.ignora_page = ignora_page
+        self.ignora_limit = ignora_limit
+        self.pedidas = []
+        self.cerrojo = threading.Lock()
+
+    def pagina(self, numero):
+        with self.cerrojo:
+            self.pedidas.append(numero)
+        if self.ignora_limit:
+            return list(self.datos)
+        inicio = 0 if self.ignora_page else (numero - 1) * self.limite
+        return self.datos[inicio:inicio + self.limite]
+
+    def lenta(self, numero):
+        time.sleep(random.uniform(0, 0.01))
+        return self.pagina(numero)
+
+    async def pagina_async(self, numero):
+        await asyncio.sleep(random.uniform(0, 0.01))
+        return self.pagina(numero)
+
+CASOS = [
+    # (servidor, opciones, elementos esperados, como mucho estas páginas pedidas)
+    (dict(total=95), {}, list(range(95)), 10 + 3),
+    (dict(total=100), {}, list(range(100)), 11 + 3),
+    (dict(total=0), {}, [], 3),
+    (dict(total=95, ignora_page=True), {}, list(range(10)), 2 + 3),
+    (dict(total=95, ignora_limit=True), {}, list(range(95)), 1 + 3),
+    (dict(total=95), {"max_paginas": 4}, list(range(40)), 4),
+    (dict(total=95), {"max_paginas": 2, "ventana": 5}, list(range(20)), 2),
+]
+
+@pytest.mark.parametrize("servidor, opciones, esperados, max_pedidas", CASOS)
+def test_sync_termina_en_orden(servidor, opciones, esperados, max_pedidas):
+    s = Servidor(**servidor)
+    assert list(Paginador(s.lenta, limite=10, **opciones)) == esperados
+    assert len(s.pedidas) <= max_pedidas
+
+def test_sync_lee_por_adelantado():
+    s = Servidor(95)
+    paginas = Paginador(s.lenta, limite=10, ventana=3).paginas()
+    assert next(paginas) == list(range(10))
+    time.sleep(0.05)
+    # Las páginas 1-3 pedidas de entrada y la 4 al entregar la 1
+    assert sorted(s.pedidas) == [1, 2, 3, 4]
+    paginas.close()
+
+def test_sync_no_espera_a_las_paginas_en_vuelo():
+    s = Servidor(95)
+
+    def pagina(numero):
+        time.sleep(0 if numero == 1 else 0.5)
+        return s.pagina(numero)
+
+    inicio = time.monotonic()
+    for _ in Paginador(pagina, limite=10, ventana=3).paginas():
+        break  # Las páginas 2-4 siguen en vuelo
+    assert time.monotonic() - inicio < 0.3
+    inicio = time.monotonic()
+    assert list(Paginador(lambda n: [] if n == 1 else pagina(n), limite=10)) == []
+    assert time.monotonic() - inicio < 0.3
+
+def test_sync_ventana_acotada_por_memoria():
+    assert Paginador(None, limite=100, ventana=10, max_items_en_memoria=300).ventana == 2
+    with pytest.raises(ValueError):
+        Paginador(None, limite=100, max_items_en_memoria=150)
+    with pytest.raises(ValueError):
+        PaginadorAsync(None, limite=100, max_items_en_memoria=150)
+
+@pytest.mark.asyncio
+class TestPaginadorAsync:
+
+    @pytest.mark.parametrize("servidor, opciones, esperados, max_pedidas", CASOS)
+    async def test_termina_en_orden(self, servidor, opciones, esperados, max_pedidas):
+        s = Servidor(**servidor)
+        assert [x async for x in PaginadorAsync(s.pagina_async, limite=10, **opciones)] == esperados
+        assert len(s.pedidas) <= max_pedidas
+
+    async def test_lee_por_adelantado_y_cancela_al_salir(self):
+        s = Servidor(95)
+        pedidas, terminadas = [], []
+
+        async def pagina(numero):
+            pedidas.append(numero)
+            await asyncio.sleep(0.01 * numero)
+            terminadas.append(numero)
+            return s.pagina(numero)
+
+        paginas = PaginadorAsync(pagina, limite=10, ventana=3).paginas()
+        assert await paginas.__anext__() == list(range(10))
+        await asyncio.sleep(0)
+        assert pedidas == [1, 2, 3, 4] and terminadas == [1]
+        await paginas.aclose()
+        await asyncio.sleep(0.06)
+        assert terminadas == [1]
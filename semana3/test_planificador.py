@@ -0,0 +1,71 @@
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+from planificador import (PlanificadorSondeo, segundos_retry_after, CAMBIO, SIN_CAMBIO,
+                          NO_MODIFICADO, SOBRECARGA, ERROR, FALLO_CLIENTE)
+
+def planificador(**opciones):
+    return PlanificadorSondeo(base=5, maximo=60, rng=random.Random(1), **opciones)
+
+class TestPlanificadorSondeo:
+
+    def test_sin_cambios_crece_y_un_cambio_reinicia(self):
+        p = planificador(dispersion=0)
+        esperas = [p.siguiente(SIN_CAMBIO) for _ in range(20)]
+        assert esperas[:3] == [10, 15, 20]
+        assert esperas[-1] == 60
+        assert p.siguiente(CAMBIO) == 5
+
+    def test_304_crece_mas_despacio_y_con_techo_menor(self):
+        p = planificador(dispersion=0)
+        assert p.siguiente(NO_MODIFICADO) == 7.5
+        for _ in range(30):
+            espera = p.siguiente(NO_MODIFICADO)
+        assert espera == 30
+
+    def test_304_acorta_un_intervalo_alto(self):
+        p = planificador(dispersion=0)
+        for _ in range(20):
+            p.siguiente(SIN_CAMBIO)
+        assert p.siguiente(NO_MODIFICADO) == 30
+
+    def test_dispersion_desincroniza_una_flota(self):
+        esperas = {PlanificadorSondeo(rng=random.Random(i)).siguiente(CAMBIO) for i in range(50)}
+        assert len(esperas) == 50
+        assert all(4 <= e <= 6 for e in esperas)
+
+    @pytest.mark.parametrize("jitter", ["completo", "decorrelado"])
+    def test_backoff_con_jitter_acotado(self, jitter):
+        p = planificador(jitter=jitter)
+        esperas = [p.siguiente(SOBRECARGA) for _ in range(50)]
+        assert all(0 <= e <= 60 for e in esperas)
+        assert len(set(esperas)) > 10  # El decorrelado se queda a menudo en el tope
+
+    def test_fallo_cliente_espera_lo_maximo(self):
+        p = planificador(dispersion=0)
+        assert p.siguiente(FALLO_CLIENTE) == 60
+        assert p.siguiente(CAMBIO) == 5
+
+    def test_retry_after_es_un_minimo(self):
+        p = planificador(jitter="completo")
+        for _ in range(20):
+            assert p.siguiente(SOBRECARGA, retry_after=45) >= 45
+        assert p.metricas.por_retry_after > 0
+
+    def test_metricas_y_reduccion_de_carga(self):
+        p = planificador(dispersion=0)
+        for _ in range(10):
+            p.siguiente(NO_MODIFICADO)
+        p.siguiente(ERROR)
+        resumen = p.resumen()
+        assert resumen["sondeos"] == 11
+        assert resumen["por_resultado"] == {NO_MODIFICADO: 10, ERROR: 1}
+        assert 0.5 < resumen["reduccion_vs_base"] < 1
+
+def test_retry_after_en_segundos_y_como_fecha():
+    ahora = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert segundos_retry_after("120") == 120
+    assert segundos_retry_after(format_datetime(ahora + timedelta(seconds=30), usegmt=True), ahora) == 30
+    assert segundos_retry_after("mañana") is None
+    assert segundos_retry_after(None) is None
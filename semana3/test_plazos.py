@@ -0,0 +1,141 @@
+import asyncio
+import importlib
+import time
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from circuito import Circuito, CERRADO
+from plazos import PlazoAgotado, con_plazo, dentro_del_plazo, plazo_actual
+from reintentos import PoliticaReintentos, PresupuestoReintentos
+
+coordinacion = importlib.import_module("import async_retoia4semana3")
+
+class RespuestaFalsa:
+    status_code = 503
+    headers = {}
+
+def test_un_plazo_anidado_no_supera_al_de_fuera():
+    with con_plazo(0.5) as fuera:
+        with con_plazo(10) as dentro:
+            assert dentro.vence == fuera.vence
+            assert plazo_actual() is dentro
+        with con_plazo(None) as mismo:
+            assert mismo is fuera
+        assert plazo_actual() is fuera
+    assert plazo_actual() is None
+
+def test_no_se_reintenta_si_la_espera_no_cabe():
+    p = PoliticaReintentos(base=1, tope=1, jitter="ninguno", presupuesto=PresupuestoReintentos())
+    with con_plazo(0.5):
+        assert p._decidir("GET", {}, 0, 1, RespuestaFalsa()) is None
+    assert p._decidir("GET", {}, 0, 1, RespuestaFalsa()) == 1
+
+@pytest.mark.asyncio
+class TestPlazos:
+
+    async def test_cumplir_cancela_al_vencer(self):
+        cancelada = False
+
+        async def lenta():
+            nonlocal cancelada
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelada = True
+                raise
+
+        inicio = time.monotonic()
+        with con_plazo(0.05):
+            with pytest.raises(PlazoAgotado):
+                await dentro_del_plazo(lenta())
+        assert time.monotonic() - inicio < 0.5 and cancelada
+
+    async def test_las_tareas_heredan_el_plazo(self):
+        with con_plazo(0.05):
+            tarea = asyncio.create_task(dentro_del_plazo(asyncio.sleep(1)))
+        with pytest.raises(PlazoAgotado):
+            await tarea
+
+    async def test_el_timeout_propio_no_es_plazo_agotado(self):
+        async def falla():
+            raise asyncio.TimeoutError()
+
+        with con_plazo(1):
+            with pytest.raises(asyncio.TimeoutError) as error:
+                await dentro_del_plazo(falla())
+        assert not isinstance(error.value, PlazoAgotado)
+
+    async def test_plazo_agotado_no_se_reintenta_ni_abre_el_circuito(self):
+        llamadas = 0
+        circuito = Circuito("/x", minimo_peticiones=1)
+
+        async def enviar(cabeceras):
+            nonlocal llamadas
+            llamadas += 1
+            return await circuito.ejecutar_async(lambda: dentro_del_plazo(asyncio.sleep(1)))
+
+        politica = PoliticaReintentos(base=0.001, presupuesto=PresupuestoReintentos())
+        with con_plazo(0.02):
+            with pytest.raises(PlazoAgotado):
+                await politica.ejecutar_async("GET", enviar)
+        assert llamadas == 1 and circuito.estado == CERRADO
+
+@pytest_asyncio.fixture
+async def servidor():
+    async def perfil(request):
+        return web.Response(status=401)
+
+    async def colgada(request):
+        await asyncio.sleep(5)
+        return web.json_response([])
+
+    app = web.Application()
+    app.router.add_get("/api/perfil", perfil)
+    for ruta in ("productos", "categorias", "pedidos", "productores"):
+        app.router.add_get(f"/api/{ruta}", colgada)
+    async with TestServer(app) as srv:
+        yield str(srv.make_url("/api"))
+
+@pytest.mark.asyncio
+class TestCoordinacion:
+
+    async def test_401_cancela_y_libera_las_demas(self, servidor, monkeypatch):
+        monkeypatch.setattr(coordinacion, "BASE_URL", servidor)
+        async with aiohttp.ClientSession() as session:
+            inicio = time.monotonic()
+            resultado = await coordinacion.cargar_con_seguridad(session)
+            assert resultado["error"] == "No autorizado"
+            assert time.monotonic() - inicio < 1
+            assert not session.connector._acquired
+
+    async def test_prioridad_respeta_el_presupuesto_total(self, servidor, monkeypatch):
+        monkeypatch.setattr(coordinacion, "BASE_URL", servidor)
+        async with aiohttp.ClientSession() as session:
+            inicio = time.monotonic()
+            with con_plazo(0.2):
+                # El plazo de 3s de la función queda acotado por el de fuera
+                resultados = await coordinacion.cargar_con_prioridad(session, segundos=3)
+            assert time.monotonic() - inicio < 1
+            assert resultados == ["/perfil"]
+            assert not session.connector._acquired
+
+    async def test_cancelar_al_padre_libera_las_conexiones(self, servidor, monkeypatch):
+        monkeypatch.setattr(coordinacion, "BASE_URL", servidor)
+        async with aiohttp.ClientSession() as session:
+            tarea = asyncio.create_task(coordinacion.cargar_con_prioridad(session))
+            await asyncio.sleep(0.1)
+            tarea.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarea
+            assert not session.connector._acquired
+
+    async def test_dashboard_con_un_solo_plazo(self, servidor, monkeypatch):
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+        monkeypatch.setattr(cliente, "BASE_URL", servidor)
+        inicio = time.monotonic()
+        resultado = await cliente.cargar_dashboard(segundos=0.2)
+        assert time.monotonic() - inicio < 1
+        assert all(isinstance(e, PlazoAgotado) for e in resultado["errores"])
+        assert len(resultado["errores"]) == 3
@@ -0,0 +1,71 @@
+import asyncio
+import time
+import pytest
+from histograma import Histograma
+from retoia5semana3 import RateLimiter
+
+class TestHistograma:
+
+    def test_percentiles_con_error_relativo_acotado(self):
+        h = Histograma()
+        for i in range(1, 10001):
+            h.registrar(i / 1000)
+        for p, esperado in ((50, 5.0), (95, 9.5), (99, 9.9)):
+            assert h.percentil(p) == pytest.approx(esperado, rel=0.02)
+        assert h.total == 10000
+        assert h.maximo == 10.0
+
+    def test_ceros_y_fusion(self):
+        a, b = Histograma(), Histograma()
+        a.registrar(0, veces=3)
+        b.registrar(2.0)
+        a.fusionar(b)
+        assert a.total == 4
+        assert a.percentil(50) == 0.0
+        assert a.percentil(100) == pytest.approx(2.0, rel=0.02)
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+
+    async def test_burst_inmediato_y_luego_a_la_tasa(self):
+        limitador = RateLimiter(100, burst=5)
+        inicio = time.monotonic()
+        await asyncio.gather(*[limitador.wait() for _ in range(25)])
+        # 5 del burst + 20 a 100/s
+        assert time.monotonic() - inicio == pytest.approx(0.2, abs=0.06)
+
+    async def test_orden_fifo(self):
+        limitador = RateLimiter(1000, burst=1)
+        orden = []
+
+        async def llamada(i):
+            await limitador.wait()
+            orden.append(i)
+
+        await asyncio.gather(*[llamada(i) for i in range(200)])
+        assert orden == list(range(200))
+        assert limitador.max_cola == 199
+
+    async def test_un_despertar_por_token_como_mucho(self):
+        limitador = RateLimiter(200, burst=1)
+        await asyncio.gather(*[limitador.wait() for _ in range(40)])
+        assert limitador.despertares <= 39
+        assert limitador.metricas()["en_cola"] == 0
+
+    async def test_muchas_llamadas_sin_recursion(self):
+        limitador = RateLimiter(100_000, burst=1)
+        await asyncio.gather(*[limitador.wait() for _ in range(10_000)])
+        assert limitador.histograma_espera.total == 10_000
+
+    async def test_cancelar_en_cola_no_pierde_el_turno_de_los_demas(self):
+        limitador = RateLimiter(50, burst=1)
+        await limitador.wait()
+        tareas = [asyncio.create_task(limitador.wait()) for _ in range(3)]
+        await asyncio.sleep(0)
+        tareas[0].cancel()
+        await asyncio.sleep(0.005)
+        inicio = time.monotonic()
+        await asyncio.gather(*tareas[1:])
+        # El segundo recibe el token que habría ido al cancelado (~20 ms) y el tercero el siguiente
+        assert time.monotonic() - inicio < 0.06
+        assert limitador.esperando == 0
@@ -0,0 +1,143 @@
+import asyncio
+import httpx
+import pytest
+import requests
+import responses
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from reintentos import (PoliticaReintentos, PresupuestoReintentos, AdaptadorRequests,
+                        TransporteHttpx, CABECERA_IDEMPOTENCIA)
+
+class RespuestaFalsa:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+def politica(**opciones):
+    opciones.setdefault("presupuesto", PresupuestoReintentos())
+    return PoliticaReintentos(base=0.001, tope=0.01, **opciones)
+
+def servidor(*estados):
+    """enviar() que responde los estados en orden y guarda las cabeceras recibidas."""
+    recibidas = []
+    pendientes = list(estados)
+
+    def enviar(cabeceras):
+        recibidas.append(cabeceras)
+        estado = pendientes.pop(0)
+        if isinstance(estado, Exception):
+            raise estado
+        return RespuestaFalsa(estado)
+
+    return enviar, recibidas
+
+class TestPoliticaReintentos:
+
+    def test_reintenta_5xx_hasta_el_exito(self):
+        enviar, recibidas = servidor(503, 502, 200)
+        assert politica().ejecutar("GET", enviar).status_code == 200
+        assert len(recibidas) == 3
+
+    def test_devuelve_la_ultima_respuesta_al_agotar_intentos(self):
+        enviar, recibidas = servidor(503, 503, 503)
+        p = politica(max_intentos=3)
+        assert p.ejecutar("GET", enviar).status_code == 503
+        assert p.agotados == 1
+
+    def test_error_de_conexion_se_reintenta_y_luego_se_propaga(self):
+        enviar, recibidas = servidor(ConnectionError(), ConnectionError())
+        with pytest.raises(ConnectionError):
+            politica(max_intentos=2).ejecutar("GET", enviar)
+        assert len(recibidas) == 2
+
+    def test_4xx_no_se_reintenta(self):
+        enviar, recibidas = servidor(404)
+        assert politica().ejecutar("GET", enviar).status_code == 404
+        assert len(recibidas) == 1
+
+    def test_post_lleva_la_misma_clave_en_todos_los_intentos(self):
+        enviar, recibidas = servidor(503, 201)
+        assert politica().ejecutar("POST", enviar).status_code == 201
+        claves = {c[CABECERA_IDEMPOTENCIA] for c in recibidas}
+        assert len(recibidas) == 2 and len(claves) == 1
+
+    def test_post_sin_clave_no_se_reintenta(self):
+        enviar, recibidas = servidor(503, 201)
+        assert politica(claves_idempotencia=False).ejecutar("POST", enviar).status_code == 503
+        assert len(recibidas) == 1
+
+    def test_respuestas_descartadas_se_cierran(self):
+        primera, segunda = RespuestaFalsa(503), RespuestaFalsa(200)
+        cola = [primera, segunda]
+        assert politica().ejecutar("GET", lambda c: cola.pop(0)) is segunda
+        assert primera.cerrada and not segunda.cerrada
+
+    def test_retry_after_es_un_minimo(self):
+        p = politica()
+        espera = p._decidir("GET", {}, 0, p.base, RespuestaFalsa(503, {"Retry-After": "7"}))
+        assert espera >= 7
+
+    def test_presupuesto_corta_la_tormenta_de_reintentos(self):
+        presupuesto = PresupuestoReintentos(proporcion=0.1, minimo_por_segundo=0)
+        p = politica(presupuesto=presupuesto, max_intentos=5)
+        llamadas = 0
+
+        def caido(cabeceras):
+            nonlocal llamadas
+            llamadas += 1
+            return RespuestaFalsa(503)
+
+        for _ in range(20):
+            p.ejecutar("GET", caido)
+        # 20 peticiones originales -> como mucho 2 reintentos en la ventana
+        assert llamadas == 22
+        assert presupuesto.denegados == 20
+
+@pytest.mark.asyncio
+class TestAdaptadoresAsync:
+
+    async def test_transporte_httpx(self):
+        estados = [503, 200]
+        claves = []
+
+        def manejador(request):
+            claves.append(request.headers.get(CABECERA_IDEMPOTENCIA))
+            return httpx.Response(estados.pop(0))
+
+        transporte = TransporteHttpx(politica(), transporte=httpx.MockTransport(manejador))
+        async with httpx.AsyncClient(transport=transporte) as client:
+            r = await client.post("http://eco.test/api/alertas", json={"a": 1})
+        assert r.status_code == 200
+        assert len(claves) == 2 and claves[0] == claves[1] is not None
+
+    async def test_cliente_aiohttp_reintenta_crear_producto(self, monkeypatch):
+        import aiohttp
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+        estados = [503, 201]
+        claves = []
+
+        async def crear(request):
+            claves.append(request.headers.get(CABECERA_IDEMPOTENCIA))
+            return web.json_response({"id": 1}, status=estados.pop(0))
+
+        app = web.Application()
+        app.router.add_post("/api/productos", crear)
+        async with TestServer(app) as servidor:
+            monkeypatch.setattr(cliente, "BASE_URL", str(servidor.make_url("/api")))
+            monkeypatch.setattr(cliente, "REINTENTOS", politica())
+            async with aiohttp.ClientSession() as session:
+                assert await cliente.crear_producto(session, {"nombre": "x"}) == {"id": 1}
+        assert len(claves) == 2 and claves[0] == claves[1] is not None
+
+@responses.activate
+def test_adaptador_requests():
+    responses.add(responses.GET, "http://eco.test/api/productos", status=503)
+    responses.add(responses.GET, "http://eco.test/api/productos", json=[], status=200)
+    session = requests.Session()
+    session.mount("http://", AdaptadorRequests(politica()))
+    assert session.get("http://eco.test/api/productos").status_code == 200
+    assert len(responses.calls) == 2
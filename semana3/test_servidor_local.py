@@ -0,0 +1,109 @@
+import random
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+from servidor_local import (ALMACEN, AlmacenEcoMarket, Simulacion, crear_app, latencia_bimodal,
+                            latencia_lognormal)
+
+@pytest_asyncio.fixture
+async def api():
+    app = crear_app(productos=30)
+    async with TestServer(app) as servidor, aiohttp.ClientSession(str(servidor.make_url("/"))) as session:
+        session.almacen = app[ALMACEN]
+        yield session
+
+def test_todas_las_rutas_de_la_especificacion():
+    app = crear_app()
+    registradas = {(r.method, r.resource.canonical) for r in app.router.routes()}
+    for ruta, operaciones in AlmacenEcoMarket().especificacion["paths"].items():
+        for metodo in operaciones:
+            assert (metodo.upper(), "/api" + ruta) in registradas
+
+@pytest.mark.asyncio
+class TestApiEcoMarket:
+
+    async def test_lista_paginada_con_etag(self, api):
+        async with api.get("/api/productos", params={"page": 2, "limit": 10}) as r:
+            assert [p["id"] for p in await r.json()] == list(range(11, 21))
+            etag = r.headers["ETag"]
+        async with api.get("/api/productos", params={"page": 2, "limit": 10},
+                           headers={"If-None-Match": etag}) as r:
+            assert r.status == 304
+        async with api.patch("/api/productos/1/precio", json={"precio": 9.5}) as r:
+            assert r.status == 200 and (await r.json())["precio"] == 9.5
+        async with api.get("/api/productos", headers={"If-None-Match": etag}) as r:
+            assert r.status == 200  # La escritura cambió la versión
+
+    async def test_crud_completo(self, api):
+        async with api.post("/api/productores", json={"nombre": "Huerta", "ubicacion": "Norte"}) as r:
+            assert r.status == 201
+            nuevo = await r.json()
+        async with api.put(f"/api/productores/{nuevo['id']}", json={"nombre": "Huerta Sur"}) as r:
+            assert (await r.json()) == {"id": nuevo["id"], "nombre": "Huerta Sur"}
+        async with api.delete(f"/api/productores/{nuevo['id']}") as r:
+            assert r.status == 204
+        async with api.get(f"/api/productores/{nuevo['id']}") as r:
+            assert r.status == 404
+
+    async def test_validacion_desde_el_esquema(self, api):
+        async with api.post("/api/productos", json={"nombre": "x", "precio": "gratis"}) as r:
+            assert r.status == 400  # El POST solo declara 400
+        async with api.patch("/api/productos/1/precio", json={"precio": 0}) as r:
+            assert r.status == 422  # exclusiveMinimum de Producto.precio
+
+    async def test_idempotency_key_no_duplica(self, api):
+        cabeceras = {"Idempotency-Key": "abc"}
+        antes = len(api.almacen.colecciones["pedidos"])
+        for _ in range(3):
+            async with api.post("/api/pedidos", json={"cliente": "a@b.c"}, headers=cabeceras) as r:
+                assert r.status == 201
+        assert len(api.almacen.colecciones["pedidos"]) == antes + 1
+
+    async def test_el_id_lo_asigna_el_servidor(self, api):
+        async with api.post("/api/productores", json={"id": 1, "nombre": "Intruso"}) as r:
+            nuevo = await r.json()
+        assert nuevo["id"] != 1 and api.almacen.colecciones["productores"][1]["nombre"] == "Productor 1"
+        async with api.put(f"/api/productores/{nuevo['id']}", json={"id": 2, "nombre": "Otro"}) as r:
+            assert (await r.json())["id"] == nuevo["id"]
+        assert api.almacen.colecciones["productores"][2]["nombre"] == "Productor 2"
+
+    async def test_claves_de_idempotencia_acotadas(self, api):
+        api.almacen.max_idempotencia = 3
+        for clave in "abcd":
+            async with api.post("/api/pedidos", json={"cliente": "a@b.c"}, headers={"Idempotency-Key": clave}):
+                pass
+        assert list(api.almacen._idempotencia) == ["b", "c", "d"]
+
+    async def test_productos_de_un_productor(self, api):
+        async with api.get("/api/productores/3/productos") as r:
+            productos = await r.json()
+        assert productos and all(p["productor"]["id"] == 3 for p in productos)
+
+@pytest.mark.asyncio
+class TestFallosInyectados:
+
+    async def test_429_503_y_cortes(self):
+        simulacion = Simulacion(tasa_429=0.2, tasa_503=0.2, tasa_corte=0.2, rng=random.Random(7))
+        estados, cortes = [], 0
+        async with TestServer(crear_app(simulacion=simulacion)) as servidor:
+            async with aiohttp.ClientSession() as session:
+                for _ in range(200):
+                    try:
+                        # POST: aiohttp reintenta por su cuenta (una vez) los GET cortados
+                        async with session.post(servidor.make_url("/api/pedidos"), json={"cliente": "x"}) as r:
+                            estados.append(r.status)
+                            if r.status in (429, 503):
+                                assert r.headers["Retry-After"] == "1"
+                    except aiohttp.ServerDisconnectedError:
+                        cortes += 1
+        assert cortes == simulacion.inyectados["corte"] > 20
+        assert estados.count(429) == simulacion.inyectados[429] > 20
+        assert estados.count(503) == simulacion.inyectados[503] > 20
+
+def test_distribuciones_de_latencia():
+    rng = random.Random(1)
+    muestras = sorted(latencia_lognormal(0.01)(rng) for _ in range(2000))
+    assert 0.009 < muestras[1000] < 0.011 and muestras[-20] > 0.025
+    bimodal = [latencia_bimodal(0.001, 0.5, 0.1)(rng) for _ in range(2000)]
+    assert 150 < bimodal.count(0.5) < 250
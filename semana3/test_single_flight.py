@@ -0,0 +1,128 @@
+import asyncio
+import time
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from plazos import PlazoAgotado, con_plazo
+from single_flight import SingleFlight
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+
+    async def test_llamadas_simultaneas_comparten_una_peticion(self):
+        sf = SingleFlight()
+        llamadas = 0
+
+        async def peticion():
+            nonlocal llamadas
+            llamadas += 1
+            await asyncio.sleep(0.01)
+            return "datos"
+
+        resultados = await asyncio.gather(*[sf.ejecutar("GET /productos", peticion) for _ in range(10)])
+        assert resultados == ["datos"] * 10
+        assert llamadas == 1
+        assert sf.metricas["GET /productos"].deduplicadas == 9
+        assert sf.en_vuelo() == 0
+
+    async def test_peticion_terminada_no_se_reutiliza(self):
+        sf = SingleFlight()
+
+        async def peticion():
+            return 1
+
+        await sf.ejecutar("k", peticion)
+        await sf.ejecutar("k", peticion)
+        assert sf.metricas["k"].ejecutadas == 2
+
+    async def test_error_llega_a_todos_los_llamadores(self):
+        sf = SingleFlight()
+
+        async def peticion():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("caído")
+
+        resultados = await asyncio.gather(*[sf.ejecutar("k", peticion) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ConnectionError) for r in resultados)
+
+    async def test_cancelar_un_llamador_no_cancela_a_los_demas(self):
+        sf = SingleFlight()
+
+        async def peticion():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        primero = asyncio.create_task(sf.ejecutar("k", peticion))
+        segundo = asyncio.create_task(sf.ejecutar("k", peticion))
+        await asyncio.sleep(0)
+        primero.cancel()
+        assert await segundo == "ok"
+
+    async def test_cada_llamador_respeta_su_propio_plazo(self):
+        sf = SingleFlight()
+
+        async def peticion():
+            await asyncio.sleep(0.3)
+            return "ok"
+
+        async def con(segundos):
+            inicio = time.monotonic()
+            with con_plazo(segundos):
+                try:
+                    return await sf.ejecutar("k", peticion), time.monotonic() - inicio
+                except PlazoAgotado:
+                    return "agotado", time.monotonic() - inicio
+
+        # Primero el de plazo corto: el largo no hereda el suyo
+        (corto, t_corto), (largo, t_largo) = await asyncio.gather(con(0.05), con(5))
+        assert corto == "agotado" and t_corto < 0.2
+        assert largo == "ok" and t_largo < 1
+        # Primero el de plazo largo: el corto no espera a la petición compartida
+        (largo, _), (corto, t_corto) = await asyncio.gather(con(5), con(0.05))
+        assert largo == "ok" and corto == "agotado" and t_corto < 0.2
+
+    async def test_sin_llamadores_se_cancela_la_peticion(self):
+        sf = SingleFlight()
+        cancelada = asyncio.Event()
+
+        async def peticion():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelada.set()
+                raise
+
+        with con_plazo(0.02):
+            with pytest.raises(PlazoAgotado):
+                await sf.ejecutar("k", peticion)
+        await asyncio.wait_for(cancelada.wait(), 0.5)
+        assert sf.en_vuelo() == 0
+
+    async def test_metricas_por_etiqueta(self):
+        sf = SingleFlight()
+
+        async def peticion():
+            return 1
+
+        for i in range(20):
+            await sf.ejecutar((f"/productos/{i}", "Bearer secreto"), peticion, etiqueta="/productos/{id}")
+        assert list(sf.metricas) == ["/productos/{id}"]
+        assert sf.metricas["/productos/{id}"].ejecutadas == 20
+
+    async def test_cliente_agrupa_las_metricas_por_endpoint(self, monkeypatch):
+        import cliente_async_ecomarket_y_tiempos_retoia3semana3 as cliente
+
+        async def producto(request):
+            return web.json_response({"id": int(request.match_info["id"])})
+
+        app = web.Application()
+        app.router.add_get("/api/productos/{id}", producto)
+        monkeypatch.setattr(cliente, "SINGLE_FLIGHT", SingleFlight())
+        async with TestServer(app) as servidor:
+            monkeypatch.setattr(cliente, "BASE_URL", str(servidor.make_url("/api")))
+            async with aiohttp.ClientSession(headers={"Authorization": "Bearer secreto"}) as session:
+                for i in range(30):
+                    assert await cliente.obtener_producto(session, i) == {"id": i}
+        assert list(cliente.SINGLE_FLIGHT.metricas) == ["/api/productos/{id}"]
+        assert cliente.SINGLE_FLIGHT.metricas["/api/productos/{id}"].ejecutadas == 30
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from smart_sessionretoia10semana3 import PoolTrial, SmartSession, recommend, tune_pool
+
+@pytest_asyncio.fixture
+async def url():
+    async def producto(request):
+        await asyncio.sleep(0.01)
+        return web.json_response({"id": 1})
+
+    app = web.Application()
+    app.router.add_get("/api/productos", producto)
+    async with TestServer(app) as servidor:
+        yield str(servidor.make_url("/api/productos"))
+
+def prueba(limit, throughput, p99, errors=0):
+    t = PoolTrial(limit, 0, 60, requests=throughput, errors=errors, elapsed=1.0)
+    t.latency.registrar(p99)
+    return t
+
+def test_recomienda_el_pool_mas_pequeno_que_no_empeora():
+    pruebas = [prueba(5, 100, 0.080), prueba(20, 200, 0.021), prueba(50, 205, 0.020),
+               prueba(0, 206, 0.019), prueba(100, 300, 0.010, errors=1)]
+    assert recommend(pruebas).limit == 20
+    assert recommend(pruebas, slo_p99=0.015) is None
+
+@pytest.mark.asyncio
+class TestSmartSession:
+
+    async def test_cuenta_conexiones_nuevas_y_reutilizadas(self, url):
+        async with SmartSession(limit=10) as smart:
+            for _ in range(3):
+                assert await smart.get(url) == {"id": 1}
+            await asyncio.gather(*[smart.fetch("GET", url) for _ in range(3)])
+            informe = smart.get_pool_report()
+        assert informe["created"] == 3 and informe["reused"] == 3
+        assert informe["acquired"] == 0 and informe["idle"] == 3 and informe["closed"] == 0
+        assert informe["reuse_ratio"] == 0.5
+
+    async def test_espera_por_hueco_del_pool(self, url):
+        async with SmartSession(limit=1) as smart:
+            await asyncio.gather(*[smart.fetch("GET", url) for _ in range(3)])
+            informe = smart.get_pool_report()
+        assert informe["created"] == 1 and informe["queued"] == 2
+        assert informe["queue_wait"]["max"] >= 0.01
+
+    async def test_keepalive_vencido_cierra_conexiones(self, url):
+        async with SmartSession(limit=10, keepalive_timeout=0.05) as smart:
+            await smart.fetch("GET", url)
+            await asyncio.sleep(0.2)
+            await smart.fetch("GET", url)
+            informe = smart.get_pool_report()
+        assert informe["created"] == 2 and informe["reused"] == 0 and informe["closed"] == 1
+
+    async def test_tune_pool(self, url):
+        mejor, pruebas = await tune_pool(url, limits=(1, 10), keepalive_timeouts=(60,),
+                                         concurrency=10, requests=50, warmup=10)
+        assert len(pruebas) == 2 and all(p.requests == 50 for p in pruebas)
+        assert mejor.limit == 10
+        assert pruebas[0].report["queued"] > 0
@@ -0,0 +1,41 @@
+import pytest
+from sse import ParserSSE
+
+FLUJO = (
+    ": ping\n\n"
+    "retry: 2500\n"
+    "id: 7\n"
+    "event: inventario\n"
+    'data: {"productos": [\n'
+    'data: {"id": "Ñ-1"}]}\n\n'
+    "id: 8\r\n"
+    "event: producto\r\n"
+    'data: {"id": "Ñ-1", "stock": 3}\r\n\r\n'
+    "data: sin id ni tipo\r\r\n"
+).encode()
+
+def trocear(datos, tamano):
+    return [datos[i:i + tamano] for i in range(0, len(datos), tamano)]
+
+@pytest.mark.parametrize("tamano", [1, 2, 5, 1000])
+def test_eventos_con_cualquier_troceo(tamano):
+    """Los cortes pueden caer entre \\r y \\n o a mitad de un carácter UTF-8"""
+    parser = ParserSSE()
+    eventos = []
+    for trozo in trocear(FLUJO, tamano):
+        eventos.extend(parser.alimentar(trozo))
+    assert [(e.evento, e.id, e.retry) for e in eventos] == [
+        ("inventario", "7", 2500), ("producto", "8", None), ("message", "8", None)
+    ]
+    assert eventos[0].datos == '{"productos": [\n{"id": "Ñ-1"}]}'
+    assert eventos[2].datos == "sin id ni tipo"
+    assert parser.ultimo_id == "8"
+
+def test_evento_incompleto_no_se_emite():
+    parser = ParserSSE()
+    assert parser.alimentar(b"id: 1\ndata: x\n") == []
+    assert [e.datos for e in parser.alimentar(b"\n")] == ["x"]
+
+def test_comentarios_y_bloques_sin_data_se_ignoran():
+    parser = ParserSSE()
+    assert parser.alimentar(b": ping\n\nevent: vacio\n\n") == []